@@ -0,0 +1,23 @@
+"""
+One-off (re)build of the platform watch-time rollups from user_analytics_data.
+
+Usage (from backend/):
+    python backfill_traffic_rollups.py
+"""
+import time
+from database import client
+from services.traffic import backfill
+
+def main():
+    start = time.perf_counter()
+    try:
+        written = backfill()
+        print(f"✅ Wrote {written} traffic rollup buckets in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"❌ Error backfilling traffic rollups: {e}")
+    finally:
+        if client:
+            client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Recall / latency benchmark for the approximate recommender indexes (ml/ann.py).
+
+Usage (from backend/):
+    python bench_ann.py [--synthetic N] [--queries Q]
+
+Uses the loaded catalog's feature matrix, or with --synthetic a catalog of N
+rows made by jittering sampled catalog rows (to approximate 1M+ items).
+Recall@10 counts an approximate hit as correct if it scores at least the
+exact 10th score, so ties at the cut-off are not penalised.
+"""
+import sys
+import time
+import numpy as np
+from sklearn.preprocessing import normalize
+from ml.recommender import engine, top_k_indices
+from ml.ann import IVFIndex, make_index
+
+K = 10
+
+def synthetic_features(base, n, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = base[rng.integers(0, len(base), size=n)]
+    rows = rows + rng.normal(0, 0.02, size=rows.shape).astype(np.float32)
+    return normalize(rows).astype(np.float32)
+
+def exact_search(features, query, k):
+    scores = features @ query
+    top = top_k_indices(scores, k)
+    return top, scores[top]
+
+def evaluate(index, features, seeds):
+    hits, total, elapsed = 0, 0, 0.0
+    for idx in seeds:
+        query = features[idx]
+        _, exact_scores = exact_search(features, query, K)
+        start = time.perf_counter()
+        _, scores = index.search(features, query, K)
+        elapsed += time.perf_counter() - start
+        hits += int((scores >= exact_scores[-1] - 1e-6).sum())
+        total += K
+    return hits / total, elapsed / len(seeds) * 1000
+
+def main():
+    args = sys.argv[1:]
+    synthetic = int(args[args.index("--synthetic") + 1]) if "--synthetic" in args else 0
+    queries = int(args[args.index("--queries") + 1]) if "--queries" in args else 200
+
+    features = np.asarray(engine.current().features, dtype=np.float32)
+    if synthetic:
+        features = synthetic_features(features, synthetic)
+    print(f"Benchmarking over {len(features)} items, {features.shape[1]} features")
+
+    seeds = np.random.default_rng(42).integers(0, len(features), size=queries)
+    start = time.perf_counter()
+    for idx in seeds:
+        exact_search(features, features[idx], K)
+    print(f"exact                        : recall@{K} 1.000  {(time.perf_counter() - start) / queries * 1000:8.3f} ms/query")
+
+    start = time.perf_counter()
+    ivf = IVFIndex().build(features)
+    print(f"IVF build ({len(ivf.centroids)} lists)        : {time.perf_counter() - start:.2f}s")
+    for probe in (1, 4, 8, 16, 32):
+        ivf.n_probe = probe
+        recall, ms = evaluate(ivf, features, seeds)
+        print(f"ivf  n_probe={probe:<3}             : recall@{K} {recall:.3f}  {ms:8.3f} ms/query")
+
+    try:
+        hnsw = make_index("hnsw")
+    except ImportError as e:
+        print(f"Skipping HNSW: {e}")
+        hnsw = None
+    if hnsw is not None:
+        start = time.perf_counter()
+        hnsw.build(features)
+        print(f"HNSW build                   : {time.perf_counter() - start:.2f}s")
+        for ef in (16, 64, 128):
+            hnsw.ef = ef
+            recall, ms = evaluate(hnsw, features, seeds)
+            print(f"hnsw ef={ef:<4}                 : recall@{K} {recall:.3f}  {ms:8.3f} ms/query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Cold-load benchmark for the catalog (services/catalog.py).
+
+Usage (from backend/):
+    python bench_catalog.py [--runs N]
+
+Each run starts a fresh interpreter and loads the catalog two ways: parsing
+the raw JSON/CSV sources (load_sources, what every worker did before the
+columnar store) and attaching the published version with its deltas. Reports
+load time, resident memory added by the load and the size on disk.
+"""
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+from services.catalog import CATALOG_ROOT, FINAL_DF_JSON_PATH, FINAL_DF_CSV_PATH, NEW_DATA_PATH, read_pointer
+
+PROBE = r"""
+import os, sys, json, time
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+from services.catalog import load_sources, Catalog, CATALOG_ROOT, read_pointer, delta_files
+import contextlib, io
+before = rss()
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    if sys.argv[1] == "sources":
+        rows = len(load_sources())
+    else:
+        base = os.path.join(CATALOG_ROOT, read_pointer())
+        catalog = Catalog.attach(base, delta_files(base))
+        rows = len(catalog.frame())
+print(json.dumps({"ms": (time.perf_counter() - start) * 1000, "rss": rss() - before, "rows": rows}))
+"""
+
+def disk_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+def probe(mode: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE, mode], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    args = sys.argv[1:]
+    runs = int(args[args.index("--runs") + 1]) if "--runs" in args else 5
+    version = read_pointer()
+    if version is None:
+        print("❌ No published catalog; run build_catalog.py first.")
+        return
+
+    sources = [p for p in (FINAL_DF_JSON_PATH, NEW_DATA_PATH) if os.path.exists(p)] or [FINAL_DF_CSV_PATH]
+    sizes = {
+        "sources": sum(disk_size(p) for p in sources),
+        "catalog": disk_size(os.path.join(CATALOG_ROOT, version)),
+    }
+    for mode in ("sources", "catalog"):
+        results = [probe(mode) for _ in range(runs)]
+        ms = np.percentile([r["ms"] for r in results], 50)
+        rss = np.percentile([r["rss"] for r in results], 50) / 1e6
+        print(f"{mode:8s} {results[0]['rows']} rows: load p50 {ms:.0f} ms, +{rss:.1f} MB RSS, "
+              f"{sizes[mode] / 1e6:.1f} MB on disk")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Login latency benchmark for the password pool (services/passwords.py).
+
+Usage (from backend/):
+    python bench_login.py [--logins N] [--concurrency C]
+
+Fires N bcrypt verifications, C at a time, through the same pool /auth/login
+uses while a probe task measures event-loop lag every 10 ms. Reports login
+p50/p99 and loop-lag p99: with the pool, lag stays near zero however long the
+logins queue, so the rest of the API keeps answering during a login burst.
+"""
+import sys
+import time
+import asyncio
+import numpy as np
+from services.passwords import PasswordPool, PasswordPoolBusy, hash_password_sync
+
+async def probe(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - start - 0.01) * 1000)
+
+async def run(n, concurrency):
+    pool = PasswordPool(queue_limit=concurrency)
+    hashed = hash_password_sync("correct horse")
+    gate = asyncio.Semaphore(concurrency)
+    latencies, lags, rejected = [], [], 0
+    stop = asyncio.Event()
+
+    async def login():
+        nonlocal rejected
+        async with gate:
+            start = time.perf_counter()
+            try:
+                await pool.verify("correct horse", hashed)
+            except PasswordPoolBusy:
+                rejected += 1
+                return
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    prober = asyncio.create_task(probe(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await prober
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{len(latencies)} logins ({rejected} rejected) in {elapsed:.1f}s with {pool.workers} workers: "
+          f"p50 {p50:.0f} ms, p99 {p99:.0f} ms")
+    print(f"Event-loop lag: p99 {np.percentile(lags, 99):.1f} ms, max {max(lags):.1f} ms")
+
+def main():
+    args = sys.argv[1:]
+    n = int(args[args.index("--logins") + 1]) if "--logins" in args else 50
+    concurrency = int(args[args.index("--concurrency") + 1]) if "--concurrency" in args else 16
+    asyncio.run(run(n, concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Microbenchmark for the recommendation engine.
+
+Usage (from backend/):
+    python bench_recommender.py [calls]
+
+Loads the engine from the shared catalog, checks the vectorized top-K path
+against the original float64 cosine ranking and the title index against the
+legacy pandas scans, then reports per-call latency for both, plus looped
+single-title calls against one batched call for BATCH_SIZES seeds. The engine
+scores in float32, so seeds whose top results include near-ties (scores
+equal in float64 up to TIE_TOLERANCE) may list the tied titles in another
+order; those seeds are counted and reported rather than failed.
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import MinMaxScaler, normalize
+from ml.recommender import engine as recommender, top_k_indices, read_catalog, PLATFORMS
+
+LIMIT = 10
+CHECK_SEEDS = 300
+TIE_TOLERANCE = 1e-5
+BATCH_SIZES = (5, 20, 100)
+
+def legacy_features(df):
+    """The original combined feature matrix: float64, rows not normalised (cosine_similarity does that)"""
+    df = df.copy()
+    genres = df['Genres'].fillna('').astype(object).str.get_dummies(sep=',')
+    # Object columns (pandas < 3, the original setup) never produced an empty-genre column
+    genre_matrix = normalize(genres.drop(columns='', errors='ignore'))
+    scaler = MinMaxScaler()
+    imdb_scaled = scaler.fit_transform(pd.to_numeric(df['IMDb'], errors='coerce').fillna(0).values.reshape(-1, 1))
+    platform_matrix = np.column_stack([pd.to_numeric(df[p], errors='coerce').fillna(0).astype(int) for p in PLATFORMS])
+    platform_matrix = normalize(platform_matrix) if platform_matrix.any() else platform_matrix
+    year_scaled = scaler.fit_transform(pd.to_numeric(df['Year'], errors='coerce').fillna(0).values.reshape(-1, 1))
+    return np.hstack([genre_matrix * np.sqrt(0.40), imdb_scaled * np.sqrt(0.30),
+                      platform_matrix * np.sqrt(0.20), year_scaled * np.sqrt(0.10)])
+
+def legacy_scores(idx):
+    """One row of the original float64 cosine similarity matrix"""
+    return cosine_similarity(legacy[idx:idx + 1], legacy)[0]
+
+def legacy_ranking(idx, limit=LIMIT):
+    order = sorted(enumerate(legacy_scores(idx)), key=lambda x: x[1], reverse=True)
+    return [i for i, _ in order if i != idx][:limit]
+
+def legacy_recommendations(idx, limit=LIMIT):
+    """The original implementation: sort every (index, score) tuple and read pandas rows"""
+    sim_scores = sorted(enumerate(legacy_scores(idx)), key=lambda x: x[1], reverse=True)
+    recommendations = []
+    for i, score in sim_scores:
+        if i == idx: continue
+        if len(recommendations) >= limit: break
+        row = engine.df.iloc[i]
+        available_platforms = [p for p in ['Netflix', 'Hulu', 'Prime Video', 'Disney+'] if row.get(p) == 1]
+        recommendations.append({
+            "title": row.get('Title', 'Unknown'),
+            "platform": ", ".join(available_platforms) if available_platforms else "None",
+            "imdb_rating": float(row.get('IMDb', 0)),
+            "release_year": int(row.get('Year', 0)),
+            "similarity_score": round(float(score) * 100, 2)
+        })
+    return recommendations
+
+def legacy_lookup(title):
+    """The original title resolution: two full-column pandas scans"""
+    indices = engine.df.index[engine.df['Title'].str.lower() == title.lower()].tolist()
+    if not indices:
+        indices = engine.df.index[engine.df['Title'].str.contains(title, case=False, na=False, regex=False)].tolist()
+    return indices[0] if indices else None
+
+def fast_ranking(idx, limit=LIMIT):
+    scores = engine.similarity_scores(idx)
+    scores[idx] = -np.inf
+    return top_k_indices(scores, limit), scores
+
+def fast_recommendations(idx, limit=LIMIT):
+    top, scores = fast_ranking(idx, limit)
+    return engine.format_results(top, scores[top])
+
+def time_per_call(fn, args):
+    start = time.perf_counter()
+    for a in args:
+        fn(a)
+    return (time.perf_counter() - start) / len(args) * 1000
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    start = time.perf_counter()
+    global engine, legacy
+    engine = recommender.current()
+    print(f"Loaded engine over {len(engine.df)} items in {time.perf_counter() - start:.2f}s")
+    legacy = legacy_features(read_catalog())
+    assert len(legacy) == len(engine.df), "Engine rows differ from the catalog (admin content loaded?)"
+
+    rng = np.random.default_rng(42)
+    seeds = rng.integers(0, len(engine.df), size=max(calls, CHECK_SEEDS))
+
+    # 1. Correctness: the float64 legacy ranking, up to the order of near-tied scores
+    ties = []
+    for idx in seeds[:CHECK_SEEDS]:
+        expected = legacy_ranking(idx)
+        got = list(fast_ranking(idx)[0])
+        if got != expected:
+            exact = legacy_scores(idx)
+            gap = float(np.abs(exact[expected] - exact[got]).max())
+            assert gap < TIE_TOLERANCE, f"Ranking mismatch for item {idx} (float64 score gap {gap:.2e})"
+            ties.append((idx, gap, exact[[i for i in got if i not in expected] or got].max() * 100))
+    print(f"✅ Vectorized ranking matches the float64 legacy ranking on {CHECK_SEEDS - len(ties)} of {CHECK_SEEDS} seeds")
+    if ties:
+        print(f"   {len(ties)} seeds order near-ties differently (float64 gap < {TIE_TOLERANCE:g}):")
+        for idx, gap, score in ties:
+            print(f"   item {idx}: tied at {score:.2f}, gap {gap:.1e}")
+
+    titles = [str(engine.df['Title'].iloc[i]) for i in seeds]
+    queries = titles[:50] + [t.upper() for t in titles[:20]] + [t[1:6] for t in titles[:50]] + ["zzqx", "of", "e"]
+    for q in queries:
+        assert legacy_lookup(q) == engine.title_index.lookup(q), f"Lookup mismatch for {q!r}"
+    print("✅ Title index matches legacy first-match lookup")
+
+    unique_titles = [engine.df['Title'].iloc[i] for i in engine.title_index._exact.values()]
+    batch_titles = unique_titles[:20]
+    batch = engine.get_batch_recommendations(batch_titles, LIMIT, exclude_watched=False)
+    for entry, t in zip(batch["per_seed"], batch_titles):
+        assert entry["recommendations"] == engine.get_recommendations(t, LIMIT), f"Batch mismatch for {t!r}"
+    print("✅ Batch per-seed lists match single-title recommendations")
+
+    # 2. Latency
+    legacy_ms = time_per_call(legacy_recommendations, seeds[:20])
+    fast_ms = time_per_call(fast_recommendations, seeds)
+    full_ms = time_per_call(lambda t: engine.get_recommendations(t, LIMIT), titles)
+    legacy_lookup_ms = time_per_call(legacy_lookup, queries[:20])
+    lookup_ms = time_per_call(engine.title_index.lookup, queries)
+
+    print(f"legacy sort + iloc       : {legacy_ms:8.3f} ms/call")
+    print(f"argpartition + columns   : {fast_ms:8.3f} ms/call")
+    for n in BATCH_SIZES:
+        ts = unique_titles[:n]
+        loop_ms = time_per_call(lambda ts: [engine.get_recommendations(t, LIMIT) for t in ts], [ts] * 20)
+        batch_ms = time_per_call(lambda ts: engine.get_batch_recommendations(ts, LIMIT), [ts] * 20)
+        print(f"{n:3d} seeds, looped        : {loop_ms:8.3f} ms")
+        print(f"{n:3d} seeds, batched       : {batch_ms:8.3f} ms  ({loop_ms / batch_ms:.1f}x)")
+    print(f"legacy title scan        : {legacy_lookup_ms:8.3f} ms/call")
+    print(f"title index lookup       : {lookup_ms:8.3f} ms/call")
+    print(f"get_recommendations(title): {full_ms:8.3f} ms/call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Latency benchmark for the in-process search index (services/search.py).
+
+Usage (from backend/):
+    python bench_search.py [--synthetic N] [--queries Q]
+
+Indexes the recommender's rows, or with --synthetic a catalog of N rows made
+by recombining words from real titles, then reports build time and p50/p99
+latency over a mix of exact, multi-word, prefix and misspelled queries.
+"""
+import sys
+import time
+import numpy as np
+from services.search import SearchIndex, engine_rows, tokenize
+
+LIMIT = 20
+
+def synthetic_rows(rows, n, seed=0):
+    rng = np.random.default_rng(seed)
+    src = rng.integers(0, len(rows["title"]), size=n)
+    words = [w for t in rows["title"] if t for w in t.split()]
+    titles = []
+    for i in src:
+        base = rows["title"][i] or "Untitled"
+        extra = " ".join(words[j] for j in rng.integers(0, len(words), size=rng.integers(0, 3)))
+        titles.append(f"{base} {extra}".strip())
+    out = {key: [rows[key][i] for i in src] for key in ("_id", "directors", "genres", "type", "platform")}
+    out.update(title=titles, imdb=rows["imdb"][src], year=rows["year"][src])
+    return out
+
+def make_queries(rows, count, seed=1):
+    rng = np.random.default_rng(seed)
+    titles = [t for t in rows["title"] if t and tokenize(t)]
+    queries = []
+    for i in rng.integers(0, len(titles), size=count):
+        tokens = tokenize(titles[i])
+        kind = len(queries) % 4
+        if kind == 0:
+            queries.append(titles[i])                      # full title
+        elif kind == 1:
+            queries.append(" ".join(tokens[:2]))           # leading words
+        elif kind == 2:
+            queries.append(tokens[0][:3])                  # short prefix
+        else:
+            w = max(tokens, key=len)                       # one typo
+            queries.append(w[:1] + w[2:] if len(w) > 4 else w)
+    return queries
+
+def main():
+    args = sys.argv[1:]
+    synthetic = int(args[args.index("--synthetic") + 1]) if "--synthetic" in args else 0
+    count = int(args[args.index("--queries") + 1]) if "--queries" in args else 1000
+
+    rows, _ = engine_rows()
+    if synthetic:
+        rows = synthetic_rows(rows, synthetic)
+
+    start = time.perf_counter()
+    index = SearchIndex(rows)
+    print(f"Indexed {len(rows['title'])} rows ({len(index.vocab)} terms) in {time.perf_counter() - start:.2f}s")
+
+    queries = make_queries(rows, count)
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, LIMIT)
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{len(queries)} queries: p50 {p50:.3f} ms, p99 {p99:.3f} ms, max {max(latencies):.3f} ms")
+
+if __name__ == "__main__":
+    main()
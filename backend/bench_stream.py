@@ -0,0 +1,50 @@
+"""
+Time-to-first-byte benchmark for streamed chat replies (routes/ai.py).
+
+Usage (from backend/):
+    LLM_PROVIDER=stub python bench_stream.py [--requests N] [--delay-ms D]
+
+Runs N chat prompts through the blocking path (complete) and through the SSE
+path (stream_chat, consuming its event stream) against the local stub
+provider, and reports time-to-first-byte and total time for each.
+"""
+import os
+import sys
+import time
+import asyncio
+import numpy as np
+
+os.environ.setdefault("LLM_PROVIDER", "stub")
+from routes.ai import gemini_provider, stream_chat
+
+async def run(n):
+    blocking, first, total = [], [], []
+    for i in range(n):
+        prompt = f"User asked: something to watch tonight #{i}\nContext: You are a movie recommendation assistant..."
+
+        start = time.perf_counter()
+        await asyncio.to_thread(gemini_provider.complete, prompt)
+        blocking.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        response = stream_chat(prompt, "bench@example.com", prompt)
+        ttfb = None
+        async for _ in response.body_iterator:
+            if ttfb is None:
+                ttfb = (time.perf_counter() - start) * 1000
+        first.append(ttfb)
+        total.append((time.perf_counter() - start) * 1000)
+
+    p50 = lambda xs: np.percentile(xs, 50)
+    print(f"Blocking reply:  TTFB p50 {p50(blocking):.0f} ms (whole reply)")
+    print(f"Streamed reply:  TTFB p50 {p50(first):.0f} ms, complete p50 {p50(total):.0f} ms")
+
+def main():
+    args = sys.argv[1:]
+    n = int(args[args.index("--requests") + 1]) if "--requests" in args else 20
+    if "--delay-ms" in args:
+        gemini_provider.delay = float(args[args.index("--delay-ms") + 1]) / 1000
+    asyncio.run(run(n))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Publish the shared catalog store.
+
+Usage (from backend/):
+    python build_catalog.py            rebuild from the raw datasets
+    python build_catalog.py --compact  fold the current version's deltas into a new version
+
+Reads final_df_cleaned.json (or dataset/final_df_cleaned.csv) plus
+new_data.json, appends the records from the current version's delta files
+(merge_data.py) that the sources do not already contain, writes a new memory-mapped version under
+data/catalog/ and swaps CURRENT to it. --compact skips the raw datasets and
+republishes the current catalog (base + deltas) as one version. Running API
+workers pick it up within CATALOG_RELOAD_SECONDS without a restart. Re-run
+build_recommender.py afterwards so the recommender artifact matches the new
+version.
+"""
+import os
+import sys
+import time
+import pandas as pd
+from services.catalog import Catalog, load_sources, publish, read_pointer, delta_files, read_deltas, CATALOG_ROOT
+
+def main():
+    start = time.perf_counter()
+    base = read_pointer()
+    deltas = delta_files(os.path.join(CATALOG_ROOT, base)) if base else []
+
+    if "--compact" in sys.argv[1:]:
+        if base is None:
+            print("❌ No published catalog to compact.")
+            return
+        if not deltas:
+            print(f"✅ Catalog {base} has no deltas; nothing to compact.")
+            return
+        catalog = Catalog.from_frame(Catalog.attach(os.path.join(CATALOG_ROOT, base), deltas).frame())
+    else:
+        df = load_sources()
+        if deltas:
+            # Delta rows the sources now contain themselves are not carried twice
+            extra = read_deltas(deltas)
+            known = set(zip(df["Title"], df["Year"]))
+            extra = extra[[key not in known for key in zip(extra["Title"], extra["Year"])]]
+            print(f"Carrying over {len(extra)} delta row(s) from {base}")
+            df = pd.concat([df, extra], ignore_index=True)
+        catalog = Catalog.from_frame(df)
+
+    if catalog.empty:
+        print("❌ No catalog data found; nothing to publish.")
+        return
+    version = publish(catalog)
+    print(f"✅ Published catalog {version} ({len(catalog)} items) to {CATALOG_ROOT} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
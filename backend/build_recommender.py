@@ -0,0 +1,38 @@
+"""
+Offline build of the recommender artifact.
+
+Usage (from backend/):
+    python build_recommender.py
+
+Reads the current shared catalog (see build_catalog.py), builds the feature
+matrix, title index and result columns, and writes them to
+ml/artifacts/v<schema>-<catalog version>/. API workers memory-map that
+directory on first use instead of rebuilding in process. Re-run after every
+catalog publish.
+"""
+import time
+from ml import artifacts
+from ml.recommender import Recommender, RecommenderEngine
+from services.catalog import current_catalog, logical_frame
+
+def main():
+    start = time.perf_counter()
+    catalog = current_catalog()
+    engine = Recommender()
+    engine.build(logical_frame(catalog.frame()))
+    if engine.df.empty:
+        print("❌ Catalog is empty; nothing to build.")
+        return
+    print(f"Built features for {len(engine.df)} items in {time.perf_counter() - start:.2f}s")
+
+    name = artifacts.artifact_name(catalog.version)
+    path = engine.save_artifact(name)
+    print(f"✅ Wrote recommender artifact to {path}")
+
+    start = time.perf_counter()
+    check = RecommenderEngine()
+    check.ensure_loaded()
+    print(f"Cold load from artifact: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
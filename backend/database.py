@@ -1,11 +1,25 @@
 import os
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # MongoDB Connection
 MONGO_URI = os.getenv("MONGO_URI")
+DB_NAME = "ott_database"
+
+# Pool / timeout / read preference settings, shared by the sync and async clients
+MONGO_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+    "readPreference": os.getenv("MONGO_READ_PREFERENCE", "primary"),
+}
 
 client = None
 db = None
@@ -14,14 +28,16 @@ content_collection = None
 history_collection = None
 admins_collection = None
 user_analytics_collection = None
+traffic_rollups_collection = None
+content_deletions_collection = None
 
 if not MONGO_URI:
     # Fallback or default if not set (User needs to set this in .env)
     MONGO_URI = "mongodb://localhost:27017" 
 
 try:
-    client = MongoClient(MONGO_URI)
-    db = client.get_database("ott_database") # Use the explicit DB name found in the cluster
+    client = MongoClient(MONGO_URI, **MONGO_OPTIONS)
+    db = client.get_database(DB_NAME) # Use the explicit DB name found in the cluster
     # The user provided URI has /?appName=Cluster0, but often implies 'test' db by default unless specified.
     # We will use "ott_platform" or "cine_nest" as default DB name.
     
@@ -31,6 +47,8 @@ try:
     history_collection = db["history"]
     admins_collection = db["admins"]
     user_analytics_collection = db["user_analytics_data"]
+    traffic_rollups_collection = db["platform_traffic_rollups"]
+    content_deletions_collection = db["content_deletions"]
     
     print("✅ Connected to MongoDB")
 except Exception as e:
@@ -40,5 +58,81 @@ except Exception as e:
     history_collection = None
     admins_collection = None
 
+# Sort fields the admin list endpoints accept, and the indexes that back them
+CONTENT_SORT_FIELDS = ["year", "imdb", "title", "views"]
+PLATFORM_FLAGS = ["Netflix", "Hulu", "Prime Video", "Disney+"]
+# user_id backs the seeding upserts; the rest back the /admin/user-analytics filters
+USER_ANALYTICS_INDEXES = [
+    [("user_id", 1)],
+    [("joined_date", 1), ("_id", 1)],
+    [("history.platform", 1), ("joined_date", 1), ("_id", 1)],
+    [("preferences", 1), ("joined_date", 1), ("_id", 1)],
+]
+
+def ensure_user_analytics_indexes(collection):
+    """USER_ANALYTICS_INDEXES on collection (the live one, or a staging copy before it is swapped in)"""
+    for keys in USER_ANALYTICS_INDEXES:
+        collection.create_index(keys)
+
+def ensure_indexes():
+    """Create the compound indexes for the admin list filters/sorts and /platform listings (idempotent)"""
+    if content_collection is None or user_analytics_collection is None:
+        return
+    try:
+        for field in CONTENT_SORT_FIELDS:
+            content_collection.create_index([(field, 1), ("_id", 1)])
+        for field in ["year", "imdb"]:
+            content_collection.create_index([("type", 1), (field, 1), ("_id", 1)])
+            for flag in PLATFORM_FLAGS:
+                content_collection.create_index([(flag, 1), (field, 1), ("_id", 1)])
+        content_collection.create_index([("platform", 1), ("_id", 1)])
+
+        ensure_user_analytics_indexes(user_analytics_collection)
+        traffic_rollups_collection.create_index([("granularity", 1), ("period", 1)])
+        print("✅ MongoDB indexes ensured")
+    except Exception as e:
+        print(f"❌ Failed to ensure MongoDB indexes: {e}")
+
 def get_db():
     return db
+
+# --- Async access (request handlers) ---
+# The synchronous handles above are for scripts and background threads. Request
+# handlers use these Motor collections so database I/O never blocks the event
+# loop; the client is opened and closed by the app lifespan (main.py).
+
+class AsyncMongo:
+    def __init__(self):
+        self.client = None
+        self.db = None
+
+    def connect(self):
+        try:
+            self.client = AsyncIOMotorClient(MONGO_URI, **MONGO_OPTIONS)
+            self.db = self.client.get_database(DB_NAME)
+        except Exception as e:
+            print(f"❌ Failed to create async MongoDB client: {e}")
+            self.client = self.db = None
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = self.db = None
+
+    def collection(self, name: str):
+        return self.db[name] if self.db is not None else None
+
+    @property
+    def users(self): return self.collection("users")
+    @property
+    def content(self): return self.collection("content")
+    @property
+    def history(self): return self.collection("history")
+    @property
+    def user_analytics(self): return self.collection("user_analytics_data")
+    @property
+    def traffic_rollups(self): return self.collection("platform_traffic_rollups")
+    @property
+    def content_deletions(self): return self.collection("content_deletions")
+
+adb = AsyncMongo()
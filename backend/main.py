@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
 import os
@@ -12,11 +14,29 @@ from routes.ai import router as AIRouter
 from routes.dataset_analysis import router as AnalysisRouter
 from routes.admin import router as AdminRouter
 from routes.auth import router as AuthRouter
+from database import adb, ensure_indexes
+from ml.change_feed import start_change_stream
+from ml.recommender import start_recommender_warmup
+from services.dashboard import start_dashboard_refresh
+from services.views import start_view_flusher
+from services.traffic import start_traffic_backfill
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
-app = FastAPI(title="OTT Platform API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    adb.connect()
+    await asyncio.to_thread(ensure_indexes)
+    tasks = [t for t in (start_recommender_warmup(), start_change_stream(), start_dashboard_refresh(), start_view_flusher(), start_traffic_backfill()) if t is not None]
+    print("Backend Server Started - Routes Loaded")
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    adb.close()
+
+app = FastAPI(title="OTT Platform API", lifespan=lifespan)
 
 # Debugging 422 Errors
 @app.exception_handler(RequestValidationError)
@@ -49,7 +69,3 @@ app.include_router(AuthRouter, prefix="/auth")
 @app.get("/")
 def home():
     return {"message": "OTT API running successfully!"}
-
-@app.on_event("startup")
-async def startup_event():
-    print("Backend Server Started - Routes Loaded")
@@ -1,23 +1,27 @@
-import json
+import os
 import random
+import itertools
 from datetime import datetime
-from database import client, db, user_analytics_collection
+from pymongo import InsertOne, ReplaceOne
+from database import client, db, user_analytics_collection, ensure_user_analytics_indexes
+from services.traffic import HistoryRollup, reset_history_minutes
+from services.ingest import iter_json_array, external_sort, BulkWriter, Progress
 
 # --- Configuration ---
 # DB_NAME and MONGO_URI are handled by database.py
 COLLECTION_NAME = "user_analytics_data"
+STAGING_COLLECTION_NAME = f"{COLLECTION_NAME}_staging"
 USERS_FILE = "../users_1000.json"
 HISTORY_FILE = "../watch_history.json"
 
+# Documents per unordered bulk upsert, and records held in memory per external sort run
+BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "1000"))
+SORT_RUN_ROWS = int(os.getenv("SEED_SORT_RUN_ROWS", "500000"))
+
 # --- Constants for Enrichment ---
 GENRES = ['Action', 'Comedy', 'Drama', 'Sci-Fi', 'Horror', 'Romance', 'Thriller', 'Documentary', 'Adventure', 'Fantasy']
 AVG_DURATION_MINS = 45  # Assumed average duration per watch count
 
-def load_json(filepath):
-    print(f"Loading {filepath}...")
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
 def transform_date(date_str):
     try:
         if not date_str: return datetime.now()
@@ -25,116 +29,150 @@ def transform_date(date_str):
     except ValueError:
         return datetime.now()
 
+def build_user_doc(user, user_history):
+    """Merged user_analytics document for one user and their watch history rows"""
+    user_id = user.get('user_id')
+    # Calculate Aggregates
+    total_watch_time = 0
+    formatted_history = []
+    formatted_ratings = []
+    
+    # Category tracking for preferences
+    category_counts = {g: 0 for g in GENRES} 
+    
+    for h in user_history:
+        # Watch Time
+        count = h.get('watch_count', 1)
+        duration = count * AVG_DURATION_MINS
+        total_watch_time += duration
+        
+        # History Item
+        history_item = {
+            "title": h.get("Title"),
+            "platform": h.get("platform", "Unknown"),
+            "date": h.get("watch_date"),
+            "watched_duration_mins": duration
+        }
+        formatted_history.append(history_item)
+        
+        # Rating Item (if rated)
+        rating = h.get("user_rating")
+        if rating:
+            formatted_ratings.append({
+                "title": h.get("Title"),
+                "rating": rating,
+                "review": "Enjoyed watching this!" if rating >= 4 else "It was okay." if rating == 3 else "Not my type."
+            })
+        
+        # Infer Genre (Randomly assigned for seed since not in source)
+        # In a real scenario, we'd lookup the title in a content DB.
+        # Here we assign a random genre to "simulate" preferences based on watch history
+        assigned_genre = random.choice(GENRES) 
+        category_counts[assigned_genre] += 1
+
+    # Determine Top Preferences
+    sorted_genres = sorted(category_counts.items(), key=lambda item: item[1], reverse=True)
+    top_preferences = [g[0] for g in sorted_genres if g[1] > 0][:3]
+    if not top_preferences: top_preferences = random.sample(GENRES, 3)
+
+    # Construct Final Object
+    user_doc = {
+        "user_id": user_id, # Keep original ID for reference
+        "username": user.get("username"),
+        "email": user.get("email"),
+        "full_name": user.get("username").replace(" ", "").capitalize(), # Simple name derivation
+        "joined_date": transform_date(user.get("created_at")),
+        "subscription_tier": user.get("subscription_plan", "Free"),
+        "preferences": top_preferences,
+        "total_watch_time_mins": total_watch_time,
+        "history": formatted_history, # Store full history or limit if too large? 
+                                    # Storing all for now, as mongo doc limit is 16MB which is plenty for this
+        "ratings": formatted_ratings,
+        "account_status": "Active",
+        "last_login": datetime.now()
+    }
+    return user_doc
+
+def read_history(path, progress):
+    for entry in iter_json_array(path):
+        progress.add()
+        if entry.get('user_id'):
+            yield entry
+    progress.report("done:")
+
+def history_by_user(path):
+    """(user_id, [history rows]) in user_id order, grouping a history file larger than memory.
+    Rows keep their file order within a user (the sort and merge are stable)."""
+    progress = Progress("History rows read")
+    sorted_rows = external_sort(read_history(path, progress), key=lambda e: e['user_id'], run_rows=SORT_RUN_ROWS)
+    for user_id, group in itertools.groupby(sorted_rows, key=lambda e: e['user_id']):
+        yield user_id, list(group)
+
+def merged_users(users_path, history_path):
+    """Merge-join users and grouped history, both in user_id order; users without history get none.
+    Users without a user_id sort first and never join (history rows without one are dropped)."""
+    users = external_sort(iter_json_array(users_path), key=lambda u: u.get('user_id') or "", run_rows=SORT_RUN_ROWS)
+    histories = history_by_user(history_path)
+    try:
+        pending = next(histories, None)
+        for user in users:
+            user_id = user.get('user_id')
+            if not user_id:
+                yield build_user_doc(user, [])
+                continue
+            while pending is not None and pending[0] < user_id:
+                pending = next(histories, None)
+            if pending is not None and pending[0] == user_id:
+                yield build_user_doc(user, pending[1])
+            else:
+                yield build_user_doc(user, [])
+    finally:
+        # Removes the external sorts' temporary files, also when the merge stops early or fails
+        users.close()
+        histories.close()
+
 def main():
     # 1. Connect to MongoDB (Handled by import)
     # db and user_analytics_collection are already available
-    collection = user_analytics_collection
-
-    if collection is None:
+    if user_analytics_collection is None:
         print("Error: Could not get collection from database.py")
         return
 
-    # 2. Load Data
-    try:
-        users = load_json(USERS_FILE)
-        history = load_json(HISTORY_FILE)
-    except FileNotFoundError as e:
-        print(f"Error: {e}")
-        return
+    for path in (USERS_FILE, HISTORY_FILE):
+        if not os.path.exists(path):
+            print(f"Error: {path} not found")
+            return
 
-    print(f"Loaded {len(users)} users and {len(history)} history records.")
+    # 2. Stream merged documents into a fresh staging collection. Upserts are
+    # keyed by user_id, so a retried batch or duplicate user never duplicates;
+    # users without a user_id have no key and are inserted one document each.
+    staging = db[STAGING_COLLECTION_NAME]
+    staging.drop()
+    ensure_user_analytics_indexes(staging)
 
-    # 3. Index History by User ID for faster lookup
-    history_by_user = {}
-    for entry in history:
-        uid = entry.get('user_id')
-        if not uid: continue
-        if uid not in history_by_user:
-            history_by_user[uid] = []
-        history_by_user[uid].append(entry)
+    progress = Progress("Users upserted")
+    writer = BulkWriter(staging, BATCH_SIZE, progress)
+    rollup = HistoryRollup()
+    for user_doc in merged_users(USERS_FILE, HISTORY_FILE):
+        if user_doc["user_id"]:
+            writer.add(ReplaceOne({"user_id": user_doc["user_id"]}, user_doc, upsert=True))
+        else:
+            writer.add(InsertOne(user_doc))
+        rollup.add(user_doc["history"])
+    writer.flush()
+    progress.report("done:")
 
-    # 4. Merge and Transform
-    merged_data = []
-    
-    for user in users:
-        user_id = user.get('user_id')
-        user_history = history_by_user.get(user_id, [])
-        
-        # Calculate Aggregates
-        total_watch_time = 0
-        formatted_history = []
-        formatted_ratings = []
-        
-        # Category tracking for preferences
-        category_counts = {g: 0 for g in GENRES} 
-        
-        for h in user_history:
-            # Watch Time
-            count = h.get('watch_count', 1)
-            duration = count * AVG_DURATION_MINS
-            total_watch_time += duration
-            
-            # History Item
-            history_item = {
-                "title": h.get("Title"),
-                "platform": h.get("platform", "Unknown"),
-                "date": h.get("watch_date"),
-                "watched_duration_mins": duration
-            }
-            formatted_history.append(history_item)
-            
-            # Rating Item (if rated)
-            rating = h.get("user_rating")
-            if rating:
-                formatted_ratings.append({
-                    "title": h.get("Title"),
-                    "rating": rating,
-                    "review": "Enjoyed watching this!" if rating >= 4 else "It was okay." if rating == 3 else "Not my type."
-                })
-            
-            # Infer Genre (Randomly assigned for seed since not in source)
-            # In a real scenario, we'd lookup the title in a content DB.
-            # Here we assign a random genre to "simulate" preferences based on watch history
-            assigned_genre = random.choice(GENRES) 
-            category_counts[assigned_genre] += 1
-
-        # Determine Top Preferences
-        sorted_genres = sorted(category_counts.items(), key=lambda item: item[1], reverse=True)
-        top_preferences = [g[0] for g in sorted_genres if g[1] > 0][:3]
-        if not top_preferences: top_preferences = random.sample(GENRES, 3)
-
-        # Construct Final Object
-        user_doc = {
-            "user_id": user_id, # Keep original ID for reference
-            "username": user.get("username"),
-            "email": user.get("email"),
-            "full_name": user.get("username").replace(" ", "").capitalize(), # Simple name derivation
-            "joined_date": transform_date(user.get("created_at")),
-            "subscription_tier": user.get("subscription_plan", "Free"),
-            "preferences": top_preferences,
-            "total_watch_time_mins": total_watch_time,
-            "history": formatted_history, # Store full history or limit if too large? 
-                                        # Storing all for now, as mongo doc limit is 16MB which is plenty for this
-            "ratings": formatted_ratings,
-            "account_status": "Active",
-            "last_login": datetime.now()
-        }
-        
-        merged_data.append(user_doc)
-
-    # 5. Seed Database
-    print(f"Preparing to insert {len(merged_data)} records...")
-    
-    # Clear existing data
-    collection.delete_many({})
-    print("Cleared existing user_analytics_data collection.")
-    
-    # Insert new data
-    if merged_data:
-        collection.insert_many(merged_data)
-        print(f"Successfully inserted {len(merged_data)} users into '{COLLECTION_NAME}'.")
-    else:
+    if progress.count == 0:
+        staging.drop()
         print("No data to insert.")
+        return
+
+    # 3. Atomically replace the live collection; readers never see it empty or half-seeded
+    staging.rename(COLLECTION_NAME, dropTarget=True)
+    print(f"Successfully seeded {writer.upserted + writer.inserted} users into '{COLLECTION_NAME}' (swapped in from '{STAGING_COLLECTION_NAME}').")
+    # The swap replaced every user's history, so the history minutes start over from this load
+    reset_history_minutes()
+    print(f"Rolled up watch time into {rollup.flush()} platform traffic buckets.")
 
 if __name__ == "__main__":
     main()
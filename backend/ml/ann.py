@@ -0,0 +1,208 @@
+"""
+Approximate nearest-neighbour backends for the recommender.
+
+Selected with RECOMMENDER_INDEX:
+    exact  (default) full mat-vec over every row
+    ivf    inverted-file index in pure NumPy: k-means coarse quantizer, only the
+           RECOMMENDER_IVF_PROBE closest of RECOMMENDER_IVF_LISTS lists are scanned
+    hnsw   hnswlib graph index, if the optional hnswlib package is installed
+
+Recall/latency knobs: more probes (ivf) or a larger ef (hnsw) give higher
+recall at higher latency. bench_ann.py reports recall@10 against exact search.
+"""
+import os
+import copy
+import numpy as np
+
+INDEX_BACKEND = os.getenv("RECOMMENDER_INDEX", "exact").lower()
+IVF_LISTS = int(os.getenv("RECOMMENDER_IVF_LISTS", "0"))  # 0 -> 4 * sqrt(N)
+IVF_PROBE = int(os.getenv("RECOMMENDER_IVF_PROBE", "16"))
+HNSW_M = int(os.getenv("RECOMMENDER_HNSW_M", "16"))
+HNSW_EF = int(os.getenv("RECOMMENDER_HNSW_EF", "64"))
+
+KMEANS_SAMPLE = 100_000
+KMEANS_ITERS = 10
+ASSIGN_CHUNK = 65_536
+
+def assign_lists(features, centroids):
+    """Nearest centroid (max inner product) for every row, in chunks to bound memory"""
+    out = np.empty(len(features), dtype=np.int32)
+    for start in range(0, len(features), ASSIGN_CHUNK):
+        block = np.asarray(features[start:start + ASSIGN_CHUNK], dtype=np.float32)
+        out[start:start + len(block)] = (block @ centroids.T).argmax(axis=1)
+    return out
+
+class IVFIndex:
+    """Inverted-file index over L2-normalised rows (spherical k-means)"""
+
+    name = "ivf"
+
+    def __init__(self, n_lists: int = IVF_LISTS, n_probe: int = IVF_PROBE, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.centroids = None
+        self.assignments = None
+        self.lists = []
+
+    def build(self, features):
+        n = len(features)
+        n_lists = self.n_lists or max(1, int(4 * np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        rng = np.random.default_rng(self.seed)
+
+        # 1. Train centroids on a sample
+        sample_ids = rng.choice(n, size=min(n, KMEANS_SAMPLE), replace=False)
+        sample = np.asarray(features[np.sort(sample_ids)], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERS):
+            labels = (sample @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+        self.centroids = centroids
+
+        # 2. Assign every row and bucket ids per list
+        self._set_assignments(assign_lists(features, centroids))
+        return self
+
+    def _set_assignments(self, assignments):
+        self.assignments = np.asarray(assignments, dtype=np.int32)
+        order = np.argsort(self.assignments, kind="stable").astype(np.int32)
+        bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+
+    def to_arrays(self) -> dict:
+        return {"ivf_centroids": self.centroids, "ivf_assignments": self.assignments}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, n_probe: int = IVF_PROBE):
+        index = cls(n_lists=len(arrays["ivf_centroids"]), n_probe=n_probe)
+        index.centroids = np.asarray(arrays["ivf_centroids"], dtype=np.float32)
+        index._set_assignments(arrays["ivf_assignments"])
+        return index
+
+    def candidates(self, query):
+        probe = min(self.n_probe, len(self.centroids))
+        cscores = self.centroids @ query
+        nearest = np.argpartition(-cscores, probe - 1)[:probe]
+        return np.sort(np.concatenate([self.lists[c] for c in nearest]))
+
+    def search(self, features, query, k: int):
+        """(ids, scores) of the approximate top-k rows for a normalised query vector"""
+        from ml.recommender import top_k_indices
+        ids = self.candidates(query)
+        scores = features[ids] @ query
+        top = top_k_indices(scores, k)
+        return ids[top], scores[top]
+
+    def copy(self):
+        """Independent copy for copy-on-write updates (list arrays are replaced, never modified)"""
+        index = copy.copy(self)
+        index.assignments = self.assignments.copy()
+        index.lists = list(self.lists)
+        return index
+
+    def upsert(self, i: int, vec):
+        """Place row i in the list of its nearest centroid (for incremental updates)"""
+        if i >= len(self.assignments):
+            grown = np.full(i + 1, -1, dtype=np.int32)
+            grown[:len(self.assignments)] = self.assignments
+            self.assignments = grown
+        self.remove(i)
+        c = int((self.centroids @ vec).argmax())
+        self.assignments[i] = c
+        self.lists[c] = np.insert(self.lists[c], np.searchsorted(self.lists[c], i), i)
+
+    def upsert_many(self, ids, vecs):
+        """upsert() for a batch of rows, regrouping the lists once"""
+        ids = np.asarray(ids, dtype=np.intp)
+        if len(ids) == 0:
+            return
+        if ids.max() >= len(self.assignments):
+            grown = np.full(ids.max() + 1, -1, dtype=np.int32)
+            grown[:len(self.assignments)] = self.assignments
+            self.assignments = grown
+        self.assignments[ids] = (np.asarray(vecs, dtype=np.float32) @ self.centroids.T).argmax(axis=1)
+        self._set_assignments(self.assignments)
+
+    def remove(self, i: int):
+        c = self.assignments[i]
+        if c >= 0:
+            self.lists[c] = self.lists[c][self.lists[c] != i]
+            self.assignments[i] = -1
+
+    def widen(self, features):
+        """New feature columns (e.g. a new genre) are zero in every centroid"""
+        extra = features.shape[1] - self.centroids.shape[1]
+        if extra > 0:
+            self.centroids = np.hstack([self.centroids, np.zeros((len(self.centroids), extra), dtype=np.float32)])
+
+class HNSWIndex:
+    """Thin wrapper over hnswlib (optional dependency)"""
+
+    name = "hnsw"
+
+    def __init__(self, m: int = HNSW_M, ef: int = HNSW_EF):
+        import hnswlib
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef = ef
+        self.index = None
+
+    def build(self, features):
+        features = np.asarray(features, dtype=np.float32)
+        self.index = self._hnswlib.Index(space="ip", dim=features.shape[1])
+        self.index.init_index(max_elements=max(1, len(features) * 2), M=self.m, ef_construction=max(self.ef, 100))
+        self.index.add_items(features, np.arange(len(features)))
+        self.index.set_ef(self.ef)
+        return self
+
+    def search(self, features, query, k: int):
+        from ml.recommender import top_k_indices
+        k = min(k, self.index.get_current_count())
+        self.index.set_ef(max(self.ef, k))
+        labels, _ = self.index.knn_query(np.asarray(query, dtype=np.float32), k=k)
+        # Re-score against the caller's matrix so rescaled rows are ranked consistently. The graph is
+        # shared between snapshots, so it may hold rows appended after that matrix was taken.
+        ids = labels[0].astype(np.intp)
+        ids = ids[ids < len(features)]
+        scores = features[ids] @ query
+        top = top_k_indices(scores, k)
+        return ids[top], scores[top]
+
+    def copy(self):
+        """Snapshots share the hnswlib graph (it cannot be copied cheaply); widen() replaces it per copy"""
+        return copy.copy(self)
+
+    def upsert(self, i: int, vec):
+        self.upsert_many([i], [vec])
+
+    def upsert_many(self, ids, vecs):
+        if len(ids) == 0:
+            return
+        if max(ids) >= self.index.get_max_elements():
+            self.index.resize_index((max(ids) + 1) * 2)
+        self.index.add_items(np.asarray(vecs, dtype=np.float32), list(ids))
+
+    def remove(self, i: int):
+        self.index.mark_deleted(i)
+
+    def widen(self, features):
+        """hnswlib indexes have a fixed dimension, so a new feature column means a rebuild"""
+        if features.shape[1] != self.index.dim:
+            self.build(features)
+
+def make_index(backend: str = INDEX_BACKEND):
+    """Index instance for the configured backend, or None for exact search.
+    Raises ImportError for the hnsw backend when hnswlib is not installed."""
+    if backend == "ivf":
+        return IVFIndex()
+    if backend == "hnsw":
+        try:
+            return HNSWIndex()
+        except ImportError as e:
+            raise ImportError("RECOMMENDER_INDEX=hnsw needs hnswlib (pip install hnswlib); use ivf without it") from e
+    return None
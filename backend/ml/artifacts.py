@@ -0,0 +1,88 @@
+"""
+On-disk recommender artifacts.
+
+An artifact is a directory of .npy arrays plus a meta.json, named after the
+schema version and the catalog version (see services/catalog.py) it was built from:
+
+    ml/artifacts/v1-<catalog version>/
+        meta.json
+        features.npy, year.npy, imdb.npy, platforms.npy, ...
+        <column>.blob.npy + <column>.offsets.npy   (UTF-8 string columns)
+
+Arrays are opened with mmap_mode="r", so every worker on a host shares the
+same page-cache copy instead of holding a private one.
+"""
+import os
+import json
+import shutil
+import tempfile
+from datetime import datetime
+import numpy as np
+
+SCHEMA_VERSION = 1
+ARTIFACT_ROOT = os.getenv("RECOMMENDER_ARTIFACT_DIR", os.path.join(os.path.dirname(__file__), "artifacts"))
+
+def artifact_name(catalog_version: str) -> str:
+    return f"v{SCHEMA_VERSION}-{catalog_version}"
+
+def encode_strings(values):
+    """Pack a list of strings into a UTF-8 byte blob and an offsets array (None -> '')"""
+    encoded = [(v if isinstance(v, str) else "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+def decode_strings(blob, offsets):
+    raw = bytes(blob)
+    bounds = offsets.tolist()
+    return [raw[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+def save(name: str, arrays: dict, strings: dict, meta: dict, root: str = ARTIFACT_ROOT) -> str:
+    """Write an artifact to a temp directory and rename it into place"""
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{name}-", dir=root)
+    try:
+        for key, arr in arrays.items():
+            np.save(os.path.join(tmp, f"{key}.npy"), np.ascontiguousarray(arr), allow_pickle=False)
+        for key, values in strings.items():
+            blob, offsets = encode_strings(values)
+            np.save(os.path.join(tmp, f"{key}.blob.npy"), blob, allow_pickle=False)
+            np.save(os.path.join(tmp, f"{key}.offsets.npy"), offsets, allow_pickle=False)
+
+        meta = dict(meta, schema=SCHEMA_VERSION, name=name, built_at=datetime.utcnow().isoformat())
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        final = os.path.join(root, name)
+        if os.path.exists(final):
+            shutil.rmtree(final)
+        os.rename(tmp, final)
+        return final
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+def load(name: str, root: str = ARTIFACT_ROOT):
+    """Memory-map an artifact. Returns (arrays, strings, meta) or None if missing or stale."""
+    path = os.path.join(root, name)
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("schema") != SCHEMA_VERSION:
+        return None
+
+    arrays, strings = {}, {}
+    for filename in os.listdir(path):
+        if not filename.endswith(".npy"): continue
+        key = filename[:-len(".npy")]
+        arr = np.load(os.path.join(path, filename), mmap_mode="r")
+        if key.endswith(".blob"):
+            column = key[:-len(".blob")]
+            offsets = np.load(os.path.join(path, f"{column}.offsets.npy"))
+            strings[column] = decode_strings(arr, offsets)
+        elif not key.endswith(".offsets"):
+            arrays[key] = arr
+    return arrays, strings, meta
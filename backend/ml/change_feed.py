@@ -0,0 +1,62 @@
+"""
+Feeds admin content changes into the in-memory recommender.
+
+Admin routes apply each write directly, so the worker that served it sees the
+change immediately. With RECOMMENDER_CHANGE_STREAM=1 every worker also tails a
+MongoDB change stream on the content collection (requires a replica set), so
+the other workers pick up the same change within about a second. Applying a
+change twice is harmless: upserts and deletes are keyed by the document _id.
+Every worker also replays the whole content collection when it loads, so it
+knows the row of each document and deletes map to rows without pre-images.
+
+The watcher is an asyncio task on the async (Motor) client; each change is
+applied to the recommender in a worker thread.
+"""
+import os
+import asyncio
+from database import adb
+from ml.recommender import engine
+
+CHANGE_STREAM_ENABLED = os.getenv("RECOMMENDER_CHANGE_STREAM", "0") == "1"
+
+def apply_content_event(event: dict):
+    """Apply one change stream event to the recommender"""
+    op = event.get("operationType")
+    doc_id = str(event["documentKey"]["_id"])
+    if op in ("insert", "replace", "update"):
+        doc = event.get("fullDocument")
+        if doc:
+            engine.upsert_content(doc_id, doc)
+    elif op == "delete":
+        before = event.get("fullDocumentBeforeChange") or {}
+        engine.remove_content(doc_id, before.get("title"))
+
+async def watch_content_changes():
+    resume_token = None
+    while True:
+        try:
+            async with adb.content.watch(
+                full_document="updateLookup",
+                full_document_before_change="whenAvailable",
+                resume_after=resume_token,
+                max_await_time_ms=1000,
+            ) as stream:
+                async for event in stream:
+                    resume_token = stream.resume_token
+                    try:
+                        await asyncio.to_thread(apply_content_event, event)
+                    except Exception as e:
+                        print(f"Error applying content change {event.get('documentKey')}: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Content change stream error (retrying in 5s): {e}")
+            await asyncio.sleep(5)
+
+def start_change_stream():
+    """Start the watcher task if enabled. Returns the task (cancel it to stop), or None."""
+    if not CHANGE_STREAM_ENABLED or adb.content is None:
+        return None
+    task = asyncio.create_task(watch_content_changes(), name="content-change-stream")
+    print("Recommender change stream started")
+    return task
@@ -1,193 +1,608 @@
+import json
+import asyncio
+import hashlib
+import threading
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler, normalize
-from database import content_collection
+from database import content_collection, content_deletions_collection
+from ml import artifacts
+from ml.ann import IVFIndex, make_index
+from ml.title_index import TitleIndex
+from services.catalog import current_catalog, content_to_row, logical_frame, as_number, base_version
+
+PLATFORMS = ['Netflix', 'Hulu', 'Prime Video', 'Disney+']
+# Catalog columns a snapshot keeps (the same ones content_to_row produces)
+ROW_COLUMNS = ['Title', 'Year', 'IMDb', 'Genres', 'Directors', 'Type'] + PLATFORMS
+# A batch touching more than 1/REINDEX_FRACTION of the rows rebuilds the title index instead of
+# updating it row by row (each incremental add/remove is O(N))
+REINDEX_FRACTION = 32
+# top_k_rows reads its per-row threshold off a strided sample of about TOP_K_SAMPLE * k columns
+TOP_K_SAMPLE = 512
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first.
+
+    Uses argpartition so only the winners are sorted. Ties are broken by
+    ascending index, which matches a stable descending sort of the full row.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    part = np.argpartition(-scores, k - 1)[:k]
+    # Pull in every item tied with the k-th score so the tie-break is deterministic
+    candidates = np.flatnonzero(scores >= scores[part].min())
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]]
+
+def read_catalog(catalog=None) -> pd.DataFrame:
+    """Private, mutable copy of a catalog version (default: the current one) for feature building"""
+    return logical_frame((current_catalog() if catalog is None else catalog).frame())
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """top_k_indices for every row of a 2-D score block at once, as an (n_rows, k) array.
+
+    One partition over axis 1 of a strided column sample gives each row a threshold
+    that is never above its k-th best score (the k-th best of a subset can't be), so
+    only the few entries at or above it are sorted. Same order and tie-break as top_k_indices.
+    """
+    n_rows, n = scores.shape
+    k = min(k, n)
+    if k <= 0 or n_rows == 0:
+        return np.empty((n_rows, max(k, 0)), dtype=np.intp)
+    step = max(1, n // (TOP_K_SAMPLE * k))
+    threshold = np.partition(scores[:, ::step], -k, axis=1)[:, -k]
+    rows, cols = np.divmod(np.flatnonzero(scores >= threshold[:, None]), n)
+    order = np.lexsort((cols, -scores[rows, cols], rows))
+    rows, cols = rows[order], cols[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    return cols[rank < k].reshape(n_rows, k)
 
 class Recommender:
+    """One immutable snapshot of the recommender: feature matrix, result columns and indexes.
+
+    Readers take a snapshot from RecommenderEngine.current() and use only it, so a
+    concurrent load or admin change (which builds a new snapshot and swaps the
+    engine's reference) never shows them a half-updated state."""
+
     def __init__(self):
         self.df = None
-        self.similarity_matrix = None
-        self.load_data()
-
-    def load_data(self):
-        """Load movie dataset from multiple JSON sources and build similarity matrix"""
-        try:
-            import os
-            import json
-            
-            # Resolve paths
-            BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            FINAL_DF_PATH = os.path.join(BASE_DIR, "final_df_cleaned.json")
-            NEW_DATA_PATH = os.path.join(BASE_DIR, "new_data.json")
-            
-            # 1. Load Main Dataset
-            if not os.path.exists(FINAL_DF_PATH):
-                print(f"Warning: Dataset file not found at {FINAL_DF_PATH}")
-                self.df = pd.DataFrame()
-                return
+        # Row-normalised float32 feature matrix (N x D). Cosine similarity of item i
+        # against the catalog is a single mat-vec: features @ features[i].
+        # Memory is O(N*D) instead of the O(N^2) of a precomputed similarity matrix.
+        self.features = None
+        # Optional approximate index (ml/ann.py); None means exact search
+        self.ann = None
+        # Name of the artifact (or in-process build) this snapshot serves, and the
+        # catalog version it was built from
+        self.version = None
+        self.catalog_version = None
+        self.meta = {}
+        # (etag, JSON bytes) of the curated lists, computed once per snapshot
+        self._curated = None
+        self.revision = 0
 
-            with open(FINAL_DF_PATH, 'r', encoding='utf-8') as f:
-                data_main = json.load(f)
-            
-            df_main = pd.DataFrame(data_main)
-
-            # 2. Load New Data (2021-2025)
-            df_new = pd.DataFrame()
-            if os.path.exists(NEW_DATA_PATH):
-                with open(NEW_DATA_PATH, 'r', encoding='utf-8') as f:
-                    data_new = json.load(f)
-                
-                # Normalize new data structure to match main df
-                normalized_new = []
-                for item in data_new:
-                    entry = {
-                        "Title": item.get("title"),
-                        "Year": item.get("year"),
-                        "Type": item.get("type", "Movie").lower(),
-                        "IMDb": item.get("imdb_rating", 0),
-                        "Genres": "Drama", # Default genre if missing
-                        "Directors": "Unknown",
-                        "Country": "Unknown",
-                        "Language": "English",
-                        "Runtime": 0,
-                        "Netflix": 1 if item.get("platform") == "Netflix" else 0,
-                        "Hulu": 1 if item.get("platform") == "Hulu" else 0,
-                        "Prime Video": 1 if item.get("platform") == "Prime Video" else 0,
-                        "Disney+": 1 if item.get("platform") == "Disney+" else 0,
-                        "Rotten Tomatoes": None
-                    }
-                    normalized_new.append(entry)
-                
-                df_new = pd.DataFrame(normalized_new)
-                print(f"Loaded {len(df_new)} new items from new_data.json")
-
-            # 3. Merge Datasets
-            self.df = pd.concat([df_main, df_new], ignore_index=True)
-            
-            if self.df.empty:
-                print("Warning: Combined dataset is empty.")
-                return
+    def is_empty(self):
+        return self.df is None or self.df.empty
 
-            # Preprocessing fields into vectors
-            # 1. Genre similarity (40%) - Multi-hot encoding
-            self.df['Genres'] = self.df['Genres'].fillna('')
-            genre_matrix = self.df['Genres'].str.get_dummies(sep=',')
-            genre_matrix_norm = normalize(genre_matrix)
-            
-            # 2. IMDb similarity (30%) - Scaling scores
-            scaler = MinMaxScaler()
-            self.df['IMDb'] = pd.to_numeric(self.df['IMDb'], errors='coerce').fillna(0)
-            imdb_scaled = scaler.fit_transform(self.df['IMDb'].values.reshape(-1, 1))
-            
-            # 3. Platform similarity (20%) - Multi-hot
-            platforms = ['Netflix', 'Hulu', 'Prime Video', 'Disney+']
-            for p in platforms:
-                if p not in self.df.columns:
-                    self.df[p] = 0
-                self.df[p] = pd.to_numeric(self.df[p], errors='coerce').fillna(0).astype(int)
-            
-            platform_matrix = self.df[platforms].values
-            platform_matrix_norm = normalize(platform_matrix) if platform_matrix.any() else platform_matrix
-            
-            # 4. Year proximity (10%) - Scaling release year
-            self.df['Year'] = pd.to_numeric(self.df['Year'], errors='coerce').fillna(0)
-            year_scaled = scaler.fit_transform(self.df['Year'].values.reshape(-1, 1))
-            
-            # Combine weighted features
-            v_genre = genre_matrix_norm * np.sqrt(0.40)
-            v_imdb = imdb_scaled * np.sqrt(0.30)
-            v_platform = platform_matrix_norm * np.sqrt(0.20)
-            v_year = year_scaled * np.sqrt(0.10)
-            
-            combined_features = np.hstack([v_genre, v_imdb, v_platform, v_year])
-            
-            # Generate similarity matrix
-            self.similarity_matrix = cosine_similarity(combined_features)
-            print(f"Successfully loaded recommendation engine with {len(self.df)} total items.")
-            
+    def load_data(self, catalog=None):
+        """Load the shared catalog and build the feature matrix"""
+        try:
+            self.build(read_catalog(catalog))
         except Exception as e:
             print(f"Error initializing recommender: {str(e)}")
             self.df = pd.DataFrame()
 
-    def get_recommendations(self, title: str, limit: int = 10):
-        """Return top N recommended movies based on similarity score"""
-        if self.df is None or self.df.empty or self.similarity_matrix is None:
-            return []
+    def build(self, df: pd.DataFrame):
+        """Preprocess a combined catalog DataFrame into feature vectors and result columns"""
+        from sklearn.preprocessing import MinMaxScaler, normalize
+
+        self.df = df
+        if self.df.empty:
+            print("Warning: Combined dataset is empty.")
+            return
+
+        # Missing text fields are stored as '' in artifacts; match that here
+        for col in ['Directors', 'Type']:
+            if col in self.df.columns:
+                self.df[col] = self.df[col].fillna('')
+
+        # Preprocessing fields into vectors
+        # 1. Genre similarity (40%) - Multi-hot encoding
+        self.df['Genres'] = self.df['Genres'].fillna('')
+        # Titles without genres must not share an empty-string genre column (str-dtype columns produce one)
+        genre_matrix = self.df['Genres'].str.get_dummies(sep=',').drop(columns='', errors='ignore')
+        genre_matrix_norm = normalize(genre_matrix)
         
-        # Primary search: Exact match (case-insensitive)
-        indices = self.df.index[self.df['Title'].str.lower() == title.lower()].tolist()
+        # 2. IMDb similarity (30%) - Scaling scores
+        scaler = MinMaxScaler()
+        self.df['IMDb'] = pd.to_numeric(self.df['IMDb'], errors='coerce').fillna(0)
+        imdb_scaled = scaler.fit_transform(self.df['IMDb'].values.reshape(-1, 1))
         
-        # Fallback: Substring match
-        if not indices:
-            indices = self.df.index[self.df['Title'].str.contains(title, case=False, na=False)].tolist()
+        # 3. Platform similarity (20%) - Multi-hot
+        for p in PLATFORMS:
+            if p not in self.df.columns:
+                self.df[p] = 0
+            self.df[p] = pd.to_numeric(self.df[p], errors='coerce').fillna(0).astype(int)
         
-        if not indices:
-            return [] # Title not found
-            
-        # Use only the first match found
-        idx = indices[0]
+        platform_matrix = self.df[PLATFORMS].values
+        platform_matrix_norm = normalize(platform_matrix) if platform_matrix.any() else platform_matrix
+        
+        # 4. Year proximity (10%) - Scaling release year
+        self.df['Year'] = pd.to_numeric(self.df['Year'], errors='coerce').fillna(0)
+        year_scaled = scaler.fit_transform(self.df['Year'].values.reshape(-1, 1))
         
-        # Get similarity scores for this movie index
-        sim_scores = list(enumerate(self.similarity_matrix[idx]))
+        # Combine weighted features
+        v_genre = genre_matrix_norm * np.sqrt(0.40)
+        v_imdb = imdb_scaled * np.sqrt(0.30)
+        v_platform = platform_matrix_norm * np.sqrt(0.20)
+        v_year = year_scaled * np.sqrt(0.10)
         
-        # Sort by similarity score descending
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+        combined_features = np.hstack([v_genre, v_imdb, v_platform, v_year])
         
-        # Filter out the title itself and take top 'limit' results
-        recommendations = []
-        for i, score in sim_scores:
-            if i == idx: continue
-            if len(recommendations) >= limit: break
-            
-            row = self.df.iloc[i]
-            # Consolidate platform availability
-            available_platforms = [p for p in ['Netflix', 'Hulu', 'Prime Video', 'Disney+'] if row.get(p) == 1]
-            
-            recommendations.append({
-                "title": row.get('Title', 'Unknown'),
-                "platform": ", ".join(available_platforms) if available_platforms else "None",
-                "imdb_rating": float(row.get('IMDb', 0)),
-                "release_year": int(row.get('Year', 0)),
+        # L2-normalise rows once so a dot product equals cosine similarity
+        self.features = normalize(combined_features).astype(np.float32)
+        self.meta = {
+            "items": len(self.df),
+            "feature_dim": int(self.features.shape[1]),
+            "genres": [str(g) for g in genre_matrix.columns],
+            "imdb_range": [float(self.df['IMDb'].min()), float(self.df['IMDb'].max())],
+            "year_range": [float(self.df['Year'].min()), float(self.df['Year'].max())],
+        }
+
+        # Result columns as plain arrays so serving never touches pandas rows
+        self.build_columns()
+        self.init_ann()
+        print(f"Successfully loaded recommendation engine with {len(self.df)} total items.")
+
+    def build_columns(self, title_index: TitleIndex = None):
+        """Precompute the per-item fields returned by get_recommendations"""
+        flags = self.df[PLATFORMS].values == 1
+        # Object arrays: indexing pandas' Arrow-backed string arrays costs a pyarrow take per call
+        self._titles = self.df['Title'].to_numpy(dtype=object)
+        self._imdb = self.df['IMDb'].values.astype(float)
+        self._year = self.df['Year'].values.astype(int)
+        self._platform_labels = np.array(
+            [", ".join(p for p, on in zip(PLATFORMS, row) if on) or "None" for row in flags],
+            dtype=object
+        )
+        self.title_index = title_index or TitleIndex(self._titles)
+        self.init_layout()
+
+    def init_layout(self):
+        """Column positions in the feature matrix: [genres | imdb | platforms | year]"""
+        genres = self.meta.get("genres", [])
+        g = len(genres)
+        self._genre_cols = {genre: i for i, genre in enumerate(genres)}
+        self._imdb_col = g
+        self._platform_cols = np.arange(g + 1, g + 1 + len(PLATFORMS))
+        self._year_col = g + 1 + len(PLATFORMS)
+        self._imdb_range = list(self.meta.get("imdb_range", [0.0, 0.0]))
+        self._year_range = list(self.meta.get("year_range", [0.0, 0.0]))
+        # Incremental update state: tombstoned rows, Mongo _id -> row, rows appended for
+        # admin documents (every other row is a catalog row), and how many catalog rows
+        # are loaded (catalog deltas are appended after them, possibly after admin rows)
+        self._dead = np.empty(0, dtype=np.intp)
+        self._doc_rows = {}
+        self._added = set()
+        self.catalog_size = len(self.df)
+
+    def init_ann(self, arrays: dict = None):
+        """Build (or restore from artifact arrays) the configured approximate index, if any"""
+        self.ann = make_index()
+        if self.ann is None:
+            return
+        if isinstance(self.ann, IVFIndex) and arrays and "ivf_centroids" in arrays:
+            self.ann = IVFIndex.from_arrays(arrays)
+        else:
+            self.ann.build(self.features)
+        print(f"Recommender using {self.ann.name} index")
+
+    def save_artifact(self, name: str, root: str = artifacts.ARTIFACT_ROOT) -> str:
+        """Persist features, title index and result columns as a memory-mappable artifact"""
+        arrays = {
+            "features": self.features,
+            "imdb": self.df['IMDb'].values.astype(np.float64),
+            "year": self.df['Year'].values.astype(np.int64),
+            "platforms": self.df[PLATFORMS].values.astype(np.int8),
+        }
+        arrays.update(self.title_index.to_arrays())
+        if isinstance(self.ann, IVFIndex):
+            arrays.update(self.ann.to_arrays())
+        strings = {col.lower(): self.df[col].tolist() for col in ['Title', 'Genres', 'Directors', 'Type'] if col in self.df.columns}
+        return artifacts.save(name, arrays, strings, self.meta, root=root)
+
+    def load_artifact(self, arrays: dict, strings: dict, meta: dict):
+        """Serve from a memory-mapped artifact instead of rebuilding features"""
+        columns = {
+            "Title": strings["title"],
+            "Year": arrays["year"],
+            "IMDb": arrays["imdb"],
+            "Genres": strings.get("genres", [""] * len(arrays["year"])),
+            "Directors": strings.get("directors", [""] * len(arrays["year"])),
+            "Type": strings.get("type", [""] * len(arrays["year"])),
+        }
+        for i, p in enumerate(PLATFORMS):
+            columns[p] = arrays["platforms"][:, i]
+        self.df = pd.DataFrame(columns)
+        self.features = arrays["features"]
+        self.meta = meta
+        self.version = meta["name"]
+        self.build_columns(TitleIndex.from_arrays(strings["title"], arrays))
+        self.init_ann(arrays)
+        print(f"Loaded recommender artifact {self.version} with {len(self.df)} items.")
+
+    # --- Incremental updates (admin content changes) ---
+    # Only ever applied to a snapshot no reader can see yet: a fresh load, or a clone().
+
+    def clone(self):
+        """Copy of this snapshot whose mutable state can be changed without affecting readers"""
+        fresh = Recommender.__new__(Recommender)
+        fresh.__dict__.update(self.__dict__)
+        fresh.df = self.df.copy()
+        fresh.features = np.array(self.features)
+        for attr in ("_titles", "_imdb", "_year", "_platform_labels"):
+            setattr(fresh, attr, getattr(self, attr).copy())
+        fresh._genre_cols = dict(self._genre_cols)
+        fresh._doc_rows = dict(self._doc_rows)
+        fresh._added = set(self._added)
+        fresh.title_index = self.title_index.copy()
+        fresh.ann = self.ann.copy() if self.ann is not None else None
+        fresh._curated = None
+        return fresh
+
+    def _resolve(self, doc_id: str, title, claimed=()):
+        """Row a content document maps to: its own row, else an unclaimed catalog row with the same title"""
+        i = self._doc_rows.get(doc_id)
+        if i is None and title:
+            i = self.title_index.exact(title)
+            if i is not None and (i in self._added or i in claimed):
+                i = None
+        return i
+
+    def apply_upsert(self, doc_id: str, doc: dict):
+        if self.is_empty() or self.features is None:
+            return
+        claimed = set(self._doc_rows.values())
+        i = self._resolve(doc_id, doc.get("title"), claimed)
+        self._doc_rows[doc_id] = self._upsert_rows([i], [content_to_row(doc)])[0]
+        self.revision += 1
+
+    def apply_delete(self, doc_id: str, title: str = None) -> bool:
+        """Tombstone a content document's row. True if that row came from the catalog."""
+        if self.is_empty() or self.features is None:
+            return False
+        i = self._resolve(doc_id, title, set(self._doc_rows.values()))
+        if i is None:
+            return False
+        self._remove_row(i)
+        self._doc_rows.pop(doc_id, None)
+        self.revision += 1
+        return i not in self._added
+
+    def replay(self, docs: list, deleted_titles: list = ()):
+        """Apply the whole admin content collection to a freshly loaded snapshot in one pass:
+        recorded deletions of catalog titles first, then every content document"""
+        if self.is_empty() or self.features is None:
+            return
+        for title in deleted_titles:
+            i = self.title_index.exact(title)
+            if i is not None and i not in self._added:
+                self._remove_row(i)
+        targets, rows, ids = [], [], []
+        claimed = set()
+        for doc in docs:
+            try:
+                doc_id, row = str(doc["_id"]), content_to_row(doc)
+                i = self._resolve(doc_id, row["Title"], claimed)
+            except Exception as e:
+                # One malformed document must not keep the engine from loading
+                print(f"Skipping content document {doc.get('_id')} in recommender replay: {e}")
+                continue
+            if i is not None:
+                claimed.add(i)
+            targets.append(i)
+            rows.append(row)
+            ids.append(doc_id)
+        if rows:
+            self._doc_rows.update(zip(ids, self._upsert_rows(targets, rows)))
+            self.revision += 1
+
+    def append_catalog(self, df: pd.DataFrame):
+        """Append catalog rows published after this snapshot was loaded (catalog deltas)"""
+        if self.is_empty() or self.features is None or df.empty:
+            return
+        df = df.reindex(columns=ROW_COLUMNS)
+        df[['Genres', 'Directors', 'Type']] = df[['Genres', 'Directors', 'Type']].fillna('')
+        df[PLATFORMS] = df[PLATFORMS].fillna(0).astype(int)
+        rows = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+        self._upsert_rows([None] * len(rows), rows, catalog=True)
+        self.revision += 1
+
+    def _make_writable(self):
+        # Artifact arrays are read-only memory maps; take a private copy on first write
+        if not self.features.flags.writeable:
+            self.features = np.array(self.features)
+
+    def _scale(self, values, value_range):
+        lo, hi = value_range
+        return (np.asarray(values, dtype=np.float64) - lo) / ((hi - lo) or 1.0)
+
+    def _rescale(self, imdb_range, year_range):
+        """Re-derive the IMDb/year columns of every row for new min/max ranges.
+
+        Each row is stored L2-normalised, so its raw norm is recovered from its blocks:
+        genres and platforms contribute their full weight when present, IMDb and year
+        their scaled values. O(N*D) vectorised work, no re-parsing of the catalog.
+        """
+        f = self.features
+        has_genre = (f[:, :self._imdb_col] != 0).any(axis=1) | (f[:, self._year_col + 1:] != 0).any(axis=1)
+        has_platform = (f[:, self._platform_cols] != 0).any(axis=1)
+        base = 0.40 * has_genre + 0.20 * has_platform
+
+        old_imdb, old_year = self._scale(self._imdb, self._imdb_range), self._scale(self._year, self._year_range)
+        new_imdb, new_year = self._scale(self._imdb, imdb_range), self._scale(self._year, year_range)
+        old_norm = np.sqrt(base + 0.30 * old_imdb ** 2 + 0.10 * old_year ** 2)
+        new_norm = np.sqrt(base + 0.30 * new_imdb ** 2 + 0.10 * new_year ** 2)
+
+        raw = f * old_norm[:, None]
+        raw[:, self._imdb_col] = np.sqrt(0.30) * new_imdb
+        raw[:, self._year_col] = np.sqrt(0.10) * new_year
+        raw[self._dead] = 0
+        self.features = (raw / np.where(new_norm > 0, new_norm, 1.0)[:, None]).astype(np.float32)
+        self._imdb_range, self._year_range = imdb_range, year_range
+
+    def _feature_rows(self, rows: list):
+        """Normalised feature vectors for catalog-shaped rows, built as one block"""
+        vecs = np.zeros((len(rows), self.features.shape[1]), dtype=np.float64)
+        for k, row in enumerate(rows):
+            genres = {g for g in row["Genres"].split(',') if g}
+            if genres:
+                vecs[k, [self._genre_cols[g] for g in genres]] = np.sqrt(0.40) / np.sqrt(len(genres))
+        vecs[:, self._imdb_col] = np.sqrt(0.30) * self._scale([row["IMDb"] for row in rows], self._imdb_range)
+        flags = np.array([[row[p] for p in PLATFORMS] for row in rows], dtype=np.float64)
+        flag_norms = np.linalg.norm(flags, axis=1)
+        vecs[:, self._platform_cols] = np.sqrt(0.20) * flags / np.where(flag_norms > 0, flag_norms, 1.0)[:, None]
+        vecs[:, self._year_col] = np.sqrt(0.10) * self._scale([row["Year"] for row in rows], self._year_range)
+        norms = np.linalg.norm(vecs, axis=1)
+        return (vecs / np.where(norms > 0, norms, 1.0)[:, None]).astype(np.float32)
+
+    def _upsert_rows(self, targets: list, rows: list, catalog: bool = False) -> list:
+        """Write several items at once; a None target appends a row (an admin row unless catalog
+        is set). Returns the row of each item."""
+        self._make_writable()
+        for row in rows:
+            row["IMDb"] = as_number(row["IMDb"])
+            row["Year"] = int(as_number(row["Year"]))
+        reindex = len(rows) > len(self._titles) // REINDEX_FRACTION
+
+        # 1. Unseen genres get new columns; existing rows are zero there, so their norms don't change
+        new_genres = [g for g in dict.fromkeys(g for row in rows for g in row["Genres"].split(','))
+                      if g and g not in self._genre_cols]
+        width = self.features.shape[1]
+        for n, g in enumerate(new_genres):
+            self._genre_cols[g] = width + n
+        if new_genres:
+            self.features = np.hstack([self.features, np.zeros((len(self.features), len(new_genres)), dtype=np.float32)])
+            if self.ann is not None:
+                self.ann.widen(self.features)
+
+        # 2. Values outside the current IMDb/year ranges rescale those two columns for all rows
+        imdb_range = [min([self._imdb_range[0]] + [r["IMDb"] for r in rows]), max([self._imdb_range[1]] + [r["IMDb"] for r in rows])]
+        year_range = [min([self._year_range[0]] + [r["Year"] for r in rows]), max([self._year_range[1]] + [r["Year"] for r in rows])]
+        if imdb_range != self._imdb_range or year_range != self._year_range:
+            self._rescale(imdb_range, year_range)
+
+        # 3. Write feature rows and result columns: replaced rows in place, new rows stacked once
+        vecs = self._feature_rows(rows)
+        labels = [", ".join(p for p in PLATFORMS if row[p] == 1) or "None" for row in rows]
+        out = list(targets)
+        replaced = [k for k, i in enumerate(targets) if i is not None]
+        added = [k for k, i in enumerate(targets) if i is None]
+        for k in replaced:
+            i = targets[k]
+            if not reindex:
+                self.title_index.remove(i)
+            self.features[i] = vecs[k]
+            self._titles[i], self._imdb[i], self._year[i], self._platform_labels[i] = rows[k]["Title"], rows[k]["IMDb"], rows[k]["Year"], labels[k]
+        if replaced:
+            rows_at = [targets[k] for k in replaced]
+            self._dead = self._dead[~np.isin(self._dead, rows_at)]
+            update = pd.DataFrame([rows[k] for k in replaced], index=rows_at)
+            for col in update.columns:
+                values = update[col].to_numpy()
+                if col in self.df.columns and pd.api.types.is_numeric_dtype(self.df[col].dtype):
+                    values = values.astype(self.df[col].dtype)
+                self.df.loc[rows_at, col] = values
+        if added:
+            first = len(self.df)
+            for n, k in enumerate(added):
+                out[k] = first + n
+            self.features = np.vstack([self.features, vecs[added]])
+            self._titles = np.append(self._titles, np.array([rows[k]["Title"] for k in added], dtype=object))
+            self._imdb = np.append(self._imdb, [rows[k]["IMDb"] for k in added])
+            self._year = np.append(self._year, [rows[k]["Year"] for k in added])
+            self._platform_labels = np.append(self._platform_labels, np.array([labels[k] for k in added], dtype=object))
+            self.df = pd.concat([self.df, pd.DataFrame([rows[k] for k in added], index=range(first, first + len(added)))])
+            if catalog:
+                self.catalog_size += len(added)
+            else:
+                self._added.update(range(first, first + len(added)))
+
+        # 4. Title and approximate indexes (appended rows must be added in row order)
+        if reindex:
+            titles = self._titles.copy()
+            titles[self._dead] = None
+            self.title_index = TitleIndex(titles)
+        else:
+            for k in sorted(range(len(rows)), key=lambda k: out[k]):
+                self.title_index.add(out[k], rows[k]["Title"])
+        if self.ann is not None:
+            self.ann.upsert_many(out, vecs)
+        return out
+
+    def _remove_row(self, i: int):
+        self._make_writable()
+        self.features[i] = 0
+        self.title_index.remove(i)
+        if self.ann is not None:
+            self.ann.remove(i)
+        if i not in self._dead:
+            self._dead = np.append(self._dead, i)
+
+    def similarity_scores(self, idx: int):
+        """Cosine similarity of item idx against every item in the catalog"""
+        return self.features @ self.features[idx]
+
+    def get_recommendations(self, title: str, limit: int = 10):
+        """Return top N recommended movies based on similarity score"""
+        if self.is_empty() or self.features is None:
+            return []
+        
+        # Exact (case-insensitive) match first, then the first substring match
+        idx = self.title_index.lookup(title)
+        if idx is None:
+            return [] # Title not found
+        
+        if self.ann is not None:
+            # Approximate path: only the probed candidates are scored (tombstones are not indexed)
+            ids, scores = self.ann.search(self.features, self.features[idx], limit + 1)
+            keep = ids != idx
+            return self.format_results(ids[keep][:limit], scores[keep][:limit])
+
+        # Score the catalog against this item and exclude the item itself
+        scores = self.similarity_scores(idx)
+        scores[idx] = -np.inf
+        scores[self._dead] = -np.inf
+        top = top_k_indices(scores, min(limit, len(scores) - 1))
+        top = top[np.isfinite(scores[top])]
+        return self.format_results(top, scores[top])
+
+    def get_batch_recommendations(self, titles, limit: int = 10, per_seed: bool = True, exclude_watched: bool = True):
+        """
+        Score several seed titles against the catalog with one matrix multiply.
+        Returns a per-seed list for each resolved seed plus a merged list where every
+        item keeps its best score and the seed that produced it ("because you watched").
+        """
+        result = {"seeds": [], "not_found": [], "per_seed": [], "merged": []}
+        if self.is_empty() or self.features is None:
+            return result
+
+        # 1. Resolve seeds, dropping duplicates but keeping request order
+        seed_ids = []
+        for title in titles:
+            idx = self.title_index.lookup(title)
+            if idx is None:
+                result["not_found"].append(title)
+            elif idx not in seed_ids:
+                seed_ids.append(idx)
+        if not seed_ids:
+            return result
+        seed_ids = np.array(seed_ids)
+        result["seeds"] = [self._titles[i] for i in seed_ids]
+
+        # 2. One (seeds x catalog) similarity block
+        scores = self.features[seed_ids] @ self.features.T
+
+        # 3. Each seed never recommends itself; optionally no seed recommends any watched seed
+        if exclude_watched:
+            scores[:, seed_ids] = -np.inf
+        else:
+            scores[np.arange(len(seed_ids)), seed_ids] = -np.inf
+        scores[:, self._dead] = -np.inf
+
+        # 4. Top items of every seed in one pass
+        top = top_k_rows(scores, limit)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        if per_seed:
+            items = self.format_results(top.ravel(), top_scores.ravel())
+            width = top.shape[1]
+            for n, (seed, finite) in enumerate(zip(result["seeds"], np.isfinite(top_scores))):
+                recs = [item for item, ok in zip(items[n * width:(n + 1) * width], finite) if ok]
+                result["per_seed"].append({"seed": seed, "recommendations": recs})
+
+        # 5. Merge: best score per item across seeds, attributed to the winning seed. An item in the
+        #    merged top-k is in the top-k of the seed that gives its best score, so only those compete.
+        candidates = np.unique(top)
+        block = scores[:, candidates]
+        best = block.max(axis=0)
+        pick = top_k_indices(best, limit)
+        pick = pick[np.isfinite(best[pick])]
+        merged = self.format_results(candidates[pick], best[pick])
+        for item, seed in zip(merged, block[:, pick].argmax(axis=0)):
+            item["because_you_watched"] = result["seeds"][seed]
+        result["merged"] = merged
+        return result
+
+    def format_results(self, indices, scores):
+        """Build recommendation dicts from the precomputed column arrays"""
+        return [
+            {
+                "title": title,
+                "platform": platform,
+                "imdb_rating": float(imdb),
+                "release_year": int(year),
                 "similarity_score": round(float(score) * 100, 2)
-            })
-            
-        return recommendations
+            }
+            for title, platform, imdb, year, score in zip(
+                self._titles[indices], self._platform_labels[indices],
+                self._imdb[indices], self._year[indices], scores
+            )
+        ]
 
     def get_curated_content(self):
         """Returns categorized curated content from the dataset"""
-        if self.df is None or self.df.empty:
+        if self.is_empty():
             return {}
+        return json.loads(self.curated_payload()[1])
+
+    def curated_payload(self):
+        """(etag, JSON bytes) of the curated lists; rebuilt only when the catalog or an admin change moves"""
+        curated = self._curated
+        if curated is None:
+            curated = self._curated = self.build_curated()
+        return curated
+
+    def build_curated(self):
+        if self.df is None or self.df.empty:
+            lists = {}
+        else:
+            lists = self.curated_lists(self.df.drop(index=self._dead) if len(self._dead) else self.df)
+        body = json.dumps(lists, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return f'"{hashlib.sha1(body).hexdigest()[:16]}"', body
 
+    def curated_lists(self, df: pd.DataFrame):
         # 1. Trending Now (New Releases 2024-2025 with High Rating)
-        trending = self.df[
-            (self.df['Year'] >= 2024) & 
-            (self.df['IMDb'] >= 7.5)
+        trending = df[
+            (df['Year'] >= 2024) & 
+            (df['IMDb'] >= 7.5)
         ].sort_values(by='IMDb', ascending=False).head(10)
 
         # 2. All-Time Top Rated (IMDb > 8.5)
-        top_rated = self.df[self.df['IMDb'] >= 8.5].sort_values(by='IMDb', ascending=False).head(10)
+        top_rated = df[df['IMDb'] >= 8.5].sort_values(by='IMDb', ascending=False).head(10)
 
         # 3. Netflix Exclusives (New & High Rated)
-        netflix = self.df[
-            (self.df['Netflix'] == 1) & 
-            (self.df['Year'] >= 2022) &
-            (self.df['IMDb'] >= 7.0)
+        netflix = df[
+            (df['Netflix'] == 1) & 
+            (df['Year'] >= 2022) &
+            (df['IMDb'] >= 7.0)
         ].sort_values(by='Year', ascending=False).head(10)
 
         def format_list(df_subset):
-            results = []
-            for _, row in df_subset.iterrows():
-                available_platforms = [p for p in ['Netflix', 'Hulu', 'Prime Video', 'Disney+'] if row.get(p) == 1]
-                results.append({
-                    "title": row.get('Title'),
-                    "year": int(row.get('Year', 0)),
-                    "imdb": float(row.get('IMDb', 0)),
-                    "platforms": available_platforms,
-                    "genres": str(row.get('Genres', '')).split(','),
-                    "directors": str(row.get('Directors', ''))
-                })
-            return results
+            flags = df_subset[PLATFORMS].to_numpy() == 1
+            return [
+                {
+                    "title": title,
+                    "year": int(year),
+                    "imdb": float(imdb),
+                    "platforms": [p for p, on in zip(PLATFORMS, row_flags) if on],
+                    "genres": str(genres).split(','),
+                    "directors": str(directors)
+                }
+                for title, year, imdb, row_flags, genres, directors in zip(
+                    df_subset['Title'].tolist(), df_subset['Year'].tolist(), df_subset['IMDb'].tolist(),
+                    flags, df_subset['Genres'].tolist(), df_subset['Directors'].tolist()
+                )
+            ]
 
         return {
             "trending_now": format_list(trending),
@@ -195,11 +610,182 @@ class Recommender:
             "netflix_new": format_list(netflix)
         }
 
+def load_admin_content():
+    """Admin content documents and the catalog titles admins deleted, for replay onto a fresh load"""
+    if content_collection is None:
+        return [], []
+    try:
+        docs = list(content_collection.find({}, {"title": 1, "platform": 1, "imdb": 1, "year": 1,
+                                                 "genres": 1, "type": 1, "directors": 1}).sort("_id", 1))
+        deleted = []
+        if content_deletions_collection is not None:
+            deleted = [d["title"] for d in content_deletions_collection.find({}, {"title": 1}).sort("_id", 1) if d.get("title")]
+        return docs, deleted
+    except Exception as e:
+        print(f"Error reading admin content for the recommender: {e}")
+        return [], []
+
+class RecommenderEngine:
+    """Serves the current Recommender snapshot.
+
+    A catalog load or an admin change builds a new snapshot off to the side and
+    publishes it with a single reference assignment; readers never take the lock.
+    Every load replays the content collection, so admin changes survive restarts
+    and reach workers started after them. Only the first load blocks requests; a
+    new catalog version is loaded on a background thread while the old snapshot
+    keeps serving, and admin changes made meanwhile are re-applied before it is published."""
+
+    def __init__(self):
+        self.state = Recommender()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._changes = []  # admin changes made while a reload is building its snapshot
+        self._failed_version = None
+
+    def ensure_loaded(self):
+        """Load lazily on first use and again whenever a new catalog version is published"""
+        catalog = current_catalog()
+        if self._loaded and self.state.catalog_version == catalog.version:
+            return
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.state = self._build(catalog)
+                    self._loaded = True
+            return
+        with self._lock:
+            if self._reloading or catalog.version in (self.state.catalog_version, self._failed_version):
+                return
+            self._reloading = True
+            self._changes = []
+        threading.Thread(target=self._reload, args=(catalog, self.state), name="recommender-reload", daemon=True).start()
+
+    def _reload(self, catalog, previous: Recommender):
+        try:
+            fresh = self._build(catalog, previous)
+        except Exception as e:
+            # Keep serving the loaded snapshot; the next catalog version (or a restart) retries
+            print(f"Recommender reload for catalog {catalog.version} failed: {e}")
+            with self._lock:
+                self._failed_version = catalog.version
+                self._reloading = False
+            return
+        with self._lock:
+            for change in self._changes:
+                change(fresh)
+            if self._changes:
+                fresh._curated = None
+            self.state = fresh
+            self._changes = []
+            self._reloading = False
+
+    def _build(self, catalog, previous: Recommender = None) -> Recommender:
+        """Snapshot for a catalog version. Catalog deltas ("<base>+<n>") are appended to a clone of
+        the previous snapshot when it has the same base, else to the base version's artifact; only
+        a version with no artifact at all is built in process. Fresh loads replay the admin content."""
+        if previous is not None and not previous.is_empty() and previous.catalog_version is not None \
+                and base_version(previous.catalog_version) == base_version(catalog.version) \
+                and previous.catalog_size <= len(catalog):
+            fresh = previous.clone()
+            fresh.append_catalog(read_catalog(catalog).iloc[fresh.catalog_size:])
+            fresh.catalog_version = catalog.version
+            fresh._curated = fresh.build_curated()
+            return fresh
+
+        fresh = Recommender()
+        loaded = None
+        names = list(dict.fromkeys([artifacts.artifact_name(catalog.version), artifacts.artifact_name(base_version(catalog.version))]))
+        for name in names:
+            try:
+                loaded = artifacts.load(name)
+            except Exception as e:
+                print(f"Error reading recommender artifact {name}: {e}")
+            if loaded is not None:
+                break
+        if loaded is not None:
+            fresh.load_artifact(*loaded)
+            if fresh.catalog_size < len(catalog):
+                fresh.append_catalog(read_catalog(catalog).iloc[fresh.catalog_size:])
+        else:
+            print(f"No recommender artifact {names[-1]}; building in process (run build_recommender.py to avoid this)")
+            fresh.load_data(catalog)
+            fresh.version = f"{names[0]}-inproc"
+        try:
+            docs, deleted = load_admin_content()
+            replayed = fresh.clone()
+            replayed.replay(docs, deleted)
+            fresh = replayed
+        except Exception as e:
+            # Serve the catalog alone rather than fail every request; live changes still apply
+            print(f"Error replaying admin content onto the recommender: {e}")
+        fresh.catalog_version = catalog.version
+        fresh._curated = fresh.build_curated()
+        return fresh
+
+    def current(self) -> Recommender:
+        self.ensure_loaded()
+        return self.state
+
+    def is_empty(self):
+        return self.current().is_empty()
+
+    def _swap(self, change):
+        """Apply change to a clone of the current snapshot and publish it; returns change's result"""
+        self.ensure_loaded()
+        with self._lock:
+            fresh = self.state.clone()
+            result = change(fresh)
+            fresh._curated = None
+            self.state = fresh
+            if self._reloading:
+                self._changes.append(change)
+        return result
+
+    def upsert_content(self, doc_id: str, doc: dict):
+        """Add or replace one content document. A document whose title matches a catalog row
+        not owned by another document takes over that row instead of appending."""
+        self._swap(lambda state: state.apply_upsert(doc_id, doc))
+
+    def remove_content(self, doc_id: str, title: str = None) -> bool:
+        """Tombstone a content document's row. Returns True if that row came from the catalog,
+        in which case the caller records the deletion so later loads drop it too."""
+        return self._swap(lambda state: state.apply_delete(doc_id, title))
+
+    def get_recommendations(self, title: str, limit: int = 10):
+        return self.current().get_recommendations(title, limit)
+
+    def get_batch_recommendations(self, titles, limit: int = 10, per_seed: bool = True, exclude_watched: bool = True):
+        return self.current().get_batch_recommendations(titles, limit, per_seed, exclude_watched)
+
+    def get_curated_content(self):
+        return self.current().get_curated_content()
+
+    def curated_payload(self):
+        return self.current().curated_payload()
+
 # Initialize once into memory (Singleton pattern as requested)
-engine = Recommender()
+engine = RecommenderEngine()
 
 def get_recommendations(title: str, limit: int = 10):
     return engine.get_recommendations(title, limit)
 
+def get_batch_recommendations(titles, limit: int = 10, per_seed: bool = True, exclude_watched: bool = True):
+    return engine.get_batch_recommendations(titles, limit, per_seed, exclude_watched)
+
 def get_ai_curated():
     return engine.get_curated_content()
+
+def get_ai_curated_payload():
+    return engine.curated_payload()
+
+async def _warm_up():
+    try:
+        await asyncio.to_thread(engine.ensure_loaded)
+    except Exception as e:
+        # The first recommendation request retries the load
+        print(f"Recommender warm-up failed: {e}")
+
+def start_recommender_warmup() -> asyncio.Task:
+    """Load the recommender in the background at startup instead of on the first request"""
+    return asyncio.create_task(_warm_up(), name="recommender-warmup")
@@ -0,0 +1,184 @@
+import bisect
+import numpy as np
+
+NGRAM = 3
+
+def normalize_title(title) -> str:
+    """Lookup key for a title (same case folding the old pandas str.lower() scan used)"""
+    return title.lower() if isinstance(title, str) else None
+
+def ngrams(text: str):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+class TitleIndex:
+    """
+    Title lookup structures built once per catalog load:
+      - a hash map from normalized title to the first item with that title
+      - a sorted key array for prefix range queries
+      - a trigram inverted index for substring queries
+    All lookups return catalog row indices.
+    """
+
+    def __init__(self, titles):
+        self._keys = [normalize_title(t) for t in titles]
+        self._build_exact()
+
+        # 2. Sorted prefix structure
+        ordered = sorted((key, i) for i, key in enumerate(self._keys) if key is not None)
+        self._sorted_keys = [key for key, _ in ordered]
+        self._sorted_ids = np.array([i for _, i in ordered], dtype=np.int32)
+
+        # 3. Trigram postings, each an ascending array of row indices
+        postings = {}
+        for i, key in enumerate(self._keys):
+            if key is None: continue
+            for gram in ngrams(key):
+                postings.setdefault(gram, []).append(i)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def _build_exact(self):
+        # 1. Exact (normalized) map; keep the first occurrence like the old scan did
+        self._exact = {}
+        for i, key in enumerate(self._keys):
+            if key is not None and key not in self._exact:
+                self._exact[key] = i
+
+    def to_arrays(self) -> dict:
+        """Flatten the sorted ids and trigram postings (CSR layout) for persisting"""
+        grams = sorted(self._postings)
+        offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum([len(self._postings[g]) for g in grams], out=offsets[1:])
+        ids = np.concatenate([self._postings[g] for g in grams]) if grams else np.empty(0, dtype=np.int32)
+        return {
+            "title_sorted_ids": self._sorted_ids,
+            "title_grams": np.array(grams, dtype=f"<U{NGRAM}"),
+            "title_gram_offsets": offsets,
+            "title_gram_ids": ids,
+        }
+
+    @classmethod
+    def from_arrays(cls, titles, arrays: dict):
+        """Rebuild an index from to_arrays() output; postings stay views into those arrays"""
+        index = cls.__new__(cls)
+        index._keys = [normalize_title(t) for t in titles]
+        index._build_exact()
+        index._sorted_ids = arrays["title_sorted_ids"]
+        index._sorted_keys = [index._keys[i] for i in index._sorted_ids.tolist()]
+        offsets = arrays["title_gram_offsets"].tolist()
+        ids = arrays["title_gram_ids"]
+        index._postings = {
+            gram: ids[offsets[i]:offsets[i + 1]] for i, gram in enumerate(arrays["title_grams"].tolist())
+        }
+        return index
+
+    def copy(self):
+        """Independent copy for copy-on-write updates (posting arrays are replaced, never modified, so they are shared)"""
+        index = self.__class__.__new__(self.__class__)
+        index._keys = list(self._keys)
+        index._exact = dict(self._exact)
+        index._sorted_keys = list(self._sorted_keys)
+        index._sorted_ids = self._sorted_ids
+        index._postings = dict(self._postings)
+        return index
+
+    def add(self, i: int, title):
+        """Index row i (appended rows use i == len(self)); used for incremental catalog updates"""
+        key = normalize_title(title)
+        if i == len(self._keys):
+            self._keys.append(key)
+        else:
+            self._keys[i] = key
+        if key is None:
+            return
+
+        first = self._exact.get(key)
+        if first is None or i < first:
+            self._exact[key] = i
+
+        pos = bisect.bisect_right(self._sorted_keys, key)
+        self._sorted_keys.insert(pos, key)
+        self._sorted_ids = np.insert(self._sorted_ids, pos, i)
+
+        for gram in ngrams(key):
+            ids = self._postings.get(gram)
+            if ids is None:
+                self._postings[gram] = np.array([i], dtype=np.int32)
+            else:
+                self._postings[gram] = np.insert(ids, np.searchsorted(ids, i), i)
+
+    def remove(self, i: int):
+        """Drop row i from every structure; the row index itself stays reserved"""
+        key = self._keys[i]
+        if key is None:
+            return
+        self._keys[i] = None
+
+        lo = bisect.bisect_left(self._sorted_keys, key)
+        hi = bisect.bisect_right(self._sorted_keys, key)
+        pos = lo + int(np.flatnonzero(self._sorted_ids[lo:hi] == i)[0])
+        del self._sorted_keys[pos]
+        self._sorted_ids = np.delete(self._sorted_ids, pos)
+
+        if self._exact.get(key) == i:
+            if hi - 1 > lo:
+                # Next occurrence of the same title becomes the first match
+                self._exact[key] = int(self._sorted_ids[lo:hi - 1].min())
+            else:
+                del self._exact[key]
+
+        for gram in ngrams(key):
+            ids = self._postings[gram]
+            ids = ids[ids != i]
+            if len(ids):
+                self._postings[gram] = ids
+            else:
+                del self._postings[gram]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def exact(self, title: str):
+        """First row whose title equals `title` case-insensitively, or None"""
+        return self._exact.get(normalize_title(title))
+
+    def prefix(self, prefix: str, limit: int = None):
+        """Rows whose title starts with `prefix`, in title order"""
+        key = normalize_title(prefix)
+        lo = bisect.bisect_left(self._sorted_keys, key)
+        hi = bisect.bisect_left(self._sorted_keys, key + "\uffff")
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self._sorted_ids[lo:hi]
+
+    def substring(self, text: str):
+        """First row (lowest index) whose title contains `text` case-insensitively, or None"""
+        key = normalize_title(text)
+        if len(key) < NGRAM:
+            # Too short for the trigram index; the first hit is almost always near the top
+            return next((i for i, k in enumerate(self._keys) if k is not None and key in k), None)
+
+        # Intersect postings, smallest list first, then verify candidates in row order
+        lists = []
+        for gram in ngrams(key):
+            ids = self._postings.get(gram)
+            if ids is None:
+                return None
+            lists.append(ids)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                return None
+
+        for i in candidates:
+            if key in self._keys[i]:
+                return int(i)
+        return None
+
+    def lookup(self, title: str):
+        """Exact match first, then the first substring match (the recommender's resolution order)"""
+        idx = self.exact(title)
+        if idx is None:
+            idx = self.substring(title)
+        return idx
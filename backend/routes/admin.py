@@ -1,14 +1,26 @@
 import os
+import re
 import random
+import asyncio
 from datetime import datetime, timedelta
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, status, Body, Header
+from fastapi import APIRouter, HTTPException, Depends, Query, status, Body, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from database import content_collection, user_collection, db, user_analytics_collection
+from database import adb, CONTENT_SORT_FIELDS
+from services.dashboard import snapshot
+from services.pagination import counts, encode_cursor, page_query
+from services.traffic import read_buckets, ensure_backfilled
+from ml.recommender import engine
 
 import numpy as np
-import pandas as pd # Kept for stats if available
 import math
+from services.principals import principals
+from services.views import views
+from services.passwords import pool as password_pool
+from services import llm
+from services.export import export_stream, parquet_available, FORMATS as EXPORT_FORMATS
+from routes.platform import parse_fields
 from routes.auth import get_current_user # Use same auth as users for now, or separate if needed
 
 router = APIRouter()
@@ -26,10 +38,24 @@ class ContentItem(BaseModel):
 
 # --- Helper ---
 def serialize_doc(doc, doc_id):
-    data = doc.to_dict()
+    data = dict(doc)
     data["_id"] = doc_id
     return data
 
+def content_query(type_filter: str = "all", platform_filter: str = "all", search: str = "") -> dict:
+    """Mongo filter for the admin content type / platform / title filters"""
+    query = {}
+    if type_filter != "all": 
+        query["type"] = type_filter
+    
+    if platform_filter != "all": 
+        query[platform_filter] = 1
+        
+    if search:
+        # Basic (escaped) substring search
+        query["title"] = {"$regex": re.escape(search), "$options": "i"}
+    return query
+
 # Admin logic is now using get_current_user from auth.py
 
 # --- Authentication Endpoints ---
@@ -45,35 +71,80 @@ async def login_admin_mock():
 # --- Content CRUD Endpoints ---
 
 @router.get("/content")
-async def get_all_content(admin: dict = Depends(get_current_admin)):
+async def get_all_content(
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv|parquet)$"),
+    fields: Optional[str] = None,
+    type_filter: str = "all",
+    platform_filter: str = "all",
+    search: str = "",
+    admin: dict = Depends(get_current_admin)
+):
+    """All (filtered) content as a JSON list, or with ?format= a streamed ndjson/csv/parquet export"""
+    content_collection = adb.content
     if content_collection is None: return []
-    cursor = content_collection.find()
-    return [serialize_doc(doc, str(doc["_id"])) for doc in cursor]
+    query = content_query(type_filter, platform_filter, search)
+    projection = parse_fields(fields)
+
+    if format:
+        if format == "parquet" and not parquet_available():
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        cursor = content_collection.find(query, projection).sort("_id", 1)
+        media_type, extension = EXPORT_FORMATS[format]
+        return StreamingResponse(
+            export_stream(cursor, format, list(projection) if projection else None),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="content-export.{extension}"'}
+        )
+
+    cursor = content_collection.find(query, projection)
+    return [serialize_doc(doc, str(doc["_id"])) async for doc in cursor]
 
 @router.post("/content", status_code=status.HTTP_201_CREATED)
 async def create_content(item: ContentItem, admin: dict = Depends(get_current_admin)):
+    content_collection = adb.content
     if content_collection is None: return
     new_item = item.dict()
     new_item["created_at"] = datetime.utcnow()
-    result = content_collection.insert_one(new_item)
+    result = await content_collection.insert_one(new_item)
+    counts.invalidate(content_collection.name)
+    try:
+        await asyncio.to_thread(engine.upsert_content, str(result.inserted_id), new_item)
+    except Exception as e:
+        print(f"Recommender update failed for {result.inserted_id}: {e}")
     return {"message": "Content created", "id": str(result.inserted_id)}
 
 @router.put("/content/{item_id}")
 async def update_content(item_id: str, item: ContentItem, admin: dict = Depends(get_current_admin)):
+    content_collection = adb.content
     if content_collection is None: return
     try:
         from bson.objectid import ObjectId
-        content_collection.update_one({"_id": ObjectId(item_id)}, {"$set": item.dict()})
+        await content_collection.update_one({"_id": ObjectId(item_id)}, {"$set": item.dict()})
+        # Filtered counts (platform, type, ...) can change with the edit
+        counts.invalidate(content_collection.name)
+        views.invalidate(item_id)
     except Exception:
         raise HTTPException(status_code=404, detail="Content not found or update failed")
+    try:
+        await asyncio.to_thread(engine.upsert_content, item_id, item.dict())
+    except Exception as e:
+        print(f"Recommender update failed for {item_id}: {e}")
     return {"message": "Content updated successfully"}
 
 @router.delete("/content/{item_id}")
 async def delete_content(item_id: str, admin: dict = Depends(get_current_admin)):
+    content_collection = adb.content
     if content_collection is None: return
     try:
         from bson.objectid import ObjectId
-        content_collection.delete_one({"_id": ObjectId(item_id)})
+        deleted = await content_collection.find_one_and_delete({"_id": ObjectId(item_id)}, projection={"title": 1})
+        if deleted:
+            counts.invalidate(content_collection.name)
+            views.remove(item_id)
+            if await asyncio.to_thread(engine.remove_content, item_id, deleted.get("title")):
+                # The title was a catalog row: record it so later loads (and other workers) drop it too
+                await adb.content_deletions.insert_one({"title": deleted.get("title"), "content_id": item_id,
+                                                        "deleted_at": datetime.utcnow()})
     except Exception:
         pass 
     return {"message": "Content deleted successfully"}
@@ -82,162 +153,44 @@ async def delete_content(item_id: str, admin: dict = Depends(get_current_admin))
 
 @router.get("/users")
 async def get_all_users(admin: dict = Depends(get_current_admin)):
+    user_collection = adb.users
     if user_collection is None: return []
     cursor = user_collection.find().limit(100)
-    return [serialize_doc(doc, str(doc["_id"])) for doc in cursor]
+    return [serialize_doc(doc, str(doc["_id"])) async for doc in cursor]
 
 @router.delete("/user/{user_id}")
 async def delete_user(user_id: str, admin: dict = Depends(get_current_admin)):
+    user_collection = adb.users
     if user_collection is None: return
     try:
         from bson.objectid import ObjectId
-        user_collection.delete_one({"_id": ObjectId(user_id)})
+        await user_collection.delete_one({"_id": ObjectId(user_id)})
     except Exception:
         pass
+    # Stop serving the deleted account from the auth cache
+    principals.invalidate(user_id=user_id)
     return {"message": "User deleted successfully"}
 
 # --- Dashboard Stats ---
 @router.get("/stats")
 async def get_dashboard_stats(admin: dict = Depends(get_current_admin)):
-    import os
-    import json
-    
-    # Try to use JSON file for heavy stats to avoid costly DB reads on raw data
-    JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "final_df_cleaned.json")
-    
-    df = pd.DataFrame()
-    if os.path.exists(JSON_PATH):
-        try:
-            with open(JSON_PATH, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            df = pd.DataFrame(data)
-        except: pass
-
-    # Sanitize dataframe
-    if not df.empty:
-        df['IMDb'] = pd.to_numeric(df['IMDb'], errors='coerce').fillna(0)
-        df['Title'] = df['Title'].fillna('Unknown Title')
-        df['Genres'] = df['Genres'].fillna('Unknown')
-        df['Year'] = pd.to_numeric(df['Year'], errors='coerce').fillna(0)
-        total_movies = int(len(df))
-    else:
-        # Fallback to DB count
-        total_movies = 0
-        if content_collection is not None:
-             total_movies = content_collection.count_documents({})
-
-    # Platform counts
-    platforms = ["Netflix", "Hulu", "Prime Video", "Disney+"]
-    platform_counts = {}
-    avg_imdb = 0.0
-    
-    if not df.empty:
-        for p in platforms:
-            if p in df.columns:
-                count = int(df[df[p] == 1].shape[0])
-            else:
-                count = 0
-            platform_counts[p] = count
-        
-        avg_imdb = df['IMDb'].mean()
-        if pd.isna(avg_imdb) or math.isinf(avg_imdb): avg_imdb = 0.0
-    else:
-        for p in platforms: platform_counts[p] = 0
-
-    # Total Users
-    total_users = 0
-    if user_collection is not None:
-         total_users = user_collection.count_documents({})
-
-    userData = [
-        {"name": "New Customer", "value": int(total_users * 0.25)},
-        {"name": "Existing Subscriber's", "value": int(total_users * 0.45)},
-        {"name": "Daily Visitor's", "value": int(total_users * 0.2)},
-        {"name": "Extended Subscriber's", "value": int(total_users * 0.1)}
-    ]
-    
-    # Timeline (Mocked for visual)
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=30)
-    platform_traffic_timeline = []
-    current_date = start_date
-    total_content_count = sum(platform_counts.values()) or 1
-    factors = {k: v/total_content_count for k, v in platform_counts.items()}
-    
-    while current_date <= end_date:
-        daily_base = np.random.randint(2000, 5000)
-        day_data = {"date": current_date.strftime("%b %d")}
-        for p in platforms:
-            share = factors.get(p, 0.25)
-            noise = np.random.uniform(0.9, 1.1)
-            day_data[p] = int(daily_base * share * noise)
-        platform_traffic_timeline.append(day_data)
-        current_date += timedelta(days=1)
-
-    # Categories
-    categoryData = []
-    topCategoryData = []
-    
-    if not df.empty:
-        genre_series = df['Genres'].str.split(',').explode().str.strip()
-        top_genres_counts = genre_series.value_counts().head(7)
-        for genre in top_genres_counts.index.tolist():
-             count = int(top_genres_counts[genre])
-             categoryData.append({"name": str(genre), "thisMonth": int(count * 0.1), "lastMonth": int(count * 0.08)})
-             
-        # Top 6
-        top_6 = genre_series.value_counts().head(6)
-        trends = ["+24%", "-8%", "+60%", "+44%", "+55%", "+40%"]
-        for i, genre in enumerate(top_6.index.tolist()):
-            count = int(top_6[genre])
-            topCategoryData.append({
-                "name": str(genre),
-                "value": count,
-                "percentage": round((count / total_movies) * 100, 1) if total_movies > 0 else 0,
-                "trend": trends[i % len(trends)]
-            })
-
-    # Top Viewed (From DB or DF)
-    top_viewed = []
-    if content_collection is not None:
-        cursor = content_collection.find().sort("views", -1).limit(5)
-        for doc in cursor:
-            top_viewed.append(serialize_doc(doc, str(doc["_id"])))
-            
-    if not top_viewed and not df.empty:
-         sample = df.sample(min(5, len(df)))
-         for _, row in sample.iterrows():
-            imdb_val = row['IMDb']
-            if pd.isna(imdb_val): imdb_val = 0.0
-            avail = [p for p in platforms if row.get(p) == 1]
-            top_viewed.append({
-                "title": str(row['Title']),
-                "platform": ", ".join(avail) if avail else "Other",
-                "imdb": float(imdb_val),
-                "year": int(row['Year']),
-                "genres": str(row['Genres']),
-                "type": str(row.get('Type', 'movie')),
-                "views": int(np.random.randint(1000, 5000))
-            })
-
-    return {
-        "total_movies": int(total_movies),
-        "platform_counts": platform_counts,
-        "avg_imdb": round(float(avg_imdb), 2),
-        "total_users": int(total_users),
-        "userData": userData,
-        "categoryData": categoryData,
-        "topCategoryData": topCategoryData,
-        "top_viewed": top_viewed,
-        "platform_traffic_timeline": platform_traffic_timeline
-    }
+    # Aggregates are recomputed in the background (services/dashboard.py); only the
+    # very first call on a worker waits for one, off the event loop
+    if snapshot.stats is None:
+        await asyncio.to_thread(snapshot.refresh)
+    return JSONResponse(content={
+        **snapshot.stats,
+        "snapshot_at": snapshot.computed_at.isoformat(),
+        "snapshot_age_seconds": round(snapshot.age(), 3)
+    })
 
 @router.get("/ratings")
 async def get_ratings(admin: dict = Depends(get_current_admin)):
     top_rated = []
+    content_collection = adb.content
     if content_collection is not None:
         cursor = content_collection.find({"imdb": {"$gt": 8.0}}).sort("imdb", -1).limit(10)
-        for doc in cursor:
+        async for doc in cursor:
             item = serialize_doc(doc, str(doc["_id"]))
             if "votes" not in item: item["votes"] = np.random.randint(10000, 2000000)
             top_rated.append(item)
@@ -253,9 +206,10 @@ async def get_comments(admin: dict = Depends(get_current_admin)):
     platforms = ["Netflix", "Prime Video", "Hulu", "Disney+"]
     comments_list = ["Amazing!", "Great visuals.", "Slow start.", "Expected more."]
     movie_titles = []
+    content_collection = adb.content
     if content_collection is not None:
-        cursor = content_collection.find().limit(20)
-        movie_titles = [doc.get("title") for doc in cursor if doc.get("title")]
+        cursor = content_collection.find({}, {"title": 1}).limit(20)
+        movie_titles = [doc.get("title") async for doc in cursor if doc.get("title")]
     if not movie_titles: movie_titles = ["Inception", "The Matrix"]
 
     generated = []
@@ -274,9 +228,10 @@ async def get_comments(admin: dict = Depends(get_current_admin)):
 @router.get("/auth-users")
 async def get_auth_users(admin: dict = Depends(get_current_admin)):
     users = []
+    user_collection = adb.users
     if user_collection is not None:
         cursor = user_collection.find().limit(50)
-        for doc in cursor:
+        async for doc in cursor:
             data = serialize_doc(doc, str(doc["_id"]))
             users.append({
                 "id": str(data["_id"]),
@@ -290,6 +245,21 @@ async def get_auth_users(admin: dict = Depends(get_current_admin)):
             })
     return users
 
+@router.get("/auth-metrics")
+async def get_auth_metrics(admin: dict = Depends(get_current_admin)):
+    """Password pool load and recent signup/login hashing latency (this worker)"""
+    return password_pool.stats()
+
+@router.get("/llm-metrics")
+async def get_llm_metrics(admin: dict = Depends(get_current_admin)):
+    """LLM response cache hits, misses and coalesced requests (this worker)"""
+    return llm.cache.stats()
+
+@router.get("/view-metrics")
+async def get_view_metrics(admin: dict = Depends(get_current_admin)):
+    """View events received, batched flushes and trending ranking size (this worker)"""
+    return views.stats()
+
 @router.get("/content-list")
 async def get_advanced_content_list(
     sort_by: str = "year", 
@@ -299,34 +269,38 @@ async def get_advanced_content_list(
     page: int = 1,
     limit: int = 20,
     search: str = "",
+    cursor: Optional[str] = None,
     admin: dict = Depends(get_current_admin)
 ):
-    if content_collection is None: return {"data": [], "total": 0, "page": 1, "pages": 1}
-    
-    query = {}
-    if type_filter != "all": 
-        query["type"] = type_filter
-    
-    if platform_filter != "all": 
-        query[platform_filter] = 1
-        
-    if search:
-        # Basic regex search
-        query["title"] = {"$regex": search, "$options": "i"}
+    content_collection = adb.content
+    if content_collection is None: return {"data": [], "total": 0, "page": 1, "pages": 1, "next_cursor": None}
+    if sort_by not in CONTENT_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of {CONTENT_SORT_FIELDS}")
     
+    query = content_query(type_filter, platform_filter, search)
     sort_order = -1 if order == "desc" else 1
     
-    total = content_collection.count_documents(query)
+    total = await counts.count(content_collection, query)
     
-    cursor = content_collection.find(query).sort(sort_by, sort_order).skip((page - 1) * limit).limit(limit)
+    # Keyset page after the cursor; page/skip is kept for clients that don't send one
+    try:
+        cursor_query = page_query(query, sort_by, sort_order, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    docs = content_collection.find(cursor_query).sort([(sort_by, sort_order), ("_id", sort_order)])
+    if not cursor:
+        docs = docs.skip((page - 1) * limit)
+    docs = await docs.limit(limit + 1).to_list(length=limit + 1)
     
-    data = [serialize_doc(doc, str(doc["_id"])) for doc in cursor]
+    data = [serialize_doc(doc, str(doc["_id"])) for doc in docs[:limit]]
+    next_cursor = encode_cursor(sort_by, sort_order, docs[limit - 1]) if len(docs) > limit else None
     
     return {
         "data": data,
         "total": total,
         "page": page,
-        "pages": math.ceil(total / limit)
+        "pages": math.ceil(total / limit),
+        "next_cursor": next_cursor
     }
 
 @router.get("/user-analytics")
@@ -336,14 +310,16 @@ async def get_user_analytics(
     category_filter: str = "All Categories",
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = None,
     admin: dict = Depends(get_current_admin)
 ):
+    user_analytics_collection = adb.user_analytics
     if user_analytics_collection is None:
-        return {"data": [], "total": 0, "page": page, "pages": 0}
+        return {"data": [], "total": 0, "page": page, "pages": 0, "next_cursor": None}
 
     query = {}
     if username:
-        query["username"] = {"$regex": username, "$options": "i"}
+        query["username"] = {"$regex": re.escape(username), "$options": "i"}
     
     if platform_filter != "All Platforms":
         # Check if platform exists in any history item
@@ -353,12 +329,19 @@ async def get_user_analytics(
         # Check if category exists in preferences or history
         query["preferences"] = category_filter
 
-    total = user_analytics_collection.count_documents(query)
-    # Sort by joined_date desc by default
-    cursor = user_analytics_collection.find(query).sort("joined_date", -1).skip((page - 1) * limit).limit(limit)
+    total = await counts.count(user_analytics_collection, query)
+    # Sort by joined_date desc by default (keyset on joined_date, _id)
+    try:
+        cursor_query = page_query(query, "joined_date", -1, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    docs = user_analytics_collection.find(cursor_query).sort([("joined_date", -1), ("_id", -1)])
+    if not cursor:
+        docs = docs.skip((page - 1) * limit)
+    docs = await docs.limit(limit + 1).to_list(length=limit + 1)
     
     users = []
-    for doc in cursor:
+    for doc in docs[:limit]:
         # Custom serialization to be safe
         user_data = dict(doc)
         user_data["_id"] = str(user_data["_id"])
@@ -368,40 +351,25 @@ async def get_user_analytics(
         "data": users,
         "total": total,
         "page": page,
-        "pages": math.ceil(total / limit)
+        "pages": math.ceil(total / limit),
+        "next_cursor": encode_cursor("joined_date", -1, docs[limit - 1]) if len(docs) > limit else None
     }
 
 @router.get("/platform-traffic")
 async def get_platform_traffic(admin: dict = Depends(get_current_admin)):
-    if user_analytics_collection is None:
+    if adb.user_analytics is None:
         return []
 
-    # Aggregation Pipeline:
-    # 1. Unwind history array
-    # 2. Group by YEAR-MONTH substring (Reverting to Monthly for "Big Waves" aesthetic)
-    # 3. Sort by date
-    pipeline = [
-        {"$unwind": "$history"},
-        {"$addFields": {
-            "month_str": {"$substr": ["$history.date", 0, 7]}  # Extract YYYY-MM
-        }},
-        {"$group": {
-            "_id": {
-                "date": "$month_str",
-                "platform": "$history.platform"
-            },
-            "total_usage": {"$sum": "$history.watched_duration_mins"}
-        }},
-        {"$sort": {"_id.date": 1}}
-    ]
-
-    results = user_analytics_collection.aggregate(pipeline)
+    # Monthly watch-minute buckets (services/traffic.py); waits for the startup
+    # backfill if the rollup store was empty
+    await ensure_backfilled()
+    buckets = await read_buckets("month")
 
     raw_map = {}
     global_max = 0
 
-    for entry in results:
-        date_key = entry["_id"]["date"]
+    for bucket in buckets:
+        date_key = bucket["period"]
         # Make readable: "2023-11" -> "Nov 23"
         try:
              dt = datetime.strptime(date_key, "%Y-%m")
@@ -409,21 +377,14 @@ async def get_platform_traffic(admin: dict = Depends(get_current_admin)):
         except:
              readable_date = date_key
 
-        platform = entry["_id"].get("platform", "Other")
-        usage = entry["total_usage"]
-        
-        # Normalize Platform Names
-        chart_key = platform
-        if "Netflix" in platform: chart_key = "Netflix"
-        elif "Prime" in platform: chart_key = "Prime"
-        elif "Disney" in platform: chart_key = "Disney"
-        elif "Hulu" in platform: chart_key = "Hulu"
+        chart_key = bucket["platform"]
+        usage = bucket["minutes"]
         
         if readable_date not in raw_map:
             # sort_key is used for strict sorting
             raw_map[readable_date] = {"name": readable_date, "sort_key": date_key, "Netflix": 0, "Prime": 0, "Hulu": 0, "Disney": 0}
         
-        raw_map[readable_date][chart_key] += usage
+        raw_map[readable_date][chart_key] = raw_map[readable_date].get(chart_key, 0) + usage
         if raw_map[readable_date][chart_key] > global_max:
             global_max = raw_map[readable_date][chart_key]
 
@@ -1,37 +1,42 @@
 import os
 import json
+import asyncio
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from database import content_collection, history_collection, user_collection
-from routes.auth import get_current_user
-from groq import Groq
+from database import adb, content_collection
+from routes.auth import get_current_user, get_token_claims
 from dotenv import load_dotenv
-from ml.recommender import get_ai_curated
+from ml.recommender import get_ai_curated_payload
+from services import llm
 
 load_dotenv()
 
 router = APIRouter()
 
 @router.get("/curated")
-async def get_curated_lists():
-    """Get AI-curated lists based on data analysis"""
+async def get_curated_lists(request: Request):
+    """Get AI-curated lists based on data analysis (precomputed per catalog version, ETag-validated)"""
     try:
-        data = get_ai_curated()
-        return data
+        etag, body = await asyncio.to_thread(get_ai_curated_payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-import google.generativeai as genai
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-client = Groq(api_key=GROQ_API_KEY)
-genai.configure(api_key=GOOGLE_API_KEY)
-gemini_model = genai.GenerativeModel("gemini-2.0-flash-exp")
+# Providers (services/llm.py); LLM_PROVIDER=stub replaces both with a local stub
+groq_provider = llm.make_provider("groq", GROQ_API_KEY, "llama3-70b-8192")
+gemini_provider = llm.make_provider("gemini", GOOGLE_API_KEY, "gemini-2.0-flash-exp")
 
 class ChatMessage(BaseModel):
     user_email: str
@@ -70,30 +75,66 @@ def get_trending_shows():
         {"title": "Arcane", "popularity": 94, "interest": 96, "rating": 9.0},
     ]
 
-def sanitize_response(text: str) -> str:
-    """Removes any mention of AI providers for a white-labeled experience"""
-    replacements = {
-        "Google": "Core",
-        "Gemini": "Brain",
-        "Groq": "Neural Engine",
-        "llama": "Model-X",
-        "mixtral": "Model-Y",
-        "openai": "AI",
-        "ChatGPT": "Assistant"
+# sanitize_response lives in services/llm.py next to its streaming counterpart
+sanitize_response = llm.sanitize_response
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+async def save_transcript(user_email: str, message: str, ai_response: str):
+    if adb.history is None:
+        return
+    history_doc = {
+        "user_email": user_email,
+        "user_message": message,
+        "ai_response": ai_response,
+        "timestamp": datetime.utcnow()
     }
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-        text = text.replace(old.lower(), new)
-    return text
+    await adb.history.insert_one(history_doc)
+
+def stream_chat(full_prompt: str, user_email: str, message: str) -> StreamingResponse:
+    """SSE: "delta" chunks as the model produces them (sanitized across chunk boundaries),
+    then a "done" event with the full reply. The transcript is saved after the stream closes."""
+    transcript = {}
+
+    async def events():
+        sanitizer = llm.StreamSanitizer()
+        parts = []
+        try:
+            async for chunk in llm.astream(gemini_provider, full_prompt):
+                text = sanitizer.feed(chunk)
+                if text:
+                    parts.append(text)
+                    yield llm.sse_event({"delta": text})
+            text = sanitizer.flush()
+            if text:
+                parts.append(text)
+                yield llm.sse_event({"delta": text})
+        except Exception as e:
+            print(f"AI Error: {e}")
+            yield llm.sse_event({"detail": str(e)}, event="error")
+            return
+        transcript["response"] = "".join(parts)
+        yield llm.sse_event({"response": transcript["response"]}, event="done")
+
+    async def persist():
+        # Only completed replies; a client that disconnected mid-stream leaves no transcript
+        if "response" in transcript:
+            try:
+                await save_transcript(user_email, message, transcript["response"])
+            except Exception as e:
+                print(f"Error saving chat transcript: {e}")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS, background=BackgroundTask(persist))
 
 @router.post("/chat")
-async def chat_with_ai(request: ChatMessage, current_user: dict = Depends(get_current_user)):
+async def chat_with_ai(request: ChatMessage, stream: bool = Query(False), current_user: dict = Depends(get_current_user)):
+    """Reply to a chat message; with ?stream=true the reply is sent as Server-Sent Events"""
     user_email = current_user.get("email") or current_user.get("sub")
     
     # The original code used GOOGLE_API_KEY for Gemini.
     # The new code snippet implies GEMINI_API_KEY.
     # For consistency with the provided snippet, we'll use GOOGLE_API_KEY here.
-    if not GOOGLE_API_KEY:
+    if not GOOGLE_API_KEY and gemini_provider.name != "stub":
          raise HTTPException(status_code=500, detail="Gemini API Key not configured")
 
     try:
@@ -102,19 +143,15 @@ async def chat_with_ai(request: ChatMessage, current_user: dict = Depends(get_cu
         # Could fetch user preferences from user_collection if needed
         
         full_prompt = f"User asked: {request.message}\nContext: You are a movie recommendation assistant..."
+
+        if stream:
+            return stream_chat(full_prompt, user_email, request.message)
         
-        response = gemini_model.generate_content(full_prompt) # Using gemini_model as defined globally
-        ai_response = response.text
+        # Personal conversation, so not cached; the blocking SDK call runs in a worker thread
+        ai_response = await asyncio.to_thread(gemini_provider.complete, full_prompt)
         
         # Save to MongoDB
-        if history_collection is not None:
-             history_doc = {
-                 "user_email": user_email,
-                 "user_message": request.message,
-                 "ai_response": ai_response,
-                 "timestamp": datetime.utcnow()
-             }
-             history_collection.insert_one(history_doc)
+        await save_transcript(user_email, request.message, ai_response)
         
         return {"response": ai_response}
 
@@ -123,19 +160,19 @@ async def chat_with_ai(request: ChatMessage, current_user: dict = Depends(get_cu
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/history")
-async def get_chat_history(current_user: dict = Depends(get_current_user)):
+async def get_chat_history(current_user: dict = Depends(get_token_claims)):
     user_email = current_user.get("email") # or username, depending on auth.py token
     if not user_email:
          # Fallback if token structure is different
          user_email = current_user.get("sub")
 
-    if history_collection is None:
+    if adb.history is None:
         raise HTTPException(status_code=500, detail="Database connection error")
 
     # MongoDB Query
-    history_cursor = history_collection.find({"user_email": user_email}).sort("timestamp", -1).limit(50)
+    history_cursor = adb.history.find({"user_email": user_email}).sort("timestamp", -1).limit(50)
     history = []
-    for doc in history_cursor:
+    async for doc in history_cursor:
         doc["_id"] = str(doc["_id"])
         history.append(doc)
     
@@ -146,11 +183,7 @@ async def get_special_recommendations(category: str = Query(...)):
     prompt = f"Give me the top analysis and recommendations for category: {category}. Include IMDb ratings and popularity trends. Return as a structured JSON object with text and chartData."
     
     try:
-        completion = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        return json.loads(completion.choices[0].message.content)
+        # Same category -> same prompt, so repeats are served from the response cache
+        return json.loads(await llm.complete(groq_provider, prompt, json_mode=True))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,80 +1,73 @@
-import pandas as pd
-import os
+import numpy as np
 from fastapi import APIRouter, Query
 from typing import Optional
+from services.analytics_cube import get_cube
 
 router = APIRouter()
 
-# Load the dataset
-CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "dataset", "final_df_cleaned.csv")
-df = pd.read_csv(CSV_PATH)
+PLATFORMS = ["Netflix", "Hulu", "Prime Video", "Disney+"]
 
 @router.get('/platform-distribution')
-def get_platform_distribution():
-    platforms = ["Netflix", "Hulu", "Prime Video", "Disney+"]
-    stats = []
-    for platform in platforms:
-        count = int(df[df[platform] == 1].shape[0])
-        stats.append({"name": platform, "value": count})
-    return stats
+def get_platform_distribution(
+    year: Optional[int] = Query(None),
+    genre: Optional[str] = Query(None),
+    type: Optional[str] = Query(None)
+):
+    counts = get_cube().query(by="platform", year=year, genre=genre, type=type)
+    return [{"name": platform, "value": int(count)} for platform, count in zip(PLATFORMS, counts)]
 
 @router.get('/year-distribution')
-def get_year_distribution(platform: Optional[str] = Query(None)):
-    filtered_df = df
-    if platform and platform in ["Netflix", "Hulu", "Prime Video", "Disney+"]:
-        filtered_df = df[df[platform] == 1]
-    
-    year_stats = filtered_df.groupby('Year').size().reset_index(name='count')
-    # Sort by year and take the last 30 years for clarity if too many
-    year_stats = year_stats.sort_values('Year').tail(30)
-    
-    result = []
-    for _, row in year_stats.iterrows():
-        result.append({"year": int(row['Year']), "count": int(row['count'])})
-    return result
+def get_year_distribution(
+    platform: Optional[str] = Query(None),
+    genre: Optional[str] = Query(None),
+    type: Optional[str] = Query(None)
+):
+    if platform not in PLATFORMS:
+        platform = None
+    cube = get_cube()
+    counts = cube.query(by="year", platform=platform, genre=genre, type=type)
+
+    # Years present in the selection, last 30 for clarity if too many
+    present = np.flatnonzero(counts)[-30:]
+    return [{"year": int(cube.years[i]), "count": int(counts[i])} for i in present]
 
 @router.get('/genre-popularity')
-def get_genre_popularity():
-    # Split genres and explode to count correctly
-    genre_df = df.copy()
-    genre_df['Genres'] = genre_df['Genres'].fillna('Unknown').str.split(',')
-    genre_exploded = genre_df.explode('Genres')
-    
-    # Get top 10 genres by count
-    top_genres = genre_exploded['Genres'].value_counts().head(10).index.tolist()
-    
-    # Calculate avg IMDb for these top genres
-    genre_stats = genre_exploded[genre_exploded['Genres'].isin(top_genres)].groupby('Genres').agg({
-        'IMDb': 'mean',
-        'Title': 'count'
-    }).reset_index()
-    
-    genre_stats.columns = ['genre', 'avg_imdb', 'count']
-    genre_stats = genre_stats.sort_values('count', ascending=False)
-    
+def get_genre_popularity(
+    platform: Optional[str] = Query(None),
+    year: Optional[int] = Query(None),
+    type: Optional[str] = Query(None)
+):
+    cube = get_cube()
+    filters = dict(by="genre", platform=platform, year=year, type=type)
+    counts = cube.query("count", **filters)
+    imdb_sum = cube.query("imdb_sum", **filters)
+    imdb_n = cube.query("imdb_n", **filters)
+
+    # Top 10 genres by count, ties by name
+    present = np.flatnonzero(counts)
+    names = np.array(cube.genres, dtype=object)[present]
+    top = present[np.lexsort((names, -counts[present]))][:10]
+
     result = []
-    for _, row in genre_stats.iterrows():
+    for i in top:
+        avg_imdb = imdb_sum[i] / imdb_n[i] if imdb_n[i] else float('nan')
         result.append({
-            "genre": row['genre'],
-            "avg_imdb": round(float(row['avg_imdb']), 2),
-            "count": int(row['count'])
+            "genre": cube.genres[i],
+            "avg_imdb": round(float(avg_imdb), 2),
+            "count": int(counts[i])
         })
     return result
 
 @router.get('/filters')
 def get_filter_options():
-    years = sorted(df['Year'].unique().tolist(), reverse=True)
-    platforms = ["Netflix", "Hulu", "Prime Video", "Disney+"]
+    cube = get_cube()
     return {
-        "years": [int(y) for y in years],
-        "platforms": platforms
+        "years": [int(y) for y in cube.years[::-1]],
+        "platforms": PLATFORMS
     }
 
 @router.get('/platform-count') # Keep for backward compatibility if needed, but updated
 def platform_count():
-    platforms = ["Netflix", "Hulu", "Prime Video", "Disney+"]
-    results = []
-    for p in platforms:
-        count = int(df[df[p] == 1].shape[0])
-        results.append({"_id": p, "count": count})
+    counts = get_cube().query(by="platform")
+    results = [{"_id": p, "count": int(count)} for p, count in zip(PLATFORMS, counts)]
     return {"platform_distribution": results}
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime, timedelta
-from database import user_collection
-import bcrypt
+from database import adb
+from services.principals import principals
+from services.passwords import pool as password_pool, PasswordPoolBusy, hash_password_sync, check_password_sync
+from services.rate_limit import RateLimiter, retry_after
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import os
@@ -18,6 +20,11 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your_super_secret_key_change_this")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 24 hours
 
+# Attempts per minute (token buckets, per worker); 0 disables a limit
+login_account_limit = RateLimiter(int(os.getenv("AUTH_LOGIN_PER_ACCOUNT_PER_MIN", "10")))
+login_ip_limit = RateLimiter(int(os.getenv("AUTH_LOGIN_PER_IP_PER_MIN", "60")))
+signup_ip_limit = RateLimiter(int(os.getenv("AUTH_SIGNUP_PER_IP_PER_MIN", "10")))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 # --- Models ---
@@ -41,17 +48,31 @@ class TokenData(BaseModel):
 
 # --- Utils ---
 def verify_password(plain_password: str, hashed_password: str):
-    # Check password using bcrypt
-    # bcrypt.checkpw requires bytes, so encode both
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    # Blocking bcrypt check; request handlers use password_pool.verify instead
+    return check_password_sync(plain_password, hashed_password)
 
 def get_password_hash(password: str):
-    # Hash password using bcrypt
-    # bcrypt.gensalt() generates a salt
-    # hashpw requires bytes
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8') # Return as string for storage
+    # Blocking bcrypt hash (for scripts like seed_admin.py); request handlers use password_pool.hash
+    return hash_password_sync(password)
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+def enforce_rate_limit(*waits: float):
+    wait = retry_after(*waits)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, try again later",
+            headers={"Retry-After": str(wait)},
+        )
+
+def password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, try again shortly",
+        headers={"Retry-After": "1"},
+    )
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -63,48 +84,64 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)):
+    """Claims-only validation: checks the JWT signature and expiry without a database lookup.
+    For read-only routes that only need the caller's email/username."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
     except JWTError:
-        raise credentials_exception
-    
-    if user_collection is None:
+        raise credentials_exception()
+    email: str = payload.get("sub")
+    if email is None:
+        raise credentials_exception()
+    return {"email": email, "username": payload.get("username"), "sub": email}
+
+async def get_current_user(claims: dict = Depends(get_token_claims)):
+    """The full user document for the token subject, served from the principal cache when fresh"""
+    token_data = TokenData(email=claims["email"], username=claims.get("username"))
+    user = principals.get(token_data.email)
+    if user is not None:
+        return user
+
+    if adb.users is None:
          raise HTTPException(status_code=500, detail="Database not connected")
 
-    user = user_collection.find_one({"email": token_data.email})
+    user = await adb.users.find_one({"email": token_data.email}, {"password": 0})
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
     
     user["_id"] = str(user["_id"])
+    principals.put(token_data.email, user)
     return user
 
 # --- Routes ---
 
 @router.post("/signup", response_model=Token)
-async def signup(user: UserSignup):
+async def signup(user: UserSignup, request: Request):
+    enforce_rate_limit(signup_ip_limit.hit(client_ip(request)))
+    user_collection = adb.users
     if user_collection is None:
         raise HTTPException(status_code=500, detail="Database connection error")
 
     # Check if user exists
-    if user_collection.find_one({"email": user.email}):
+    if await user_collection.find_one({"email": user.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
         
-    if user_collection.find_one({"username": user.username}):
+    if await user_collection.find_one({"username": user.username}):
         raise HTTPException(status_code=400, detail="Username already taken")
     
     # Hash password
     try:
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await password_pool.hash(user.password)
+    except PasswordPoolBusy:
+        raise password_pool_busy()
     except Exception as e:
         print(f"Error hashing password: {e}")
         raise HTTPException(status_code=500, detail="Internal server error processing password")
@@ -117,7 +154,7 @@ async def signup(user: UserSignup):
         "role": "user"
     }
     
-    result = user_collection.insert_one(new_user)
+    result = await user_collection.insert_one(new_user)
     
     # Create Token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -128,19 +165,28 @@ async def signup(user: UserSignup):
     return {"access_token": access_token, "token_type": "bearer", "username": user.username}
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     # OAuth2PasswordRequestForm "username" field will contain the email
+    enforce_rate_limit(
+        login_ip_limit.hit(client_ip(request)),
+        login_account_limit.hit(form_data.username.strip().lower()),
+    )
+    user_collection = adb.users
     if user_collection is None:
         raise HTTPException(status_code=500, detail="Database connection error")
 
     # Allow login with either email or username
-    user = user_collection.find_one({
+    user = await user_collection.find_one({
         "$or": [
             {"email": form_data.username},
             {"username": form_data.username}
         ]
     })
-    if not user or not verify_password(form_data.password, user["password"]):
+    try:
+        valid = bool(user) and await password_pool.verify(form_data.password, user["password"])
+    except PasswordPoolBusy:
+        raise password_pool_busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -1,101 +1,143 @@
 import os
-import google.generativeai as genai
-from fastapi import APIRouter, HTTPException
-from database import content_collection
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from database import adb
+from services import llm
 from dotenv import load_dotenv
 
 load_dotenv()
 
 router = APIRouter()
 
-# Configure Gemini
+# Configure Gemini (services/llm.py; LLM_PROVIDER=stub for a local stub)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-pro")
+model = llm.make_provider("gemini", GEMINI_API_KEY, "gemini-pro")
+
+# The whole report (queries + LLM analysis) is reused for this long, and
+# concurrent requests while it is being built share one computation
+OVERVIEW_TTL = float(os.getenv("ANALYSIS_OVERVIEW_TTL_SECONDS", "300"))
+OVERVIEW_KEY = "analysis-v2:overview"
 
 @router.get("/overview")
-async def get_dataset_analytics():
+async def get_dataset_analytics(stream: bool = Query(False)):
+    """Dataset summary plus an LLM report; with ?stream=true the report is sent as Server-Sent Events"""
     try:
-        if content_collection is None:
-             raise Exception("Database connection not established")
+        if stream:
+            return await stream_overview()
+        return await llm.cache.get_or_compute(OVERVIEW_KEY, build_overview, ttl=OVERVIEW_TTL)
+    except Exception as e:
+        print(f"Analysis Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Database analysis failed: {str(e)}")
 
-        # 1. Total Count
-        total_count = content_collection.count_documents({})
-        
-        # 2. Platform Distribution (Aggregation)
-        pipeline = [
-            {"$project": {"Netflix": 1, "Hulu": 1, "Prime Video": 1, "Disney+": 1}},
-            {"$group": {
-                "_id": None,
-                "Netflix": {"$sum": "$Netflix"},
-                "Hulu": {"$sum": "$Hulu"},
-                "Prime Video": {"$sum": "$Prime Video"},
-                "Disney+": {"$sum": "$Disney+"}
-            }}
-        ]
-        
-        platforms = []
+async def build_overview():
+    """Dataset summary queries plus the Gemini report over them"""
+    metadata, prompt = await overview_inputs()
+    return {"metadata": metadata, "analysis": await llm.complete(model, prompt)}
+
+async def stream_overview() -> StreamingResponse:
+    """SSE: a "metadata" event, "delta" chunks of the report as they arrive, then "done".
+    A cached report is replayed as one delta; a freshly streamed one is cached when complete."""
+    cached = llm.cache.get(OVERVIEW_KEY)
+    if cached is None:
+        metadata, prompt = await overview_inputs()
+
+    async def events():
+        if cached is not None:
+            yield llm.sse_event(cached["metadata"], event="metadata")
+            yield llm.sse_event({"delta": cached["analysis"]})
+            yield llm.sse_event({}, event="done")
+            return
+        yield llm.sse_event(metadata, event="metadata")
+        parts = []
         try:
-            agg_result = list(content_collection.aggregate(pipeline))
-            if agg_result:
-                res = agg_result[0]
-                for key in ["Netflix", "Hulu", "Prime Video", "Disney+"]:
-                    platforms.append({"_id": key, "count": res.get(key, 0)})
-        except Exception:
-             # Fallback if aggregation fails or fields missing
-             pass
+            async for chunk in llm.astream(model, prompt):
+                parts.append(chunk)
+                yield llm.sse_event({"delta": chunk})
+        except Exception as e:
+            print(f"Analysis Error: {e}")
+            yield llm.sse_event({"detail": str(e)}, event="error")
+            return
+        llm.cache.put(OVERVIEW_KEY, {"metadata": metadata, "analysis": "".join(parts)}, ttl=OVERVIEW_TTL)
+        yield llm.sse_event({}, event="done")
 
-        # 3. Top Genres
-        # Assuming genres is a string "Action, Drama" -> split and count
-        # In Mongo 4.2+ we can use $split, but python side on sample is safer if schema varies
-        
-        # Efficient Sample for Text Analysis
-        cursor = content_collection.aggregate([{"$sample": {"size": 500}}])
-        data_sample = list(cursor)
-        
-        genre_counts = {}
-        for item in data_sample:
-            g_str = item.get("genres", "")
-            if g_str and isinstance(g_str, str):
-                g_list = [x.strip() for x in g_str.split(",")]
-                for g in g_list:
-                     genre_counts[g] = genre_counts.get(g, 0) + 1
-        
-        sorted_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        genres = [{"_id": k, "count": v} for k, v in sorted_genres]
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-        # 4. Top Rated
-        top_rated_cursor = content_collection.find().sort("imdb", -1).limit(10)
-        top_rated_clean = [{"title": x.get("title"), "imdb": x.get("imdb"), "platform": x.get("platform")} for x in top_rated_cursor]
+async def overview_inputs():
+    """(metadata, prompt) for the report: count, platform split, sampled genres, top rated"""
+    content_collection = adb.content
+    if content_collection is None:
+         raise Exception("Database connection not established")
 
-        # Build prompt for Gemini
-        prompt = f"""
-        You are a Data Analyst for an OTT Platform. Analyze the following summary of our movie dataset:
-        
-        - Total Movies: {total_count}
-        - Platform Distribution: {platforms}
-        - Top 10 Genres (Sampled): {genres}
-        - Top 10 Rated Movies: {top_rated_clean}
-        
-        Provide a comprehensive analysis including:
-        1. Content saturation per platform.
-        2. Quality trends based on IMDb ratings.
-        3. Strategic recommendations for content acquisition.
-        4. Any interesting patterns you notice.
-        
-        Keep the analysis professional, insightful, and formatted for a report.
-        """
-        
-        response = model.generate_content(prompt)
-        
-        return {
-            "metadata": {
-                "total_count": total_count,
-                "platforms": platforms,
-                "top_rated_sample": top_rated_clean
-            },
-            "analysis": response.text
-        }
-    except Exception as e:
-        print(f"Analysis Error: {e}")
-        raise HTTPException(status_code=500, detail=f"Database analysis failed: {str(e)}")
+    # 1. Total Count
+    total_count = await content_collection.count_documents({})
+    
+    # 2. Platform Distribution (Aggregation)
+    pipeline = [
+        {"$project": {"Netflix": 1, "Hulu": 1, "Prime Video": 1, "Disney+": 1}},
+        {"$group": {
+            "_id": None,
+            "Netflix": {"$sum": "$Netflix"},
+            "Hulu": {"$sum": "$Hulu"},
+            "Prime Video": {"$sum": "$Prime Video"},
+            "Disney+": {"$sum": "$Disney+"}
+        }}
+    ]
+    
+    platforms = []
+    try:
+        agg_result = await content_collection.aggregate(pipeline).to_list(length=None)
+        if agg_result:
+            res = agg_result[0]
+            for key in ["Netflix", "Hulu", "Prime Video", "Disney+"]:
+                platforms.append({"_id": key, "count": res.get(key, 0)})
+    except Exception:
+         # Fallback if aggregation fails or fields missing
+         pass
+
+    # 3. Top Genres
+    # Assuming genres is a string "Action, Drama" -> split and count
+    # In Mongo 4.2+ we can use $split, but python side on sample is safer if schema varies
+    
+    # Efficient Sample for Text Analysis
+    cursor = content_collection.aggregate([{"$sample": {"size": 500}}])
+    data_sample = await cursor.to_list(length=None)
+    
+    genre_counts = {}
+    for item in data_sample:
+        g_str = item.get("genres", "")
+        if g_str and isinstance(g_str, str):
+            g_list = [x.strip() for x in g_str.split(",")]
+            for g in g_list:
+                 genre_counts[g] = genre_counts.get(g, 0) + 1
+    
+    sorted_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    genres = [{"_id": k, "count": v} for k, v in sorted_genres]
+
+    # 4. Top Rated
+    top_rated_cursor = content_collection.find().sort("imdb", -1).limit(10)
+    top_rated_clean = [{"title": x.get("title"), "imdb": x.get("imdb"), "platform": x.get("platform")} async for x in top_rated_cursor]
+
+    # Build prompt for Gemini
+    prompt = f"""
+    You are a Data Analyst for an OTT Platform. Analyze the following summary of our movie dataset:
+    
+    - Total Movies: {total_count}
+    - Platform Distribution: {platforms}
+    - Top 10 Genres (Sampled): {genres}
+    - Top 10 Rated Movies: {top_rated_clean}
+    
+    Provide a comprehensive analysis including:
+    1. Content saturation per platform.
+    2. Quality trends based on IMDb ratings.
+    3. Strategic recommendations for content acquisition.
+    4. Any interesting patterns you notice.
+    
+    Keep the analysis professional, insightful, and formatted for a report.
+    """
+    
+    metadata = {
+        "total_count": total_count,
+        "platforms": platforms,
+        "top_rated_sample": top_rated_clean
+    }
+    return metadata, prompt
@@ -1,9 +1,70 @@
-from fastapi import APIRouter
-from database import content_collection
+import json
+import re
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from database import adb
+from services.pagination import counts, encode_cursor, decode_cursor
 
 router = APIRouter()
 
+MAX_LIMIT = 500
+STREAM_BATCH_SIZE = 500
+FIELD_NAME = re.compile(r"^[A-Za-z0-9_+ ]+$")
+
+def parse_fields(fields: Optional[str]) -> Optional[dict]:
+    """Projection from a comma-separated field list ("title,year,imdb"); None returns whole documents"""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    if not names or not all(FIELD_NAME.match(f) for f in names):
+        raise HTTPException(status_code=400, detail="fields must be a comma-separated list of field names")
+    return {name: 1 for name in names}
+
+def to_json(doc: dict) -> dict:
+    doc["_id"] = str(doc["_id"])
+    return doc
+
 @router.get('/{platform_name}')
-def get_platform_data(platform_name: str):
-    data = list(content_collection.find({"platform": platform_name}))
-    return {"count": len(data), "items": data}
+async def get_platform_data(
+    platform_name: str,
+    fields: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """Content on one platform in _id order.
+
+    json: a page of `limit` items plus next_cursor. ndjson: every remaining item
+    (after `cursor`, if given), one JSON document per line, encoded as the
+    database cursor yields them; the total is in the X-Total-Count header."""
+    content_collection = adb.content
+    if content_collection is None:
+        raise HTTPException(status_code=500, detail="Database connection error")
+
+    query = {"platform": platform_name}
+    projection = parse_fields(fields)
+    total = await counts.count(content_collection, query)  # counted on the (platform, _id) index
+
+    find = dict(query)
+    if cursor:
+        try:
+            _, last_id = decode_cursor(cursor, "_id", 1)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        find["_id"] = {"$gt": last_id}
+    docs = content_collection.find(find, projection).sort("_id", 1).hint([("platform", 1), ("_id", 1)])
+
+    if format == "ndjson":
+        async def lines():
+            async for doc in docs.batch_size(STREAM_BATCH_SIZE):
+                yield json.dumps(to_json(doc), default=str) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Total-Count": str(total)})
+
+    page = await docs.limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = encode_cursor("_id", 1, page[limit - 1]) if len(page) > limit else None
+    return {
+        "count": total,
+        "items": [to_json(doc) for doc in page[:limit]],
+        "next_cursor": next_cursor
+    }
@@ -1,24 +1,52 @@
+import asyncio
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Query
-from ml.recommender import get_recommendations
-from database import content_collection
+from pydantic import BaseModel, Field
+from ml.recommender import get_recommendations, get_batch_recommendations
+from database import adb
 
 router = APIRouter()
 
+MAX_LIMIT = 50
+MAX_SEEDS = 50
+
+class BatchRecommendRequest(BaseModel):
+    # Omit titles to seed only from the user's history; an explicit empty list is rejected
+    titles: Optional[List[str]] = Field(None, min_length=1, max_length=MAX_SEEDS)
+    # Optionally seed from a user's watch history in user_analytics_data
+    username: Optional[str] = None
+    email: Optional[str] = None
+    history_limit: int = Field(20, ge=1, le=MAX_SEEDS)
+    limit: int = Field(10, ge=1, le=MAX_LIMIT)
+    per_seed: bool = True
+    exclude_watched: bool = True
+
+async def get_watch_history_titles(username: Optional[str], email: Optional[str], limit: int):
+    """Most recently watched titles for a user, newest first"""
+    if adb.user_analytics is None:
+        return []
+    query = {"username": username} if username else {"email": email}
+    doc = await adb.user_analytics.find_one(query, {"history.title": 1, "history.date": 1})
+    if not doc:
+        return []
+    history = sorted(doc.get("history", []), key=lambda h: h.get("date") or "", reverse=True)
+    return [h["title"] for h in history if h.get("title")][:limit]
+
 @router.get("/")
 async def recommend_movies(
     title: str = Query(..., description="The title of the movie to get recommendations for"),
-    limit: int = Query(10, description="Number of recommendations to return")
+    limit: int = Query(10, ge=1, le=MAX_LIMIT, description="Number of recommendations to return")
 ):
     """
     Endpoint to get movie recommendations based on a given title.
     """
     try:
-        results = get_recommendations(title, limit=limit)
+        results = await asyncio.to_thread(get_recommendations, title, limit)
         
         if not results:
             # Check if dataset is loaded at all
             from ml.recommender import engine
-            if engine.df is None or engine.df.empty:
+            if engine.is_empty():
                 return {"error": "Dataset is not loaded. No recommendations possible."}
             
             # Fallback if title not found
@@ -30,3 +58,29 @@ async def recommend_movies(
         raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+@router.post("/batch")
+async def recommend_batch(request: BatchRecommendRequest):
+    """
+    Recommendations for many seed titles (or a user's watch history) in one call.
+    Returns per-seed lists and a merged "because you watched" list.
+    """
+    titles = list(request.titles or [])
+    if request.username or request.email:
+        titles += await get_watch_history_titles(request.username, request.email, request.history_limit)
+    if not titles:
+        raise HTTPException(status_code=400, detail="Provide titles or a user with watch history.")
+
+    try:
+        result = await asyncio.to_thread(
+            get_batch_recommendations, titles, request.limit, request.per_seed, request.exclude_watched
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+    if not result["seeds"]:
+        from ml.recommender import engine
+        if engine.is_empty():
+            return {"error": "Dataset is not loaded. No recommendations possible."}
+        raise HTTPException(status_code=404, detail="None of the seed titles were found in our dataset.")
+    return result
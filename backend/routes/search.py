@@ -1,11 +1,23 @@
-from fastapi import APIRouter
-from database import content_collection
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from services.search import search, suggest
 
 router = APIRouter()
 
 @router.get('/')
-def search_item(query: str):
-    results = list(content_collection.find({
-        "title": {"$regex": query, "$options": "i"}
-    }))
-    return {"results": results}
+def search_item(
+    query: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None)
+):
+    """Ranked title / director / genre search with prefix and typo tolerance (see services/search.py)"""
+    try:
+        results, next_cursor = search(query, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"results": results, "next_cursor": next_cursor}
+
+@router.get('/suggest')
+def suggest_titles(q: str, limit: int = Query(10, ge=1, le=10)):
+    """Typeahead: up to 10 titles starting with `q`, most popular first (served from memory)"""
+    return {"suggestions": suggest(q, limit)}
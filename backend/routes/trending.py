@@ -1,9 +1,37 @@
-from fastapi import APIRouter
-from database import content_collection
+from typing import Literal, Optional
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from database import adb
+from services.views import views, CAPACITY
 
 router = APIRouter()
 
+class ViewEvent(BaseModel):
+    content_id: str
+    platform: Optional[Literal["Netflix", "Hulu", "Prime Video", "Disney+"]] = None
+    minutes: float = Field(0, ge=0, le=24 * 60)
+
+@router.post('/view', status_code=202)
+async def record_view(event: ViewEvent):
+    """Count a view (and its watch minutes); written to the database in the next batch"""
+    try:
+        ObjectId(event.content_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="content_id must be a content _id")
+    views.record(event.content_id, event.platform, event.minutes)
+    return {"status": "accepted"}
+
 @router.get('/')
-def trending_items():
-    items = list(content_collection.find().sort("views", -1).limit(10))
+async def trending_items(limit: int = Query(10, ge=1, le=CAPACITY)):
+    """Most viewed titles, weighted towards recent views (served from memory)"""
+    items = views.top(limit)
+    if len(items) < limit and adb.content is not None:
+        # Cold worker: fill up with the stored all-time view counts
+        seen = {item["_id"] for item in items}
+        async for doc in adb.content.find().sort("views", -1).limit(limit + len(items)):
+            doc["_id"] = str(doc["_id"])
+            if doc["_id"] not in seen and len(items) < limit:
+                items.append(doc)
     return {"trending": items}
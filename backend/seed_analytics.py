@@ -1,5 +1,6 @@
 import json
 from database import user_analytics_collection, client
+from services.traffic import HistoryRollup, reset_history_minutes
 
 def seed_data():
     try:
@@ -12,6 +13,11 @@ def seed_data():
             
             result = user_analytics_collection.insert_many(data)
             print(f"✅ Successfully inserted {len(result.inserted_ids)} records into 'user_analytics_data'")
+            rollup = HistoryRollup()
+            for doc in data:
+                rollup.add(doc.get("history", []))
+            reset_history_minutes()
+            print(f"✅ Rolled up watch time into {rollup.flush()} platform traffic buckets")
         else:
             print("❌ Database collection not initialized.")
             
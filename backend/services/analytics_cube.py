@@ -0,0 +1,119 @@
+"""
+Aggregate cube over the shared catalog for the /analytics endpoints.
+
+Built once per catalog version with shape (platform, year, genre, type):
+
+    platform axis: Netflix, Hulu, Prime Video, Disney+, <all>
+    year axis:     every distinct Year in the catalog
+    genre axis:    every distinct genre (missing -> "Unknown"), <all>
+    type axis:     every distinct Type (missing -> "")
+
+and three measures per cell: item count, IMDb sum and non-null IMDb count.
+Platforms and genres are multi-valued, so they carry an explicit <all> slot
+instead of being summed; years and types are single-valued and are summed.
+Every endpoint and filter combination is then a small slice + sum.
+"""
+import threading
+import numpy as np
+from services.catalog import current_catalog, widen, PLATFORMS
+
+MEASURES = ("count", "imdb_sum", "imdb_n")
+
+class AnalyticsCube:
+    def __init__(self, catalog):
+        self.version = catalog.version
+        n = len(catalog)
+        imdb = widen("IMDb", catalog.column("IMDb"))
+
+        # Axes
+        self.years, year_idx = np.unique(np.asarray(catalog.column("Year")), return_inverse=True)
+        type_codes = np.asarray(catalog.codes("Type"))
+        self.types = list(catalog.dictionary("Type")) + [""]
+        type_idx = np.where(type_codes < 0, len(self.types) - 1, type_codes)
+
+        # Genres: split each distinct Genres string once, then expand to (row, genre) pairs
+        genre_codes = np.asarray(catalog.codes("Genres"))
+        genre_ids = {}
+        entries = [[genre_ids.setdefault(g, len(genre_ids)) for g in entry.split(',')] for entry in catalog.dictionary("Genres")]
+        if (genre_codes < 0).any():
+            entries.append([genre_ids.setdefault("Unknown", len(genre_ids))])
+        genre_codes = np.where(genre_codes < 0, len(entries) - 1, genre_codes)
+        self.genres = list(genre_ids)
+        all_genres = len(self.genres)
+
+        entry_len = np.array([len(e) for e in entries], dtype=np.int64)
+        entry_start = np.concatenate([[0], np.cumsum(entry_len)[:-1]])
+        flat = np.array([g for e in entries for g in e], dtype=np.int64)
+        lengths = entry_len[genre_codes]
+        pair_rows = np.repeat(np.arange(n), lengths)
+        offset = np.arange(len(pair_rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        pair_genres = flat[np.repeat(entry_start[genre_codes], lengths) + offset]
+        # Every row also counts once towards the <all> genre slot
+        pair_rows = np.concatenate([pair_rows, np.arange(n)])
+        pair_genres = np.concatenate([pair_genres, np.full(n, all_genres)])
+
+        # Fill: one bincount per platform slot over the flattened (year, genre, type) cell
+        shape = (len(PLATFORMS) + 1, len(self.years), all_genres + 1, len(self.types))
+        cell = (year_idx[pair_rows] * shape[2] + pair_genres) * shape[3] + type_idx[pair_rows]
+        has_imdb = ~np.isnan(imdb[pair_rows])
+        imdb_values = np.where(has_imdb, imdb[pair_rows], 0.0)
+        size = int(np.prod(shape[1:]))
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.imdb_sum = np.zeros(shape, dtype=np.float64)
+        self.imdb_n = np.zeros(shape, dtype=np.int64)
+        for p in range(shape[0]):
+            if p < len(PLATFORMS):
+                sel = np.asarray(catalog.column(PLATFORMS[p]))[pair_rows] == 1
+            else:
+                sel = slice(None)
+            self.count[p] = np.bincount(cell[sel], minlength=size).reshape(shape[1:])
+            self.imdb_sum[p] = np.bincount(cell[sel], weights=imdb_values[sel], minlength=size).reshape(shape[1:])
+            self.imdb_n[p] = np.bincount(cell[sel], weights=has_imdb[sel], minlength=size).reshape(shape[1:])
+
+        self._platform_pos = {p: i for i, p in enumerate(PLATFORMS)}
+        self._year_pos = {int(y): i for i, y in enumerate(self.years)}
+        self._genre_pos = {g: i for i, g in enumerate(self.genres)}
+        self._type_pos = {t: i for i, t in enumerate(self.types)}
+
+    def query(self, measure: str = "count", by: str = None, platform: str = None, year: int = None, genre: str = None, type: str = None):
+        """
+        Sum `measure` over every axis except `by` ("platform", "year", "genre" or None),
+        restricted to the given filters. Unknown filter values match nothing.
+        """
+        def select(pos, value, all_slot):
+            if value is None:
+                return [all_slot] if all_slot is not None else list(range(len(pos)))
+            return [pos[value]] if value in pos else []
+
+        axes = {
+            "platform": select(self._platform_pos, platform, len(PLATFORMS)),
+            "year": select(self._year_pos, year, None),
+            "genre": select(self._genre_pos, genre, len(self.genres)),
+            "type": select(self._type_pos, type.lower() if type else type, None),
+        }
+        if by == "platform":
+            axes["platform"] = list(range(len(PLATFORMS)))
+        elif by == "genre":
+            axes["genre"] = list(range(len(self.genres)))
+        elif by == "year":
+            axes["year"] = list(range(len(self.years)))
+
+        block = getattr(self, measure)[np.ix_(*axes.values())]
+        keep = list(axes).index(by) if by else None
+        summed = tuple(i for i in range(block.ndim) if i != keep)
+        return block.sum(axis=summed)
+
+_cube = None
+_lock = threading.Lock()
+
+def get_cube() -> AnalyticsCube:
+    """Cube for the current catalog version, rebuilt when a new version is published"""
+    global _cube
+    catalog = current_catalog()
+    cube = _cube
+    if cube is not None and cube.version == catalog.version:
+        return cube
+    with _lock:
+        if _cube is None or _cube.version != catalog.version:
+            _cube = AnalyticsCube(catalog)
+        return _cube
@@ -0,0 +1,496 @@
+"""
+Shared, read-only catalog store.
+
+The catalog is published once as memory-mapped columnar files and every
+worker attaches to the same version instead of parsing CSV/JSON into its own
+DataFrames:
+
+    data/catalog/
+        CURRENT                          name of the active version
+        <version>/meta.json
+        <version>/<col>.npy              numeric columns (int16 year, float32 scores)
+        <version>/platforms.npy          platform flags, bit-packed into one uint8 per row
+        <version>/<col>.codes.npy        categorical string columns: int8/16/32 codes...
+        <version>/<col>.dict.blob.npy    ...into UTF-8 dictionary values
+        <version>/<col>.dict.offsets.npy
+        <version>/deltas/000001.ndjson   append-only records added after publishing
+
+Catalog.column() returns numeric columns in their storage dtypes (int16
+year, float32 scores), as the memory-mapped arrays themselves, so workers
+share those pages instead of each holding a widened copy. Platform flags are
+unpacked from the bitmask (uint8 0/1) and string columns are decoded on first
+use, once per worker. Consumers that need the logical dtypes (int64 year,
+float64 scores rounded to the source decimals) use widen()/logical_frame().
+
+Sources: the first version is built from the main dataset (final_df_cleaned
+.json, or dataset/final_df_cleaned.csv) plus the titles in new_data.json, and
+every consumer (recommender, /analytics, /admin/stats) reads that one
+catalog. Before the shared store, /analytics counted the CSV alone and
+/admin/stats the JSON alone, so their numbers now include the new_data.json
+titles (and any published deltas) as well.
+
+Reload handshake: publish() writes a new version directory and then swaps
+CURRENT atomically; append_delta() adds a numbered delta file to the current
+version. Workers re-check CURRENT and the delta count at most every
+CATALOG_RELOAD_SECONDS on access and re-attach ("<version>+<deltas>"), so new
+data goes live without restarting them. build_catalog.py --compact folds the
+deltas into a fresh version.
+"""
+import os
+import json
+import math
+import time
+import hashlib
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from ml.artifacts import encode_strings, decode_strings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(__file__))
+BASE_DIR = os.path.dirname(BACKEND_DIR)
+CATALOG_ROOT = os.getenv("CATALOG_DIR", os.path.join(BACKEND_DIR, "data", "catalog"))
+RELOAD_INTERVAL = float(os.getenv("CATALOG_RELOAD_SECONDS", "5"))
+KEEP_VERSIONS = 3
+FORMAT = 2
+
+# Source datasets (repo root / dataset/)
+FINAL_DF_JSON_PATH = os.path.join(BASE_DIR, "final_df_cleaned.json")
+FINAL_DF_CSV_PATH = os.path.join(BASE_DIR, "dataset", "final_df_cleaned.csv")
+NEW_DATA_PATH = os.path.join(BASE_DIR, "new_data.json")
+
+PLATFORMS = ['Netflix', 'Hulu', 'Prime Video', 'Disney+']
+NUMERIC_COLUMNS = {
+    "Year": np.int64,
+    "IMDb": np.float64,
+    "Runtime": np.float64,
+    "Rotten Tomatoes": np.float64,
+    "Netflix": np.int8,
+    "Hulu": np.int8,
+    "Prime Video": np.int8,
+    "Disney+": np.int8,
+}
+STRING_COLUMNS = ["Title", "Age", "Type", "Directors", "Genres", "Country", "Language"]
+# On-disk dtypes of the non-platform numeric columns; platform flags are packed into PLATFORM_MASK
+STORAGE_DTYPES = {
+    "Year": np.int16,
+    "IMDb": np.float32,
+    "Runtime": np.float32,
+    "Rotten Tomatoes": np.float32,
+}
+PLATFORM_MASK = "platforms"
+# float32 keeps ~7 significant digits; rounding on widening restores the source decimals
+FLOAT_DECIMALS = 4
+
+def code_dtype(size: int):
+    """Smallest signed integer dtype for codes 0..size-1 plus the -1 missing sentinel"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if size <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def pack_platforms(flags: dict):
+    """uint8 mask with bit i set where PLATFORMS[i] == 1"""
+    mask = np.zeros(len(next(iter(flags.values()))), dtype=np.uint8)
+    for bit, p in enumerate(PLATFORMS):
+        mask |= (np.asarray(flags[p]) == 1).astype(np.uint8) << bit
+    return mask
+
+def file_key(column: str) -> str:
+    return column.lower().replace(" ", "_").replace("+", "_plus")
+
+# --- Sources ---
+
+def load_sources() -> pd.DataFrame:
+    """Read the raw datasets (JSON or CSV main file plus new_data.json) into one typed frame"""
+    # 1. Main Dataset
+    if os.path.exists(FINAL_DF_JSON_PATH):
+        with open(FINAL_DF_JSON_PATH, 'r', encoding='utf-8') as f:
+            df_main = pd.DataFrame(json.load(f))
+    elif os.path.exists(FINAL_DF_CSV_PATH):
+        df_main = pd.read_csv(FINAL_DF_CSV_PATH)
+    else:
+        print(f"Warning: Dataset file not found at {FINAL_DF_JSON_PATH} or {FINAL_DF_CSV_PATH}")
+        df_main = pd.DataFrame()
+
+    # 2. New Data (2021-2025), normalized to the main schema
+    df_new = pd.DataFrame()
+    if os.path.exists(NEW_DATA_PATH):
+        with open(NEW_DATA_PATH, 'r', encoding='utf-8') as f:
+            data_new = json.load(f)
+        df_new = pd.DataFrame([normalize_new_item(item) for item in data_new])
+        print(f"Loaded {len(df_new)} new items from new_data.json")
+
+    return coerce_types(pd.concat([df_main, df_new], ignore_index=True))
+
+def normalize_new_item(item: dict) -> dict:
+    return {
+        "Title": item.get("title"),
+        "Year": item.get("year"),
+        "Type": item.get("type", "Movie").lower(),
+        "IMDb": item.get("imdb_rating", 0),
+        "Genres": "Drama", # Default genre if missing
+        "Directors": "Unknown",
+        "Country": "Unknown",
+        "Language": "English",
+        "Runtime": 0,
+        "Netflix": 1 if item.get("platform") == "Netflix" else 0,
+        "Hulu": 1 if item.get("platform") == "Hulu" else 0,
+        "Prime Video": 1 if item.get("platform") == "Prime Video" else 0,
+        "Disney+": 1 if item.get("platform") == "Disney+" else 0,
+        "Rotten Tomatoes": None
+    }
+
+def as_text(value) -> str:
+    """A free-form document field as catalog text: lists are comma-joined, missing values are ''"""
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(v).strip() for v in value if v is not None)
+    return str(value)
+
+def as_number(value) -> float:
+    """A numeric document field; anything unparseable or non-finite (NaN, inf) is 0"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if math.isfinite(number) else 0.0
+
+def content_to_row(doc: dict) -> dict:
+    """Map an admin content document ({title, platform, imdb, year, genres, type}) to catalog columns.
+    Admins can store any JSON, so every field is coerced to the column's type."""
+    platforms = {p.strip() for p in as_text(doc.get("platform")).split(",")}
+    title = doc.get("title")
+    row = {
+        "Title": None if title is None else as_text(title),
+        "Year": int(as_number(doc.get("year"))),
+        "Type": as_text(doc.get("type")).lower(),
+        "IMDb": as_number(doc.get("imdb")),
+        "Genres": as_text(doc.get("genres")),
+        "Directors": as_text(doc.get("directors")),
+    }
+    for p in PLATFORMS:
+        row[p] = 1 if p in platforms else 0
+    return row
+
+def widen(column: str, values):
+    """A numeric column at its logical dtype (NUMERIC_COLUMNS); floats are rounded back to the source decimals"""
+    values = np.asarray(values).astype(NUMERIC_COLUMNS[column])
+    return values.round(FLOAT_DECIMALS) if np.issubdtype(values.dtype, np.floating) else values
+
+def logical_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of a catalog frame with its numeric columns widened (see widen)"""
+    return df.assign(**{col: widen(col, df[col]) for col in NUMERIC_COLUMNS if col in df.columns})
+
+def coerce_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Give every catalog column its storage dtype (missing platform flags/years become 0)"""
+    out = pd.DataFrame(index=df.index)
+    for col, dtype in NUMERIC_COLUMNS.items():
+        values = pd.to_numeric(df[col], errors='coerce') if col in df.columns else pd.Series(np.nan, index=df.index)
+        if np.issubdtype(dtype, np.integer):
+            values = values.fillna(0)
+        out[col] = values.astype(dtype)
+    for col in STRING_COLUMNS:
+        values = df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+        out[col] = values.astype(object).where(values.notna(), None)
+    return out
+
+# --- Snapshots ---
+
+class Catalog:
+    """One immutable catalog version: compact numeric arrays, a platform bitmask, and
+    categorical string columns as codes + dictionary. A dictionary may be given still
+    encoded, as (blob, offsets), and is then decoded on first use."""
+
+    def __init__(self, version: str, numeric: dict, mask, codes: dict, dictionaries: dict, meta: dict = None):
+        self.version = version
+        self.meta = meta or {}
+        self._numeric = numeric
+        self._mask = mask
+        self._codes = codes
+        self._dictionaries = dict(dictionaries)
+        self._decoded = {}
+        self._frame = None
+        self._lock = threading.RLock()  # frame() decodes string columns while holding it
+
+    def __len__(self):
+        return len(self._mask) if self._mask is not None else 0
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, version: str = None):
+        """Encode a typed frame (coerce_types) into an in-memory (unpublished) catalog"""
+        numeric = {col: df[col].to_numpy(dtype=dtype) for col, dtype in STORAGE_DTYPES.items()}
+        mask = pack_platforms({p: df[p].to_numpy() for p in PLATFORMS})
+        codes, dictionaries = {}, {}
+        for col in STRING_COLUMNS:
+            col_codes, uniques = pd.factorize(df[col], use_na_sentinel=True)
+            codes[col] = col_codes.astype(code_dtype(len(uniques)))
+            dictionaries[col] = [str(v) for v in uniques]
+        catalog = cls(version, numeric, mask, codes, dictionaries, {"items": len(df)})
+        if catalog.version is None:
+            catalog.version = catalog.fingerprint()
+        return catalog
+
+    @classmethod
+    def attach(cls, path: str, deltas: list = None):
+        """Memory-map a published version directory, plus its delta files (default: all of them)"""
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        if meta.get("format", 1) >= 2:
+            numeric = {col: load(file_key(col)) for col in STORAGE_DTYPES}
+            mask = load(PLATFORM_MASK)
+        else:
+            # Format 1: every numeric column stored wide, one int8 array per platform
+            numeric = {col: load(file_key(col)) for col in STORAGE_DTYPES}
+            mask = pack_platforms({p: load(file_key(p)) for p in PLATFORMS})
+        codes, dictionaries = {}, {}
+        for col in STRING_COLUMNS:
+            key = file_key(col)
+            codes[col] = load(f"{key}.codes")
+            dictionaries[col] = (load(f"{key}.dict.blob"), load(f"{key}.dict.offsets"))
+        catalog = cls(meta["version"], numeric, mask, codes, dictionaries, meta)
+        if deltas is None:
+            deltas = delta_files(path)
+        if deltas:
+            catalog = catalog.extended(read_deltas(deltas), f"{meta['version']}+{len(deltas)}")
+        return catalog
+
+    def extended(self, df: pd.DataFrame, version: str):
+        """New in-memory catalog with the (typed) rows of df appended; string dictionaries are extended"""
+        if df.empty:
+            return self
+        numeric = {col: np.concatenate([self._numeric[col], df[col].to_numpy(dtype=dtype)])
+                   for col, dtype in STORAGE_DTYPES.items()}
+        mask = np.concatenate([self._mask, pack_platforms({p: df[p].to_numpy() for p in PLATFORMS})])
+        codes, dictionaries = {}, {}
+        for col in STRING_COLUMNS:
+            values = list(self.dictionary(col))
+            index = {v: i for i, v in enumerate(values)}
+            new_codes = np.array([-1 if v is None else index.setdefault(str(v), len(index)) for v in df[col]], dtype=np.int64)
+            values.extend(list(index)[len(values):])
+            dtype = code_dtype(len(values))
+            codes[col] = np.concatenate([np.asarray(self._codes[col], dtype=dtype), new_codes.astype(dtype)])
+            dictionaries[col] = values
+        meta = dict(self.meta, items=len(mask), deltas=self.meta.get("deltas", 0) + 1)
+        return Catalog(version, numeric, mask, codes, dictionaries, meta)
+
+    def fingerprint(self) -> str:
+        h = hashlib.sha1()
+        for col in STORAGE_DTYPES:
+            h.update(np.ascontiguousarray(self._numeric[col]).tobytes())
+        h.update(np.ascontiguousarray(self._mask).tobytes())
+        for col in STRING_COLUMNS:
+            h.update(np.ascontiguousarray(self._codes[col]).tobytes())
+            h.update("\x00".join(self.dictionary(col)).encode("utf-8"))
+        return h.hexdigest()[:12]
+
+    def codes(self, column: str):
+        return self._codes[column]
+
+    def dictionary(self, column: str) -> list:
+        values = self._dictionaries[column]
+        if isinstance(values, tuple):
+            with self._lock:
+                values = self._dictionaries[column]
+                if isinstance(values, tuple):
+                    values = self._dictionaries[column] = decode_strings(*values)
+        return values
+
+    def stored(self, column: str):
+        """A column in its compact storage form (platforms -> the shared bitmask)"""
+        if column in PLATFORMS or column == PLATFORM_MASK:
+            return self._mask
+        return self._numeric.get(column, self._codes.get(column))
+
+    def column(self, column: str):
+        """Numeric columns as stored (the memory-mapped array, no copy); platform flags as uint8 0/1;
+        string columns decoded to an object array (None for missing). Derived arrays are cached per version."""
+        if column in self._numeric:
+            return self._numeric[column]
+        if column not in self._decoded:
+            if column in PLATFORMS:
+                bit = PLATFORMS.index(column)
+                values = (self._mask >> bit) & 1
+            else:
+                lookup = np.array(self.dictionary(column) + [None], dtype=object)
+                # Code -1 (missing) indexes the trailing None
+                values = lookup[self._codes[column]]
+            self._decoded[column] = values
+        return self._decoded[column]
+
+    def frame(self) -> pd.DataFrame:
+        """DataFrame of the whole catalog in storage dtypes (see column), built once per version.
+        Treat as read-only; logical_frame() gives a widened copy."""
+        if self._frame is None:
+            with self._lock:
+                if self._frame is None:
+                    self._frame = pd.DataFrame({col: self.column(col) for col in STRING_COLUMNS + list(NUMERIC_COLUMNS)})
+        return self._frame
+
+    def to_records(self) -> list:
+        """Rows as plain dicts in the source JSON schema (NaN -> None)"""
+        df = logical_frame(self.frame())
+        return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+# --- Publishing ---
+
+def publish(catalog: Catalog, root: str = CATALOG_ROOT) -> str:
+    """Write a catalog version and make it CURRENT. Returns the version name."""
+    os.makedirs(root, exist_ok=True)
+    final = os.path.join(root, catalog.version)
+    if not os.path.exists(os.path.join(final, "meta.json")):
+        tmp = tempfile.mkdtemp(prefix=f".{catalog.version}-", dir=root)
+        try:
+            for col in STORAGE_DTYPES:
+                np.save(os.path.join(tmp, f"{file_key(col)}.npy"), np.ascontiguousarray(catalog.stored(col)))
+            np.save(os.path.join(tmp, f"{PLATFORM_MASK}.npy"), np.ascontiguousarray(catalog.stored(PLATFORM_MASK)))
+            for col in STRING_COLUMNS:
+                key = file_key(col)
+                blob, offsets = encode_strings(catalog.dictionary(col))
+                np.save(os.path.join(tmp, f"{key}.codes.npy"), np.ascontiguousarray(catalog.codes(col)))
+                np.save(os.path.join(tmp, f"{key}.dict.blob.npy"), blob)
+                np.save(os.path.join(tmp, f"{key}.dict.offsets.npy"), offsets)
+            meta = dict(catalog.meta, version=catalog.version, items=len(catalog), format=FORMAT,
+                        published_at=datetime.utcnow().isoformat())
+            meta.pop("deltas", None)
+            with open(os.path.join(tmp, "meta.json"), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            if os.path.exists(final):
+                shutil.rmtree(final)
+            os.rename(tmp, final)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    # Atomic pointer swap: workers see either the old or the new version, never a partial one
+    pointer_tmp = os.path.join(root, f".CURRENT.{os.getpid()}")
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        f.write(catalog.version)
+    os.replace(pointer_tmp, os.path.join(root, "CURRENT"))
+    prune_versions(root, keep=catalog.version)
+    return catalog.version
+
+def prune_versions(root: str, keep: str):
+    """Drop all but the newest KEEP_VERSIONS versions. Attached workers keep their mapped pages."""
+    versions = [d for d in os.listdir(root) if not d.startswith(".") and os.path.isdir(os.path.join(root, d))]
+    versions.sort(key=lambda d: os.path.getmtime(os.path.join(root, d)), reverse=True)
+    for name in versions[KEEP_VERSIONS:]:
+        if name != keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+# --- Deltas ---
+
+def read_pointer(root: str = CATALOG_ROOT):
+    try:
+        with open(os.path.join(root, "CURRENT"), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def delta_files(version_path: str) -> list:
+    """Delta files of a version directory, in append order"""
+    path = os.path.join(version_path, "deltas")
+    if not os.path.isdir(path):
+        return []
+    return [os.path.join(path, name) for name in sorted(os.listdir(path))
+            if name.endswith(".ndjson") and not name.startswith(".")]
+
+def read_deltas(files: list) -> pd.DataFrame:
+    rows = []
+    for file in files:
+        with open(file, 'r', encoding='utf-8') as f:
+            rows.extend(json.loads(line) for line in f if line.strip())
+    return coerce_types(pd.DataFrame(rows))
+
+def base_version(version: str) -> str:
+    """The published version that a "<version>+<deltas>" catalog version extends"""
+    return version.split("+", 1)[0]
+
+def append_delta(rows: list, root: str = CATALOG_ROOT) -> str:
+    """Append records (source JSON schema) to the current version as a new delta file.
+    Existing files are never rewritten. Returns the catalog version that now includes them."""
+    version = read_pointer(root)
+    if version is None:
+        raise RuntimeError(f"No published catalog in {root}; run build_catalog.py first")
+    typed = coerce_types(pd.DataFrame(rows))
+    records = typed.astype(object).where(typed.notna(), None).to_dict(orient="records")
+
+    path = os.path.join(root, version, "deltas")
+    os.makedirs(path, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".delta-", suffix=".ndjson", dir=path)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    # Claim the next sequence number without overwriting a concurrent writer's file
+    seq = len(delta_files(os.path.join(root, version))) + 1
+    while True:
+        try:
+            os.link(tmp, os.path.join(path, f"{seq:06d}.ndjson"))
+            break
+        except FileExistsError:
+            seq += 1
+    os.remove(tmp)
+    return f"{version}+{len(delta_files(os.path.join(root, version)))}"
+
+# --- Attaching ---
+
+class CatalogStore:
+    """Per-worker handle on the shared catalog; follows CURRENT as new versions are published"""
+
+    def __init__(self, root: str = CATALOG_ROOT, reload_interval: float = RELOAD_INTERVAL):
+        self.root = root
+        self.reload_interval = reload_interval
+        self._catalog = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Catalog:
+        now = time.monotonic()
+        if self._catalog is not None and now - self._checked_at < self.reload_interval:
+            return self._catalog
+        with self._lock:
+            if self._catalog is None or now - self._checked_at >= self.reload_interval:
+                self._refresh()
+                self._checked_at = time.monotonic()
+        return self._catalog
+
+    def _refresh(self):
+        base = read_pointer(self.root)
+        if base is None:
+            if self._catalog is None:
+                self._catalog = self._bootstrap()
+            return
+        deltas = delta_files(os.path.join(self.root, base))
+        version = f"{base}+{len(deltas)}" if deltas else base
+        if self._catalog is not None and self._catalog.version == version:
+            return
+        try:
+            self._catalog = Catalog.attach(os.path.join(self.root, base), deltas)
+            print(f"Attached catalog version {version} ({len(self._catalog)} items)")
+        except Exception as e:
+            print(f"Error attaching catalog version {version}: {e}")
+            if self._catalog is None:
+                self._catalog = Catalog.from_frame(load_sources())
+
+    def _bootstrap(self) -> Catalog:
+        """No published catalog yet: build from the raw sources and publish it for the other workers"""
+        catalog = Catalog.from_frame(load_sources())
+        try:
+            publish(catalog, self.root)
+            print(f"Published catalog version {catalog.version} ({len(catalog)} items)")
+        except Exception as e:
+            print(f"Could not publish catalog (serving in-memory copy): {e}")
+        return catalog
+
+store = CatalogStore()
+
+def current_catalog() -> Catalog:
+    return store.current()
@@ -0,0 +1,187 @@
+"""
+Admin dashboard snapshot.
+
+The /admin/stats aggregates (catalog counts, genre rankings, user and
+top-viewed queries) are computed in the background instead of on the
+request path. A task started by the app lifespan recomputes them in a worker
+thread every DASHBOARD_REFRESH_SECONDS, and sooner when a new catalog version
+is published; /admin/stats returns the latest snapshot together with its age.
+"""
+import os
+import math
+import asyncio
+import time
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from database import content_collection, user_collection
+from services.catalog import current_catalog, logical_frame, PLATFORMS
+
+REFRESH_INTERVAL = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "60"))
+CHECK_INTERVAL = 5
+
+def compute_stats() -> dict:
+    """Every /admin/stats aggregate, as a JSON-ready dict"""
+    # Use the shared catalog store for heavy stats to avoid costly DB reads on raw data
+    df = pd.DataFrame()
+    try:
+        df = logical_frame(current_catalog().frame())
+    except Exception: pass
+
+    # Sanitize dataframe (logical_frame already returned a private copy)
+    if not df.empty:
+        df = df.assign(
+            IMDb=df['IMDb'].fillna(0),
+            Title=df['Title'].fillna('Unknown Title'),
+            Genres=df['Genres'].fillna('Unknown'),
+        )
+        total_movies = int(len(df))
+    else:
+        # Fallback to DB count
+        total_movies = 0
+        if content_collection is not None:
+             total_movies = content_collection.count_documents({})
+
+    # Platform counts
+    platform_counts = {}
+    avg_imdb = 0.0
+
+    if not df.empty:
+        for p in PLATFORMS:
+            platform_counts[p] = int((df[p] == 1).sum()) if p in df.columns else 0
+
+        avg_imdb = df['IMDb'].mean()
+        if pd.isna(avg_imdb) or math.isinf(avg_imdb): avg_imdb = 0.0
+    else:
+        for p in PLATFORMS: platform_counts[p] = 0
+
+    # Total Users
+    total_users = 0
+    if user_collection is not None:
+         total_users = user_collection.count_documents({})
+
+    userData = [
+        {"name": "New Customer", "value": int(total_users * 0.25)},
+        {"name": "Existing Subscriber's", "value": int(total_users * 0.45)},
+        {"name": "Daily Visitor's", "value": int(total_users * 0.2)},
+        {"name": "Extended Subscriber's", "value": int(total_users * 0.1)}
+    ]
+
+    # Timeline (Mocked for visual)
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=30)
+    platform_traffic_timeline = []
+    current_date = start_date
+    total_content_count = sum(platform_counts.values()) or 1
+    factors = {k: v/total_content_count for k, v in platform_counts.items()}
+
+    while current_date <= end_date:
+        daily_base = np.random.randint(2000, 5000)
+        day_data = {"date": current_date.strftime("%b %d")}
+        for p in PLATFORMS:
+            share = factors.get(p, 0.25)
+            noise = np.random.uniform(0.9, 1.1)
+            day_data[p] = int(daily_base * share * noise)
+        platform_traffic_timeline.append(day_data)
+        current_date += timedelta(days=1)
+
+    # Categories (one explode + value_counts serves both lists)
+    categoryData = []
+    topCategoryData = []
+
+    if not df.empty:
+        genre_counts = df['Genres'].str.split(',').explode().str.strip().value_counts()
+        for genre, count in genre_counts.head(7).items():
+             categoryData.append({"name": str(genre), "thisMonth": int(count * 0.1), "lastMonth": int(count * 0.08)})
+
+        # Top 6
+        trends = ["+24%", "-8%", "+60%", "+44%", "+55%", "+40%"]
+        for i, (genre, count) in enumerate(genre_counts.head(6).items()):
+            topCategoryData.append({
+                "name": str(genre),
+                "value": int(count),
+                "percentage": round((count / total_movies) * 100, 1) if total_movies > 0 else 0,
+                "trend": trends[i % len(trends)]
+            })
+
+    # Top Viewed (From DB or DF)
+    top_viewed = []
+    if content_collection is not None:
+        try:
+            cursor = content_collection.find().sort("views", -1).limit(5)
+            top_viewed = [dict(doc, _id=str(doc["_id"])) for doc in cursor]
+        except Exception as e:
+            print(f"Dashboard top viewed query failed: {e}")
+
+    if not top_viewed and not df.empty:
+         sample = df.sample(min(5, len(df)))
+         for _, row in sample.iterrows():
+            imdb_val = row['IMDb']
+            if pd.isna(imdb_val): imdb_val = 0.0
+            avail = [p for p in PLATFORMS if row.get(p) == 1]
+            top_viewed.append({
+                "title": str(row['Title']),
+                "platform": ", ".join(avail) if avail else "Other",
+                "imdb": float(imdb_val),
+                "year": int(row['Year']),
+                "genres": str(row['Genres']),
+                "type": str(row.get('Type', 'movie')),
+                "views": int(np.random.randint(1000, 5000))
+            })
+
+    return jsonable_encoder({
+        "total_movies": int(total_movies),
+        "platform_counts": platform_counts,
+        "avg_imdb": round(float(avg_imdb), 2),
+        "total_users": int(total_users),
+        "userData": userData,
+        "categoryData": categoryData,
+        "topCategoryData": topCategoryData,
+        "top_viewed": top_viewed,
+        "platform_traffic_timeline": platform_traffic_timeline
+    })
+
+class DashboardSnapshot:
+    """Latest computed stats plus when (and for which catalog version) they were computed"""
+
+    def __init__(self, refresh_interval: float = REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.stats = None
+        self.computed_at = None
+        self.catalog_version = None
+        self._computed_mono = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            version = current_catalog().version
+            self.stats = compute_stats()
+            self.catalog_version = version
+            self.computed_at = datetime.utcnow()
+            self._computed_mono = time.monotonic()
+
+    def age(self) -> float:
+        return time.monotonic() - self._computed_mono if self.stats is not None else None
+
+    def is_stale(self) -> bool:
+        if self.stats is None or self.age() >= self.refresh_interval:
+            return True
+        return current_catalog().version != self.catalog_version
+
+    async def run(self):
+        """Refresh loop, run as an asyncio task; the work itself happens in worker threads"""
+        while True:
+            try:
+                if await asyncio.to_thread(self.is_stale):
+                    await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"Dashboard snapshot refresh failed: {e}")
+            await asyncio.sleep(CHECK_INTERVAL)
+
+snapshot = DashboardSnapshot()
+
+def start_dashboard_refresh() -> asyncio.Task:
+    """Start the background refresher on the running loop. Cancel the task to stop it."""
+    return asyncio.create_task(snapshot.run(), name="dashboard-snapshot")
@@ -0,0 +1,174 @@
+"""
+Streaming export of the content collection.
+
+Documents are read from a batched cursor in _id order and each batch is
+encoded and sent before the next one is read, so memory per export stays at
+one batch whatever the catalog size:
+
+    ndjson   one JSON document per line (projected fields, or whole documents)
+    csv      header row + one row per document, columns = the selected fields
+    parquet  one row group per batch (needs pyarrow, an optional dependency)
+
+CSV and Parquet need fixed columns, so they use the requested fields or
+DEFAULT_FIELDS. Throughput (documents, bytes, bytes/sec) is logged every
+PROGRESS_INTERVAL seconds and when the export ends.
+"""
+import io
+import csv
+import json
+import time
+import asyncio
+
+EXPORT_BATCH_SIZE = 2000
+CHUNK_BYTES = 1 << 16
+PROGRESS_INTERVAL = 5.0
+DEFAULT_FIELDS = ["_id", "title", "platform", "imdb", "year", "genres", "type", "views"]
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def plain(value):
+    """Value as NDJSON/CSV/Parquet can hold it (ObjectId, datetime -> str)"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+class ExportMeter:
+    """Counts documents/bytes sent and logs throughput"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.docs = 0
+        self.bytes = 0
+        self.start = self._last_log = time.monotonic()
+
+    def add(self, docs: int, data: bytes):
+        self.docs += docs
+        self.bytes += len(data)
+        now = time.monotonic()
+        if now - self._last_log >= PROGRESS_INTERVAL:
+            self._last_log = now
+            self.log("in progress")
+
+    def rate(self) -> float:
+        return self.bytes / max(time.monotonic() - self.start, 1e-9)
+
+    def log(self, state: str):
+        elapsed = time.monotonic() - self.start
+        print(f"📦 Export {self.label} {state}: {self.docs} docs, {self.bytes / 1e6:.1f} MB "
+              f"in {elapsed:.1f}s ({self.rate() / 1e6:.2f} MB/s)")
+
+async def batches(cursor, size: int = EXPORT_BATCH_SIZE):
+    batch = []
+    async for doc in cursor.batch_size(size):
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def encode_ndjson(batch: list) -> bytes:
+    return "".join(json.dumps({k: plain(v) for k, v in doc.items()}) + "\n" for doc in batch).encode()
+
+def encode_csv(batch: list, fields: list, header: bool) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(fields)
+    for doc in batch:
+        writer.writerow([plain(doc.get(f)) for f in fields])
+    return out.getvalue().encode()
+
+def as_int(value):
+    try:
+        return None if value is None or value == "" else int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def as_float(value):
+    try:
+        return None if value is None or value == "" else float(value)
+    except (TypeError, ValueError):
+        return None
+
+def as_str(value):
+    return None if value is None else str(value)
+
+CONVERTERS = {"int64": as_int, "float64": as_float, "string": as_str}
+
+class ParquetEncoder:
+    """Parquet writer over an in-memory sink that is drained after every row group.
+    Numeric content fields keep their type; every other column is written as strings."""
+
+    NUMERIC_FIELDS = {"imdb": "float64", "year": "int64", "views": "int64", "votes": "int64"}
+
+    def __init__(self, fields: list):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self.fields = fields
+        self.schema = pa.schema([(f, self.NUMERIC_FIELDS.get(f, "string")) for f in fields])
+        self.sink = io.BytesIO()
+        self.writer = pq.ParquetWriter(self.sink, self.schema)
+
+    def _column(self, field: str, batch: list):
+        kind = self.NUMERIC_FIELDS.get(field, "string")
+        convert = CONVERTERS[kind]
+        return self._pa.array([convert(doc.get(field)) for doc in batch], type=kind)
+
+    def encode(self, batch: list) -> bytes:
+        arrays = [self._column(f, batch) for f in self.fields]
+        self.writer.write_table(self._pa.Table.from_arrays(arrays, schema=self.schema))
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.sink.getvalue()
+
+async def export_stream(cursor, fmt: str, fields: list = None, label: str = "content"):
+    """Encoded chunks of every document the cursor yields, in the given format"""
+    meter = ExportMeter(f"{label}.{fmt}")
+    columns = fields or DEFAULT_FIELDS
+    parquet = ParquetEncoder(columns) if fmt == "parquet" else None
+    pending = []
+    pending_bytes = 0
+    finished = False
+    try:
+        async for batch in batches(cursor):
+            if fmt == "ndjson":
+                data = encode_ndjson(batch)
+            elif fmt == "csv":
+                data = encode_csv(batch, columns, header=meter.docs == 0)
+            else:
+                # Columnar encoding is CPU-heavy; keep it off the event loop
+                data = await asyncio.to_thread(parquet.encode, batch)
+            meter.add(len(batch), data)
+            pending.append(data)
+            pending_bytes += len(data)
+            if pending_bytes >= CHUNK_BYTES:
+                yield b"".join(pending)
+                pending, pending_bytes = [], 0
+        if fmt == "csv" and meter.docs == 0:
+            pending.append(encode_csv([], columns, header=True))
+        if parquet is not None:
+            data = parquet.close()
+            meter.add(0, data)
+            pending.append(data)
+        if pending:
+            yield b"".join(pending)
+        finished = True
+    finally:
+        meter.log("finished" if finished else "aborted")
@@ -0,0 +1,148 @@
+"""
+Bounded-memory building blocks for the seeding scripts.
+
+    iter_json_array   yields the elements of a top-level JSON array while
+                      reading the file in chunks (json raw_decode)
+    external_sort     sorts a stream larger than memory: sorted runs of
+                      run_rows records are spilled to temporary NDJSON files
+                      and merged back with heapq.merge
+    BulkWriter        unordered bulk_write in fixed-size batches
+    Progress          periodic rows/sec reporting for a pipeline stage
+"""
+import os
+import json
+import time
+import heapq
+import tempfile
+
+READ_CHUNK = 1 << 20
+WHITESPACE = " \t\r\n"
+DELIMITERS = WHITESPACE + ",]"
+
+def iter_json_array(path: str, chunk_size: int = READ_CHUNK):
+    """Elements of the JSON array in path, one at a time"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+        started = False
+
+        def more():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+
+        while True:
+            while pos < len(buf) and (buf[pos] in WHITESPACE or (started and buf[pos] == ",")):
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"{path}: unexpected end of JSON array")
+                more()
+                continue
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"{path}: expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # A number cut at the chunk edge also decodes; only trust elements followed by a delimiter
+                if not eof and (end == len(buf) or buf[end] not in DELIMITERS):
+                    raise ValueError("element may continue in the next chunk")
+            except ValueError:
+                if eof:
+                    raise
+                more()
+                continue
+            yield item
+            pos = end
+
+def _spill(records: list, directory: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".ndjson", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record))
+            f.write("\n")
+    return path
+
+def external_sort(records, key, run_rows: int, directory: str = None):
+    """records sorted by key, holding at most run_rows of them in memory at a time.
+    Records must be JSON-serializable; runs are deleted once merged."""
+    runs = []
+    batch = []
+    tmpdir = tempfile.mkdtemp(prefix="extsort-", dir=directory)
+    files = []
+    try:
+        for record in records:
+            batch.append(record)
+            if len(batch) >= run_rows:
+                batch.sort(key=key)
+                runs.append(_spill(batch, tmpdir))
+                batch = []
+        batch.sort(key=key)
+        if not runs:
+            yield from batch
+            return
+        if batch:
+            runs.append(_spill(batch, tmpdir))
+            batch = []
+        files = [open(path, "r", encoding="utf-8") for path in runs]
+        yield from heapq.merge(*((json.loads(line) for line in f) for f in files), key=key)
+    finally:
+        for f in files:
+            f.close()
+        for path in runs:
+            os.remove(path)
+        os.rmdir(tmpdir)
+
+class Progress:
+    """Counts rows for one stage and prints throughput every interval seconds"""
+
+    def __init__(self, label: str, interval: float = 5.0):
+        self.label = label
+        self.interval = interval
+        self.count = 0
+        self.start = self._last = time.monotonic()
+
+    def add(self, n: int = 1):
+        self.count += n
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.report()
+
+    def report(self, state: str = "…"):
+        elapsed = time.monotonic() - self.start
+        print(f"⏱️  {self.label} {state} {self.count:,} in {elapsed:.1f}s ({self.count / max(elapsed, 1e-9):,.0f}/s)")
+
+class BulkWriter:
+    """Buffers write operations and sends them as unordered bulk_writes of batch_size"""
+
+    def __init__(self, collection, batch_size: int, progress: Progress = None):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.progress = progress
+        self.ops = []
+        self.upserted = 0
+        self.inserted = 0
+        self.modified = 0
+
+    def add(self, op):
+        self.ops.append(op)
+        if len(self.ops) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.ops:
+            return
+        result = self.collection.bulk_write(self.ops, ordered=False)
+        self.upserted += result.upserted_count
+        self.inserted += result.inserted_count
+        self.modified += result.modified_count
+        if self.progress is not None:
+            self.progress.add(len(self.ops))
+        self.ops = []
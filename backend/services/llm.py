@@ -0,0 +1,284 @@
+"""
+LLM providers behind a response cache.
+
+The AI routes used to call the Groq/Gemini SDKs synchronously inside async
+handlers and regenerate identical prompts on every request. Here:
+
+- Providers wrap one SDK each behind complete(prompt, json_mode) -> str.
+  The SDKs block, so calls run in a worker thread (asyncio.to_thread).
+- ResponseCache keeps results for LLM_CACHE_TTL_SECONDS with LRU eviction past
+  LLM_CACHE_SIZE entries, and coalesces concurrent requests for the same key
+  into one call (single flight). Failures are not cached.
+- LLM_PROVIDER=stub swaps every provider for StubProvider, which answers
+  locally after LLM_STUB_DELAY_MS, for tests and load runs without API spend.
+- Providers also stream(prompt), yielding text chunks as they arrive;
+  astream() forwards them to async code, and StreamSanitizer applies
+  sanitize_response to a chunked stream without splitting a replacement
+  across chunk boundaries. sse_event() formats Server-Sent Events.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "")
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+STUB_DELAY = float(os.getenv("LLM_STUB_DELAY_MS", "200")) / 1000
+
+_MISS = object()
+_END = object()
+
+# White-labelling: provider names never reach users
+REPLACEMENTS = {
+    "Google": "Core",
+    "Gemini": "Brain",
+    "Groq": "Neural Engine",
+    "llama": "Model-X",
+    "mixtral": "Model-Y",
+    "openai": "AI",
+    "ChatGPT": "Assistant"
+}
+
+def sanitize_response(text: str) -> str:
+    """Removes any mention of AI providers for a white-labeled experience"""
+    for old, new in REPLACEMENTS.items():
+        text = text.replace(old, new)
+        text = text.replace(old.lower(), new)
+    return text
+
+class StreamSanitizer:
+    """sanitize_response over a chunked stream: feed() each chunk, then flush() at the end.
+    Text that could still turn into a replacement once more chunks arrive is held back."""
+
+    PATTERNS = sorted({p for old in REPLACEMENTS for p in (old, old.lower())}, key=len)
+    HOLD = max(len(p) for p in PATTERNS) - 1
+
+    def __init__(self):
+        self.buffer = ""
+
+    def _safe_cut(self) -> int:
+        text = self.buffer
+        n = len(text)
+        cut = n
+        # Hold back a tail that is a proper prefix of some pattern
+        for i in range(max(0, n - self.HOLD), n):
+            tail = text[i:]
+            if any(p.startswith(tail) for p in self.PATTERNS):
+                cut = i
+                break
+        # Never split a complete match
+        moved = True
+        while moved:
+            moved = False
+            for p in self.PATTERNS:
+                start = text.find(p, max(0, cut - len(p) + 1))
+                if 0 <= start < cut < start + len(p):
+                    cut, moved = start, True
+        return cut
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+        cut = self._safe_cut()
+        out, self.buffer = self.buffer[:cut], self.buffer[cut:]
+        return sanitize_response(out)
+
+    def flush(self) -> str:
+        out, self.buffer = self.buffer, ""
+        return sanitize_response(out)
+
+def sse_event(data, event: str = None) -> str:
+    """One Server-Sent Event carrying data as JSON"""
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, default=str)}\n\n"
+
+class GroqProvider:
+    name = "groq"
+
+    def __init__(self, api_key: str, model: str):
+        from groq import Groq
+        self.model = model
+        self.client = Groq(api_key=api_key)
+
+    def complete(self, prompt: str, json_mode: bool = False) -> str:
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            **kwargs
+        )
+        return completion.choices[0].message.content
+
+    def stream(self, prompt: str):
+        chunks = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        )
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = model
+        self.client = genai.GenerativeModel(model)
+
+    def complete(self, prompt: str, json_mode: bool = False) -> str:
+        return self.client.generate_content(prompt).text
+
+    def stream(self, prompt: str):
+        for chunk in self.client.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+class StubProvider:
+    """Deterministic local provider: echoes the prompt after a fixed delay"""
+    name = "stub"
+
+    def __init__(self, model: str = "stub", delay: float = STUB_DELAY):
+        self.model = model
+        self.delay = delay
+        self.calls = 0
+
+    def complete(self, prompt: str, json_mode: bool = False) -> str:
+        self.calls += 1
+        time.sleep(self.delay)
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        text = f"[stub {self.model} {digest}] {' '.join(prompt.split()[:40])}"
+        return json.dumps({"text": text, "chartData": []}) if json_mode else text
+
+    def stream(self, prompt: str, chunk_words: int = 4):
+        """The complete() text in a few words per chunk, with the delay spread across chunks"""
+        self.calls += 1
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        words = f"[stub {self.model} {digest}] {' '.join(prompt.split()[:40])}".split(" ")
+        chunks = [" ".join(words[i:i + chunk_words]) + " " for i in range(0, len(words), chunk_words)]
+        for chunk in chunks:
+            time.sleep(self.delay / len(chunks))
+            yield chunk
+
+def make_provider(kind: str, api_key: str, model: str):
+    """Provider for kind ("groq" / "gemini"), or the stub when LLM_PROVIDER=stub"""
+    if LLM_PROVIDER == "stub":
+        return StubProvider(model)
+    if kind == "groq":
+        return GroqProvider(api_key, model)
+    if kind == "gemini":
+        return GeminiProvider(api_key, model)
+    raise ValueError(f"Unknown LLM provider: {kind}")
+
+class ResponseCache:
+    """TTL + LRU cache of computed values with single-flight computation per key"""
+
+    def __init__(self, ttl: float = CACHE_TTL, max_size: int = CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return default
+            value, expires = hit
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key, compute, ttl: float = None):
+        """Cached value for key, else await compute() once for all concurrent callers.
+        The computation runs as its own task, so one caller disconnecting doesn't cancel it for the rest."""
+        value = self.get(key, _MISS)
+        if value is not _MISS:
+            self.hits += 1
+            return value
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._settle(key, t, ttl))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _settle(self, key, task, ttl):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.put(key, task.result(), ttl)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "in_flight": len(self._inflight),
+                "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+cache = ResponseCache()
+
+def prompt_key(provider, prompt: str, json_mode: bool = False) -> str:
+    raw = json.dumps([provider.name, provider.model, json_mode, prompt])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+async def complete(provider, prompt: str, json_mode: bool = False) -> str:
+    """Provider completion for prompt, cached and coalesced, without blocking the event loop"""
+    return await cache.get_or_compute(
+        prompt_key(provider, prompt, json_mode),
+        lambda: asyncio.to_thread(provider.complete, prompt, json_mode)
+    )
+
+async def astream(provider, prompt: str):
+    """provider.stream(prompt) as an async iterator; the blocking SDK iterator runs in a worker thread.
+    Closing the iterator early (client went away) stops the worker at its next chunk."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def send(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            stop.set()  # event loop already closed
+
+    def pump():
+        try:
+            for chunk in provider.stream(prompt):
+                if stop.is_set():
+                    return
+                send(chunk)
+        except Exception as e:
+            send(e)
+            return
+        send(_END)
+
+    loop.run_in_executor(None, pump)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,92 @@
+"""
+Keyset pagination and cached counts for the admin list endpoints.
+
+A cursor is an opaque token carrying the sort field, direction, and the
+(sort value, _id) of the last row served. The next page is the rows strictly
+after that pair in (sort field, _id) order, which a compound index on
+(..., field, _id) answers without skipping over earlier pages.
+"""
+import time
+import base64
+import threading
+from collections import OrderedDict
+from bson import json_util
+
+COUNT_CACHE_SECONDS = 30
+COUNT_CACHE_SIZE = 1024  # distinct (collection, query) counts kept, least recently used dropped first
+
+def encode_cursor(sort_by: str, order: int, doc: dict) -> str:
+    payload = json_util.dumps({"s": sort_by, "o": order, "v": doc.get(sort_by), "id": doc["_id"]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str, order: int):
+    """(last sort value, last _id) from a cursor, which must match the requested sort"""
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if payload.get("s") != sort_by or payload.get("o") != order:
+        raise ValueError("Cursor does not match the requested sort")
+    return payload.get("v"), payload["id"]
+
+def keyset_filter(sort_by: str, order: int, value, last_id) -> dict:
+    """Rows after (value, last_id) in (sort_by, _id) order; missing/null values sort lowest, as in MongoDB"""
+    op = "$lt" if order == -1 else "$gt"
+    if value is None:
+        clauses = [{sort_by: None, "_id": {op: last_id}}]
+        if order == 1:
+            clauses.append({sort_by: {"$ne": None}})
+    else:
+        clauses = [{sort_by: {op: value}}, {sort_by: value, "_id": {op: last_id}}]
+        if order == -1:
+            clauses.append({sort_by: None})
+    return {"$or": clauses}
+
+def page_query(query: dict, sort_by: str, order: int, cursor: str = None) -> dict:
+    if not cursor:
+        return query
+    value, last_id = decode_cursor(cursor, sort_by, order)
+    after = keyset_filter(sort_by, order, value, last_id)
+    return {"$and": [query, after]} if query else after
+
+class CountCache:
+    """Per-query document counts, reused for COUNT_CACHE_SECONDS (unfiltered counts use collection metadata).
+    At most max_entries counts are kept; the least recently used one is dropped first."""
+
+    def __init__(self, ttl: float = COUNT_CACHE_SECONDS, max_entries: int = COUNT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._counts)
+
+    async def count(self, collection, query: dict) -> int:
+        """collection is an async (Motor) collection"""
+        key = (collection.name, json_util.dumps(query, sort_keys=True))
+        now = time.monotonic()
+        with self._lock:
+            hit = self._counts.get(key)
+            if hit is not None:
+                if now - hit[1] < self.ttl:
+                    self._counts.move_to_end(key)
+                    return hit[0]
+                del self._counts[key]
+        total = await (collection.estimated_document_count() if not query else collection.count_documents(query))
+        with self._lock:
+            self._counts[key] = (total, now)
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return total
+
+    def invalidate(self, collection_name: str = None):
+        with self._lock:
+            if collection_name is None:
+                self._counts.clear()
+            else:
+                for key in [k for k in self._counts if k[0] == collection_name]:
+                    del self._counts[key]
+
+counts = CountCache()
@@ -0,0 +1,78 @@
+"""
+Password hashing off the event loop.
+
+bcrypt hashing/verification costs ~100-300 ms of CPU per call. Running it
+inline in an async handler stalls every other request on the worker, so
+signup/login submit it to a small dedicated thread pool instead (bcrypt
+releases the GIL while it works). At most PASSWORD_WORKERS calls run at once
+and at most PASSWORD_QUEUE_LIMIT may be waiting; beyond that callers get
+PasswordPoolBusy (503) immediately rather than queueing behind a login burst.
+
+Recent call latencies (queue wait + hashing) are kept for stats(), so login
+p99 can be read off independently of the rest of the API's traffic.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+import numpy as np
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+LATENCY_WINDOW = 1000
+
+class PasswordPoolBusy(Exception):
+    """More password operations are queued than PASSWORD_QUEUE_LIMIT allows"""
+
+def hash_password_sync(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def check_password_sync(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+class PasswordPool:
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_limit: int = PASSWORD_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                raise PasswordPoolBusy()
+            self._pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._latencies.append((time.perf_counter() - start) * 1000)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password_sync, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self.run(check_password_sync, password, hashed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            pending = self._pending
+        out = {"workers": self.workers, "queue_limit": self.queue_limit, "in_flight": pending, "samples": len(latencies)}
+        if latencies:
+            p50, p99 = np.percentile(latencies, [50, 99])
+            out.update(p50_ms=round(float(p50), 1), p99_ms=round(float(p99), 1))
+        return out
+
+pool = PasswordPool()
@@ -0,0 +1,68 @@
+"""
+Authenticated-user (principal) cache for get_current_user.
+
+Protected routes used to look the user up in MongoDB on every request. The
+cache keeps recently seen users keyed by token subject (email) for
+AUTH_CACHE_TTL_SECONDS, evicting the least recently used entry past
+AUTH_CACHE_SIZE. Deleting a user through /admin/user/{id} drops their entry,
+so a deleted account stops authenticating immediately on that worker (and
+within the TTL on the others). AUTH_CACHE_TTL_SECONDS=0 disables the cache.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+class PrincipalCache:
+    """TTL + LRU map of token subject -> user document (without the password hash)"""
+
+    def __init__(self, ttl: float = CACHE_TTL, max_size: int = CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, subject: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            hit = self._entries.get(subject)
+            if hit is None:
+                return None
+            user, expires = hit
+            if time.monotonic() >= expires:
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+            return dict(user)
+
+    def put(self, subject: str, user: dict):
+        if not self.enabled:
+            return
+        user = {k: v for k, v in user.items() if k != "password"}
+        with self._lock:
+            self._entries[subject] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str = None, user_id: str = None):
+        """Drop one subject, every entry for a user _id, or (with no arguments) everything"""
+        with self._lock:
+            if subject is None and user_id is None:
+                self._entries.clear()
+                return
+            if subject is not None:
+                self._entries.pop(subject, None)
+            if user_id is not None:
+                for key in [k for k, (user, _) in self._entries.items() if user.get("_id") == user_id]:
+                    del self._entries[key]
+
+principals = PrincipalCache()
@@ -0,0 +1,46 @@
+"""
+In-process rate limiting for the auth endpoints.
+
+A token bucket per key (e.g. "login:acct:<email>", "login:ip:<addr>") allows
+short bursts up to the bucket size and refills at limit/60 tokens per second.
+Limits are per worker process; behind N workers the effective limit is N times
+higher, which is fine for blunting password-guessing bursts.
+"""
+import time
+import math
+import threading
+
+MAX_KEYS = 100_000
+
+class RateLimiter:
+    def __init__(self, per_minute: int, burst: int = None):
+        self.rate = per_minute / 60.0
+        self.burst = burst or per_minute
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> float:
+        """Take one token for key. Returns 0 if allowed, else seconds until a token is available."""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > MAX_KEYS:
+                self._prune(now)
+            return 0
+
+    def _prune(self, now: float):
+        # Buckets that have refilled completely carry no state worth keeping
+        full_after = self.burst / self.rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < full_after}
+
+def retry_after(*waits: float) -> int:
+    """Retry-After header value (whole seconds) for the longest of several waits; 0 if none"""
+    wait = max(waits, default=0)
+    return math.ceil(wait) if wait > 0 else 0
@@ -0,0 +1,351 @@
+"""
+In-process title search.
+
+An inverted index over title, directors and genres, built from the same rows
+the recommender serves: the shared catalog plus every document in the content
+collection (replayed on load, then kept current by admin changes). Results for
+rows backed by a content document carry its _id; catalog-only rows have none.
+
+    vocabulary   sorted term array (prefix ranges via bisect)
+    postings     CSR arrays: term -> ascending row ids + per-row field weight
+    deletes      one-deletion variants of every term >= 4 chars (typo tolerance)
+
+A query is tokenized; each token matches its exact term, the last token also
+matches as a prefix, and a token with neither matches terms one edit away.
+Rows are ranked by the number of query tokens matched, then by a BM25-style
+score (idf x field weight), then by IMDb. Pages are keyset cursors over that
+ranking, so deep pages cost the same as the first.
+
+The index is rebuilt in the background when the recommender's rows change;
+requests keep using the previous index until the new one is ready.
+"""
+import re
+import json
+import base64
+import bisect
+import threading
+import numpy as np
+from database import content_collection
+from ml.recommender import engine, top_k_indices
+
+FIELD_WEIGHTS = {"title": 3.0, "directors": 1.5, "genres": 1.0}
+PREFIX_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.5
+MAX_PREFIX_TERMS = 64
+MIN_FUZZY_LEN = 4
+EXACT_TITLE_BOOST = 1000.0
+MATCH_WEIGHT = 1e4
+MAX_LIMIT = 100
+SUGGEST_LIMIT = 10
+SUGGEST_PRECOMPUTED_LEN = 2
+
+TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text) -> list:
+    return TOKEN_RE.findall(text.lower()) if isinstance(text, str) else []
+
+def deletes(term: str):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+def within_one_edit(a: str, b: str) -> bool:
+    """Optimal string alignment distance <= 1 (substitution, insertion, deletion or transposition)"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) <= 1 or (len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+def encode_cursor(key: float, row: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([key, row]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        key, row = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(key), int(row)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+class SearchIndex:
+    def __init__(self, rows: dict, version=None):
+        """rows: equal-length lists _id/title/directors/genres/type/platform plus imdb/year arrays; None titles are skipped"""
+        self.version = version
+        self.rows = rows
+        titles = rows["title"]
+        n = len(titles)
+
+        # 1. (term, row, weight) triplets; a term counts once per field
+        term_ids = {}
+        post_terms, post_rows, post_weights = [], [], []
+        self._exact_title = {}
+        for i in range(n):
+            if titles[i] is None:
+                continue
+            weights = {}
+            for field, base in FIELD_WEIGHTS.items():
+                tokens = tokenize(rows[field][i])
+                if field == "title":
+                    self._exact_title.setdefault(" ".join(tokens), []).append(i)
+                    # Shorter titles win ties on the same matched words
+                    base = base / (1 + 0.1 * max(len(tokens) - 1, 0))
+                for t in set(tokens):
+                    weights[t] = weights.get(t, 0.0) + base
+            for t, w in weights.items():
+                post_terms.append(term_ids.setdefault(t, len(term_ids)))
+                post_rows.append(i)
+                post_weights.append(w)
+
+        # 2. Sorted vocabulary and CSR postings in vocabulary order
+        vocab = sorted(term_ids)
+        remap = np.empty(len(vocab), dtype=np.int64)
+        remap[[term_ids[t] for t in vocab]] = np.arange(len(vocab))
+        post_terms = remap[np.array(post_terms, dtype=np.int64)]
+        order = np.lexsort((np.array(post_rows), post_terms))
+        self.vocab = vocab
+        self._term_pos = {t: i for i, t in enumerate(vocab)}
+        self._post_rows = np.array(post_rows, dtype=np.int32)[order]
+        self._post_weights = np.array(post_weights, dtype=np.float32)[order]
+        self._offsets = np.searchsorted(post_terms[order], np.arange(len(vocab) + 1))
+        doc_freq = np.diff(self._offsets)
+        live = sum(t is not None for t in titles)
+        self._idf = np.log(1 + (live - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        # 3. Deletion neighbourhoods for typo tolerance
+        self._deletes = {}
+        for i, t in enumerate(vocab):
+            if len(t) >= MIN_FUZZY_LEN:
+                for d in deletes(t):
+                    self._deletes.setdefault(d, []).append(i)
+
+        imdb = np.nan_to_num(np.asarray(rows["imdb"], dtype=np.float64))
+        self._popularity = imdb / max(imdb.max(), 1.0) if n else imdb
+        self.size = n
+        self.suggester = SuggestIndex(rows, imdb)
+
+    def expand(self, token: str, is_last: bool):
+        """(term id, weight) pairs a query token matches"""
+        matches = []
+        exact = self._term_pos.get(token)
+        if exact is not None:
+            matches.append((exact, 1.0))
+        if is_last:
+            lo = bisect.bisect_left(self.vocab, token)
+            hi = bisect.bisect_left(self.vocab, token + "\uffff")
+            ids = np.arange(lo, hi)
+            ids = ids[ids != exact] if exact is not None else ids
+            if len(ids) > MAX_PREFIX_TERMS:
+                # Keep the most common completions
+                df = np.diff(self._offsets)[ids]
+                ids = ids[np.argpartition(-df, MAX_PREFIX_TERMS - 1)[:MAX_PREFIX_TERMS]]
+            matches.extend((int(t), PREFIX_WEIGHT) for t in ids)
+        if not matches and len(token) >= MIN_FUZZY_LEN:
+            candidates = set(self._deletes.get(token, ()))
+            for d in deletes(token):
+                candidates.update(self._deletes.get(d, ()))
+                exact_del = self._term_pos.get(d)
+                if exact_del is not None:
+                    candidates.add(exact_del)
+            matches.extend((t, FUZZY_WEIGHT) for t in sorted(candidates) if within_one_edit(token, self.vocab[t]))
+        return matches
+
+    def rank(self, query: str):
+        """(rows, keys) of every matching row; higher key ranks first"""
+        tokens = tokenize(query)
+        if not tokens:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        score = np.zeros(self.size, dtype=np.float64)
+        matched = np.zeros(self.size, dtype=np.int32)
+        for pos, token in enumerate(tokens):
+            token_score = np.zeros(self.size, dtype=np.float32)
+            for term, weight in self.expand(token, pos == len(tokens) - 1):
+                start, end = self._offsets[term], self._offsets[term + 1]
+                ids = self._post_rows[start:end]
+                token_score[ids] = np.maximum(token_score[ids], weight * self._idf[term] * self._post_weights[start:end])
+            score += token_score
+            matched += token_score > 0
+
+        rows = np.flatnonzero(matched)
+        keys = matched[rows] * MATCH_WEIGHT + score[rows] + self._popularity[rows] * 1e-3
+        exact_rows = self._exact_title.get(" ".join(tokens))
+        if exact_rows:
+            keys[np.isin(rows, exact_rows)] += EXACT_TITLE_BOOST
+        return rows, keys
+
+    def search(self, query: str, limit: int = 20, cursor: str = None):
+        """One page of results and the cursor for the next page (None when exhausted)"""
+        rows, keys = self.rank(query)
+        if cursor:
+            after_key, after_row = decode_cursor(cursor)
+            keep = (keys < after_key) | ((keys == after_key) & (rows > after_row))
+            rows, keys = rows[keep], keys[keep]
+        # top_k_indices breaks key ties by position, i.e. by ascending row id
+        top = top_k_indices(keys, limit + 1)
+        page, more = top[:limit], len(top) > limit
+        results = [self.format(int(rows[i]), float(keys[i])) for i in page]
+        next_cursor = encode_cursor(float(keys[page[-1]]), int(rows[page[-1]])) if more else None
+        return results, next_cursor
+
+    def format(self, i: int, key: float) -> dict:
+        r = self.rows
+        return {
+            "_id": r["_id"][i],
+            "title": r["title"][i],
+            "platform": r["platform"][i],
+            "imdb": float(r["imdb"][i]) if not np.isnan(r["imdb"][i]) else None,
+            "year": int(r["year"][i]),
+            "genres": r["genres"][i] or "",
+            "directors": r["directors"][i] or "",
+            "type": r["type"][i] or "",
+            "score": round(key % MATCH_WEIGHT, 3),
+        }
+
+class SuggestIndex:
+    """
+    Typeahead over titles: one entry per distinct (case-folded) title, kept in a
+    sorted key array so a prefix is a bisect range. Entries are ranked by
+    popularity (IMDb); the top lists for every 1-2 character prefix, whose
+    ranges are the widest, are precomputed.
+    """
+
+    def __init__(self, rows: dict, popularity):
+        titles = rows["title"]
+        self.rows = rows
+        # Best row per distinct title (most popular, then first)
+        best = {}
+        for i, t in enumerate(titles):
+            if t is None: continue
+            key = t.lower()
+            j = best.get(key)
+            if j is None or popularity[i] > popularity[j]:
+                best[key] = i
+        self._keys = sorted(best)
+        self._ids = np.array([best[k] for k in self._keys], dtype=np.int64)
+        self._rank = np.asarray(popularity, dtype=np.float64)[self._ids] if len(self._ids) else np.empty(0)
+
+        self._precomputed = {}
+        for length in range(1, SUGGEST_PRECOMPUTED_LEN + 1):
+            start = 0
+            while start < len(self._keys):
+                prefix = self._keys[start][:length]
+                if len(prefix) < length:
+                    # A key shorter than the prefix; the keys after it may still extend it
+                    start += 1
+                    continue
+                end = bisect.bisect_left(self._keys, prefix + "\uffff", start)
+                self._precomputed[prefix] = [self.format(i) for i in self._top(start, end, SUGGEST_LIMIT)]
+                start = end
+
+    def _top(self, lo: int, hi: int, limit: int):
+        # top_k_indices breaks ties by position, i.e. alphabetically
+        top = top_k_indices(self._rank[lo:hi], limit)
+        return self._ids[lo + top]
+
+    def format(self, i: int) -> dict:
+        r = self.rows
+        return {
+            "_id": r["_id"][i],
+            "title": r["title"][i],
+            "year": int(r["year"][i]),
+            "imdb": float(r["imdb"][i]) if not np.isnan(r["imdb"][i]) else None,
+            "platform": r["platform"][i],
+        }
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_LIMIT) -> list:
+        key = prefix.lower().lstrip()
+        if not key:
+            return []
+        if len(key) <= SUGGEST_PRECOMPUTED_LEN and limit <= SUGGEST_LIMIT and key in self._precomputed:
+            return self._precomputed[key][:limit]
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_left(self._keys, key + "\uffff", lo)
+        return [self.format(i) for i in self._top(lo, hi, limit)]
+
+def engine_rows() -> dict:
+    """Column snapshot of the recommender's live rows (deleted rows become None titles)"""
+    state = engine.current()
+    df = state.df
+    titles = df['Title'].astype(object).where(df['Title'].notna(), None).tolist()
+    for i in state._dead.tolist():
+        titles[i] = None
+    # Rows backed by a content document (admin-added titles, or catalog titles the
+    # content collection also holds) carry its _id
+    ids = [None] * len(titles)
+    for doc_id, i in state._doc_rows.items():
+        ids[i] = doc_id
+    rows = {
+        "_id": ids,
+        "title": titles,
+        "directors": df['Directors'].tolist(),
+        "genres": df['Genres'].tolist(),
+        "type": df['Type'].tolist(),
+        "platform": state._platform_labels.tolist(),
+        "imdb": df['IMDb'].to_numpy(dtype=np.float64, copy=True),
+        "year": df['Year'].to_numpy(dtype=np.int64, copy=True),
+    }
+    return rows, (state.version, state.revision)
+
+class SearchService:
+    """Holds the current index and rebuilds it off the request path when the rows change"""
+
+    def __init__(self):
+        self.index = None
+        self._building = False
+        self._lock = threading.Lock()
+
+    def rebuild(self):
+        try:
+            rows, version = engine_rows()
+            index = SearchIndex(rows, version)
+            self.index = index
+        finally:
+            self._building = False
+
+    def current(self):
+        state = engine.current()
+        if state.is_empty():
+            return None
+        version = (state.version, state.revision)
+        if self.index is None:
+            with self._lock:
+                if self.index is None:
+                    self._building = True
+                    self.rebuild()
+        elif self.index.version != version:
+            with self._lock:
+                if self._building:
+                    return self.index
+                self._building = True
+            threading.Thread(target=self.rebuild, daemon=True, name="search-index").start()
+        return self.index
+
+service = SearchService()
+
+def search_mongo(query: str, limit: int, cursor: str = None):
+    """Fallback when no in-process index is available: escaped, limited regex on content titles"""
+    if content_collection is None:
+        return [], None
+    skip = int(cursor) if cursor and cursor.isdigit() else 0
+    docs = content_collection.find(
+        {"title": {"$regex": re.escape(query), "$options": "i"}}
+    ).sort("_id", 1).skip(skip).limit(limit + 1)
+    results = [dict(doc, _id=str(doc["_id"])) for doc in docs]
+    next_cursor = str(skip + limit) if len(results) > limit else None
+    return results[:limit], next_cursor
+
+def suggest(prefix: str, limit: int = SUGGEST_LIMIT) -> list:
+    index = service.current()
+    if index is None:
+        return []
+    return index.suggester.suggest(prefix, max(1, min(limit, SUGGEST_LIMIT)))
+
+def search(query: str, limit: int = 20, cursor: str = None):
+    limit = max(1, min(limit, MAX_LIMIT))
+    index = service.current()
+    if index is None:
+        return search_mongo(query, limit, cursor)
+    return index.search(query, limit, cursor)
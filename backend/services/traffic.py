@@ -0,0 +1,179 @@
+"""
+Platform watch-time rollups for /admin/platform-traffic.
+
+Instead of unwinding every user's history on each request, watch minutes are
+kept pre-aggregated in the platform_traffic_rollups collection, one document
+per (granularity, period, platform):
+
+    {_id: "month:2023-11:Netflix", granularity: "month", period: "2023-11",
+     platform: "Netflix", minutes: 12345, view_minutes: 678}
+
+Day buckets use "YYYY-MM-DD" periods. `minutes` comes from user history and is
+maintained incrementally with $inc as history is written: record_history_event()
+for single events, HistoryRollup for the seed scripts' bulk loads. backfill()
+recomputes it from user_analytics_data in one pass (backfill_traffic_rollups.py,
+or once by a worker that starts against an empty store, see ensure_backfilled).
+`view_minutes` comes from POST /trending/view events (services/views.py);
+history does not hold them, so neither path touches them. read_buckets()
+reports the sum of both as `minutes`.
+"""
+import asyncio
+from datetime import datetime
+from pymongo import UpdateOne
+from database import adb, user_analytics_collection, traffic_rollups_collection
+
+CHART_PLATFORMS = ("Netflix", "Prime", "Disney", "Hulu")
+HISTORY_FIELD = "minutes"
+VIEW_FIELD = "view_minutes"
+
+_backfill_lock = asyncio.Lock()
+_backfilled = False
+
+def chart_platform(platform) -> str:
+    """Normalize platform names to the chart series keys"""
+    if not platform: return "Other"
+    if "Netflix" in platform: return "Netflix"
+    if "Prime" in platform: return "Prime"
+    if "Disney" in platform: return "Disney"
+    if "Hulu" in platform: return "Hulu"
+    return platform
+
+def day_key(date) -> str:
+    return date.strftime("%Y-%m-%d") if isinstance(date, datetime) else str(date or "")[:10]
+
+def bucket_periods(day: str) -> list:
+    """(granularity, period) of the buckets a watch on `day` counts towards; no day bucket without a full date"""
+    return [(g, p) for g, p in (("day", day), ("month", day[:7])) if g == "month" or len(p) == 10]
+
+def inc_update(granularity: str, period: str, platform: str, minutes, field: str = HISTORY_FIELD):
+    return UpdateOne(
+        {"_id": f"{granularity}:{period}:{platform}"},
+        {"$inc": {field: minutes},
+         "$setOnInsert": {"granularity": granularity, "period": period, "platform": platform}},
+        upsert=True
+    )
+
+def bucket_updates(day: str, platform: str, minutes, field: str = HISTORY_FIELD) -> list:
+    """$inc upserts of `field` for the day and month buckets of one watch event"""
+    return [inc_update(granularity, period, platform, minutes, field) for granularity, period in bucket_periods(day)]
+
+def record_watch(platform: str, date, minutes: int):
+    """Add one watch event's minutes to its day and month buckets"""
+    if traffic_rollups_collection is None or not minutes:
+        return
+    traffic_rollups_collection.bulk_write(bucket_updates(day_key(date), chart_platform(platform), minutes), ordered=False)
+
+def record_history_event(user_filter: dict, item: dict):
+    """Append a history item ({title, platform, date, watched_duration_mins}) to a user and roll it up"""
+    if user_analytics_collection is None:
+        return
+    minutes = item.get("watched_duration_mins") or 0
+    user_analytics_collection.update_one(user_filter, {"$push": {"history": item}, "$inc": {"total_watch_time_mins": minutes}})
+    record_watch(item.get("platform"), item.get("date"), minutes)
+
+class HistoryRollup:
+    """Per-bucket minutes of history items as a bulk writer produces them; flush() $incs them
+    into the rollups in one batch instead of one write per event"""
+
+    def __init__(self):
+        self.minutes = {}
+
+    def add(self, history: list):
+        for item in history:
+            minutes = item.get("watched_duration_mins") or 0
+            if minutes:
+                key = (day_key(item.get("date")), chart_platform(item.get("platform")))
+                self.minutes[key] = self.minutes.get(key, 0) + minutes
+
+    def flush(self) -> int:
+        """Write the pending minutes; returns the number of bucket updates"""
+        if traffic_rollups_collection is None:
+            return 0
+        totals = {}
+        for (day, platform), minutes in self.minutes.items():
+            for granularity, period in bucket_periods(day):
+                key = (granularity, period, platform)
+                totals[key] = totals.get(key, 0) + minutes
+        ops = [inc_update(*key, minutes) for key, minutes in totals.items()]
+        if ops:
+            traffic_rollups_collection.bulk_write(ops, ordered=False)
+        self.minutes = {}
+        return len(ops)
+
+def reset_history_minutes():
+    """Zero every bucket's history minutes (before history is reseeded); view minutes stay"""
+    if traffic_rollups_collection is None:
+        return
+    traffic_rollups_collection.delete_many({VIEW_FIELD: {"$exists": False}})
+    traffic_rollups_collection.update_many({}, {"$set": {HISTORY_FIELD: 0}})
+
+def backfill() -> int:
+    """Recompute every bucket from user_analytics_data; returns the number of buckets written"""
+    if user_analytics_collection is None or traffic_rollups_collection is None:
+        return 0
+    pipeline = [
+        {"$unwind": "$history"},
+        {"$group": {
+            "_id": {
+                "day": {"$substr": ["$history.date", 0, 10]},
+                "platform": "$history.platform"
+            },
+            "minutes": {"$sum": "$history.watched_duration_mins"}
+        }}
+    ]
+    totals = {}
+    for entry in user_analytics_collection.aggregate(pipeline, allowDiskUse=True):
+        day = entry["_id"]["day"]
+        platform = chart_platform(entry["_id"].get("platform"))
+        for granularity, period in bucket_periods(day):
+            key = (granularity, period, platform)
+            totals[key] = totals.get(key, 0) + entry["minutes"]
+
+    ids = [f"{granularity}:{period}:{platform}" for granularity, period, platform in totals]
+    ops = [
+        UpdateOne({"_id": _id}, {"$set": {"granularity": granularity, "period": period, "platform": platform,
+                                          HISTORY_FIELD: minutes}}, upsert=True)
+        for _id, ((granularity, period, platform), minutes) in zip(ids, totals.items())
+    ]
+    if ops:
+        traffic_rollups_collection.bulk_write(ops, ordered=False)
+    # Buckets with no history behind them any more keep only their view-event minutes
+    stale = {"_id": {"$nin": ids}}
+    traffic_rollups_collection.delete_many(dict(stale, **{VIEW_FIELD: {"$exists": False}}))
+    traffic_rollups_collection.update_many(dict(stale, **{VIEW_FIELD: {"$exists": True}}), {"$set": {HISTORY_FIELD: 0}})
+    return len(ops)
+
+async def read_buckets(granularity: str = "month", start: str = None, end: str = None) -> list:
+    """Buckets of one granularity in period order, optionally limited to [start, end] (async client)"""
+    if adb.traffic_rollups is None:
+        return []
+    query = {"granularity": granularity}
+    if start or end:
+        query["period"] = {k: v for k, v in (("$gte", start), ("$lte", end)) if v}
+    buckets = await adb.traffic_rollups.find(query, {"_id": 0}).sort("period", 1).to_list(length=None)
+    for bucket in buckets:
+        bucket[HISTORY_FIELD] = bucket.get(HISTORY_FIELD, 0) + bucket.pop(VIEW_FIELD, 0)
+    return buckets
+
+async def ensure_backfilled():
+    """Run backfill() once per worker if no history bucket exists yet; concurrent callers share the run"""
+    global _backfilled
+    if _backfilled:
+        return
+    async with _backfill_lock:
+        if _backfilled or adb.traffic_rollups is None:
+            return
+        if await adb.traffic_rollups.find_one({HISTORY_FIELD: {"$exists": True}}, {"_id": 1}) is None:
+            await asyncio.to_thread(backfill)
+        _backfilled = True
+
+async def _startup_backfill():
+    try:
+        await ensure_backfilled()
+    except Exception as e:
+        # /admin/platform-traffic retries on its next request
+        print(f"Traffic rollup backfill failed: {e}")
+
+def start_traffic_backfill() -> asyncio.Task:
+    """Check (and if needed build) the rollups in the background at startup"""
+    return asyncio.create_task(_startup_backfill(), name="traffic-backfill")
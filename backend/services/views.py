@@ -0,0 +1,277 @@
+"""
+View-event counting and the time-decayed trending ranking behind /trending.
+
+POST /trending/view only touches memory: the event bumps the title's pending
+view count (and watch minutes for the platform traffic rollups) and its
+trending score. Ids the worker has not seen a document for yet are held
+aside with their decayed weight and only ranked once the next flush finds
+them in content; unknown ids are dropped without ever entering the ranking. A task started by the app lifespan flushes the pending
+counts every VIEW_FLUSH_SECONDS, or as soon as VIEW_BUFFER_LIMIT distinct
+titles are waiting, as one unordered bulk_write of $inc updates on content
+and one of `view_minutes` on platform_traffic_rollups (services/traffic.py).
+
+Trending scores decay exponentially with a half-life of
+TRENDING_HALF_LIFE_HOURS. Each view adds exp(rate * (t - origin)) to its
+title's score, so older scores never have to be touched; the origin is moved
+forward (scaling every score by the same factor) before the weights get large.
+Only TRENDING_CAPACITY titles are kept ranked, in a min-heap, which is enough
+to answer /trending without sorting anything else.
+
+Counts and scores are per worker; a failed or cancelled flush puts what it
+had not written back into the buffer for the next attempt.
+"""
+import os
+import math
+import time
+import heapq
+import asyncio
+from collections import Counter
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from database import adb
+from services.traffic import CHART_PLATFORMS, VIEW_FIELD, bucket_updates, chart_platform, day_key
+
+FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_SECONDS", "2"))
+BUFFER_LIMIT = int(os.getenv("VIEW_BUFFER_LIMIT", "5000"))
+HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "6"))
+CAPACITY = int(os.getenv("TRENDING_CAPACITY", "100"))
+MAX_EXPONENT = 30  # rebase the decay origin before weights reach exp(30)
+MIN_SCORE = 1e-3  # scores below this (in views) are dropped when rebasing
+
+class DecayedTopK:
+    """Exponentially decayed scores per key, with the top `capacity` keys kept in a heap.
+
+    Scores only grow between rebases and a rebase scales all of them by the same
+    factor, so a key outside the top set can only enter it by beating its minimum."""
+
+    def __init__(self, capacity: int = CAPACITY, half_life_hours: float = HALF_LIFE_HOURS):
+        self.capacity = capacity
+        self.rate = math.log(2) / (half_life_hours * 3600)
+        self.origin = time.time()
+        self.scores = {}
+        self.members = {}  # key -> score of the current top set
+        self.heap = []     # (score, key); entries whose score no longer matches members are stale
+
+    def __len__(self):
+        return len(self.members)
+
+    def add(self, key, weight: float = 1.0, now: float = None):
+        now = time.time() if now is None else now
+        if self.rate * (now - self.origin) > MAX_EXPONENT:
+            self._rebase(now)
+        score = self.scores.get(key, 0.0) + weight * math.exp(self.rate * (now - self.origin))
+        self.scores[key] = score
+        if key in self.members:
+            self.members[key] = score
+            heapq.heappush(self.heap, (score, key))
+            if len(self.heap) > 4 * self.capacity:
+                self._rebuild_heap()
+        elif len(self.members) < self.capacity:
+            self.members[key] = score
+            heapq.heappush(self.heap, (score, key))
+        elif score > self._min()[0]:
+            _, evicted = heapq.heappop(self.heap)
+            del self.members[evicted]
+            self.members[key] = score
+            heapq.heappush(self.heap, (score, key))
+
+    def remove(self, key):
+        """Forget a key (e.g. deleted content); refills the top set from the remaining scores"""
+        self.remove_many([key])
+
+    def remove_many(self, keys):
+        """Forget several keys, refilling the top set in a single pass over the remaining scores"""
+        vacated = 0
+        for key in keys:
+            self.scores.pop(key, None)
+            if self.members.pop(key, None) is not None:
+                vacated += 1
+        if vacated:
+            candidates = (item for item in self.scores.items() if item[0] not in self.members)
+            self.members.update(heapq.nlargest(vacated, candidates, key=lambda item: item[1]))
+            self._rebuild_heap()
+
+    def top(self, n: int, now: float = None) -> list:
+        """[(key, score in decayed views as of now)] best first"""
+        now = time.time() if now is None else now
+        scale = math.exp(-self.rate * (now - self.origin))
+        best = heapq.nlargest(n, self.members.items(), key=lambda item: item[1])
+        return [(key, score * scale) for key, score in best]
+
+    def _min(self):
+        while self.heap and self.members.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0]
+
+    def _rebuild_heap(self):
+        self.heap = [(score, key) for key, score in self.members.items()]
+        heapq.heapify(self.heap)
+
+    def _rebase(self, now: float):
+        scale = math.exp(-self.rate * (now - self.origin))
+        self.origin = now
+        self.scores = {k: s * scale for k, s in self.scores.items() if s * scale >= MIN_SCORE or k in self.members}
+        self.members = {k: s * scale for k, s in self.members.items()}
+        self._rebuild_heap()
+
+class ViewCounter:
+    """Buffers view events in memory and flushes them to MongoDB in batches"""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, buffer_limit: int = BUFFER_LIMIT):
+        self.flush_interval = flush_interval
+        self.buffer_limit = buffer_limit
+        self.trending = DecayedTopK()
+        self.pending_views = Counter()
+        self.pending_minutes = Counter()  # (day, content id, platform or None) -> minutes
+        self.info = {}  # content id -> content document, for titles that have been viewed
+        self._unconfirmed = Counter()  # content id -> trending weight relative to _anchor, not yet ranked
+        self._anchor = time.time()
+        self.events = 0
+        self.flushes = 0
+        self.writes = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = None
+        self._wake = None
+
+    def record(self, content_id: str, platform: str = None, minutes: float = 0):
+        """Count one view; never waits on the database"""
+        self.events += 1
+        self.pending_views[content_id] += 1
+        if content_id in self.info or content_id in self.trending.scores:
+            self.trending.add(content_id)
+        else:
+            # Ranked once the next flush finds a document for it
+            self._unconfirmed[content_id] += math.exp(self.trending.rate * (time.time() - self._anchor))
+        if minutes:
+            self.pending_minutes[(day_key(datetime.utcnow()), content_id, platform)] += minutes
+        if len(self.pending_views) >= self.buffer_limit and self._wake is not None:
+            self._wake.set()
+
+    def top(self, n: int) -> list:
+        """Up to n trending content documents, best first, each with its decayed trend_score"""
+        items = []
+        for content_id, score in self.trending.top(len(self.trending)):
+            doc = self.info.get(content_id)
+            if doc is None:
+                continue  # not looked up yet; it will be after the next flush
+            items.append(dict(doc, trend_score=round(score, 3)))
+            if len(items) == n:
+                break
+        return items
+
+    def invalidate(self, content_id: str):
+        """Drop the cached document for a title (edited content); it is re-read on the next flush"""
+        self.info.pop(content_id, None)
+
+    def remove(self, content_id: str):
+        """Stop ranking a title (deleted content); pending counts for it are dropped"""
+        self.info.pop(content_id, None)
+        self.pending_views.pop(content_id, None)
+        self._unconfirmed.pop(content_id, None)
+        self.trending.remove(content_id)
+
+    async def _load_info(self, collection, ids: list) -> set:
+        """Cache the documents of newly seen titles; ids with no document are removed and returned"""
+        found = set()
+        async for doc in collection.find({"_id": {"$in": [ObjectId(i) for i in ids]}}):
+            content_id = str(doc["_id"])
+            doc["_id"] = content_id
+            self.info[content_id] = doc
+            found.add(content_id)
+        missing = set(ids) - found
+        for content_id in missing:
+            self.pending_views.pop(content_id, None)
+            self._unconfirmed.pop(content_id, None)
+        self.trending.remove_many(missing)
+        return missing
+
+    def _keep(self, content_id, unconfirmed) -> bool:
+        return content_id in self.info or content_id in self.trending.scores or content_id in unconfirmed
+
+    async def flush(self):
+        if not self.pending_views and not self.pending_minutes:
+            return
+        content, rollups = adb.content, adb.traffic_rollups
+        if content is None:
+            return
+        views, self.pending_views = self.pending_views, Counter()
+        minutes, self.pending_minutes = self.pending_minutes, Counter()
+        unconfirmed, self._unconfirmed = self._unconfirmed, Counter()
+        anchor, self._anchor = self._anchor, time.time()
+        start = time.perf_counter()
+        views_written = False
+        try:
+            seen = set(views) | {content_id for _, content_id, _ in minutes} | set(self.trending.members)
+            unknown = [i for i in seen if i not in self.info]
+            if unknown:
+                for content_id in await self._load_info(content, unknown):
+                    unconfirmed.pop(content_id, None)
+            for content_id, weight in unconfirmed.items():
+                if content_id in self.info:
+                    self.trending.add(content_id, weight, now=anchor)
+            unconfirmed = Counter()
+            ops = [UpdateOne({"_id": ObjectId(i)}, {"$inc": {"views": n}}) for i, n in views.items() if i in self.info]
+            if ops:
+                await content.bulk_write(ops, ordered=False)
+                self.writes += 1
+            views_written = True
+            for i, n in views.items():
+                if i in self.info:
+                    self.info[i]["views"] = self.info[i].get("views", 0) + n
+            # Events without a platform are booked under the title's own platform
+            buckets = Counter()
+            for (day, content_id, platform), m in minutes.items():
+                if content_id in self.info:
+                    series = chart_platform(platform or self.info[content_id].get("platform"))
+                    buckets[(day, series if series in CHART_PLATFORMS else "Other")] += m
+            ops = [op for (day, platform), m in buckets.items() for op in bucket_updates(day, platform, m, VIEW_FIELD)]
+            if ops and rollups is not None:
+                await rollups.bulk_write(ops, ordered=False)
+                self.writes += 1
+        except BaseException as e:
+            # Keep what was not written for the next attempt, also when the flush is cancelled
+            if not views_written:
+                self.pending_views.update({i: n for i, n in views.items() if self._keep(i, unconfirmed)})
+            self.pending_minutes.update({k: m for k, m in minutes.items() if self._keep(k[1], unconfirmed)})
+            scale = math.exp(self.trending.rate * (anchor - self._anchor))
+            for content_id, weight in unconfirmed.items():
+                self._unconfirmed[content_id] += weight * scale
+            self.failed_flushes += 1
+            if not isinstance(e, Exception):
+                raise
+            print(f"View count flush failed ({len(views)} titles): {e}")
+            return
+        self.flushes += 1
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    async def run(self):
+        """Flush loop, run as an asyncio task; flushes once more when cancelled"""
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                await self.flush()
+        finally:
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "events": self.events,
+            "flushes": self.flushes,
+            "bulk_writes": self.writes,
+            "failed_flushes": self.failed_flushes,
+            "pending_titles": len(self.pending_views),
+            "ranked_titles": len(self.trending),
+            "last_flush_ms": None if self.last_flush_ms is None else round(self.last_flush_ms, 2),
+        }
+
+views = ViewCounter()
+
+def start_view_flusher() -> asyncio.Task:
+    """Start the background flusher on the running loop. Cancel the task to stop it (after a final flush)."""
+    return asyncio.create_task(views.run(), name="view-flusher")
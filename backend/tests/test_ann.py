@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import normalize
+from ml.ann import IVFIndex, make_index
+
+def features(n=200, dim=8, seed=0):
+    return normalize(np.random.default_rng(seed).normal(size=(n, dim))).astype(np.float32)
+
+def test_ivf_upsert_past_the_end_grows_assignments():
+    rows = features()
+    index = IVFIndex(n_lists=8, n_probe=8).build(rows)
+    vec = rows[0]
+    index.upsert(len(rows) + 3, vec)
+    assert len(index.assignments) == len(rows) + 4
+    assert list(index.assignments[len(rows):len(rows) + 3]) == [-1, -1, -1]
+    assert len(rows) + 3 in index.candidates(vec)
+    index.remove(len(rows) + 3)
+    assert len(rows) + 3 not in index.candidates(vec)
+
+def test_ivf_upsert_moves_an_existing_row():
+    rows = features()
+    index = IVFIndex(n_lists=8, n_probe=1).build(rows)
+    index.upsert(5, rows[100])
+    assert 5 in index.candidates(rows[100])
+    assert sum(5 in lst for lst in index.lists) == 1
+
+def test_hnsw_backend_without_hnswlib_raises():
+    try:
+        import hnswlib  # noqa: F401
+    except ImportError:
+        with pytest.raises(ImportError, match="hnswlib"):
+            make_index("hnsw")
+    else:
+        assert make_index("hnsw").name == "hnsw"
@@ -0,0 +1,40 @@
+import os
+import numpy as np
+import pandas as pd
+from services.catalog import Catalog, append_delta, coerce_types, logical_frame, publish
+
+def source_frame():
+    return coerce_types(pd.DataFrame({
+        "Title": ["Alpha", "Beta", None],
+        "Year": [1999, 2021, None],
+        "IMDb": [7.3, None, 8.15],
+        "Genres": ["Drama", "Comedy,Drama", "Drama"],
+        "Netflix": [1, 0, 1],
+        "Disney+": [0, 1, 1],
+    }))
+
+def test_attached_columns_keep_storage_dtypes_and_widen_to_the_source(tmp_path):
+    root = str(tmp_path)
+    version = publish(Catalog.from_frame(source_frame()), root)
+    catalog = Catalog.attach(os.path.join(root, version))
+
+    assert isinstance(catalog.column("IMDb"), np.memmap) and catalog.column("IMDb").dtype == np.float32
+    assert catalog.column("Year").dtype == np.int16
+    assert list(catalog.column("Disney+")) == [0, 1, 1]
+    assert isinstance(catalog._dictionaries["Title"], tuple)  # decoded on first use
+    assert list(catalog.column("Title")) == ["Alpha", "Beta", None]
+
+    expected = source_frame()
+    numeric = ["Year", "IMDb", "Runtime", "Rotten Tomatoes", "Netflix", "Hulu", "Prime Video", "Disney+"]
+    pd.testing.assert_frame_equal(logical_frame(catalog.frame())[numeric], expected[numeric])
+    assert catalog.to_records()[0]["IMDb"] == 7.3
+
+def test_deltas_extend_the_attached_catalog(tmp_path):
+    root = str(tmp_path)
+    version = publish(Catalog.from_frame(source_frame()), root)
+    append_delta([{"Title": "Gamma", "Year": 2030, "IMDb": 6.6, "Hulu": 1, "Genres": "Sci-Fi"}], root)
+    catalog = Catalog.attach(os.path.join(root, version))
+    assert catalog.version == f"{version}+1"
+    assert list(catalog.column("Title")) == ["Alpha", "Beta", None, "Gamma"]
+    assert list(catalog.column("Hulu")) == [0, 0, 0, 1]
+    assert catalog.dictionary("Genres")[-1] == "Sci-Fi"
@@ -0,0 +1,80 @@
+import os
+import json
+import random
+import tempfile
+import pytest
+import merge_and_seed
+from services.ingest import external_sort, iter_json_array
+
+ELEMENTS = [
+    {"title": "Alpha", "year": 1999, "imdb": 7.25, "tags": ["a", "b"]},
+    12345678901234567890,
+    -0.5e-3,
+    "quote \" and bracket ] and brace }",
+    "snowman ☃ and emoji \U0001F3AC",
+    [],
+    {},
+    None,
+    True,
+    False,
+    [[1, [2, [3]]], {"nested": {"deep": [None]}}],
+]
+
+def write(tmp_path, text, name="data.json"):
+    path = os.path.join(tmp_path, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_json_array_matches_json_load(tmp_path, chunk_size, indent):
+    path = write(tmp_path, json.dumps(ELEMENTS, indent=indent, ensure_ascii=False))
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == ELEMENTS
+
+@pytest.mark.parametrize("text", ["[]", "  [ ]  ", "\n[\n]\n"])
+def test_iter_json_array_empty(tmp_path, text):
+    assert list(iter_json_array(write(tmp_path, text), chunk_size=2)) == []
+
+@pytest.mark.parametrize("text", ['{"a": 1}', '[1, 2', '[{"a": 1}, {"b": '])
+def test_iter_json_array_rejects_malformed_input(tmp_path, text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(write(tmp_path, text), chunk_size=3))
+
+@pytest.mark.parametrize("run_rows", [1, 3, 10, 1000])
+def test_external_sort_is_a_stable_sort(tmp_path, run_rows):
+    rng = random.Random(run_rows)
+    records = [{"key": rng.randint(0, 20), "seq": i} for i in range(200)]
+    result = list(external_sort(iter(records), key=lambda r: r["key"], run_rows=run_rows, directory=str(tmp_path)))
+    assert result == sorted(records, key=lambda r: r["key"])
+    assert os.listdir(tmp_path) == []  # runs and their directory are removed
+
+def test_external_sort_cleans_up_when_abandoned(tmp_path):
+    records = ({"key": -i} for i in range(50))
+    merged = external_sort(records, key=lambda r: r["key"], run_rows=7, directory=str(tmp_path))
+    assert next(merged) == {"key": -49}
+    merged.close()
+    assert os.listdir(tmp_path) == []
+
+def test_merged_users_keep_users_without_id_and_clean_up(tmp_path, monkeypatch):
+    sort_dir = tmp_path / "sort"
+    sort_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(sort_dir))
+    monkeypatch.setattr(merge_and_seed, "SORT_RUN_ROWS", 2)
+    users = [{"user_id": uid, "username": name} for uid, name in
+             [("u2", "b"), (None, "x"), ("u1", "a"), ("", "y"), (None, "z"), ("u3", "c")]]
+    history = [{"user_id": uid, "Title": t, "watch_date": "2024-01-01"} for uid, t in
+               [("u1", "T1"), (None, "lost"), ("u3", "T3"), ("u1", "T2"), ("", "lost")]]
+    (tmp_path / "users.json").write_text(json.dumps(users))
+    (tmp_path / "history.json").write_text(json.dumps(history))
+
+    docs = list(merge_and_seed.merged_users(str(tmp_path / "users.json"), str(tmp_path / "history.json")))
+    assert sorted(d["username"] for d in docs) == ["a", "b", "c", "x", "y", "z"]
+    titles = {d["username"]: [h["title"] for h in d["history"]] for d in docs}
+    assert titles == {"a": ["T1", "T2"], "b": [], "c": ["T3"], "x": [], "y": [], "z": []}
+    assert os.listdir(sort_dir) == []
+
+    abandoned = merge_and_seed.merged_users(str(tmp_path / "users.json"), str(tmp_path / "history.json"))
+    next(abandoned)
+    abandoned.close()
+    assert os.listdir(sort_dir) == []
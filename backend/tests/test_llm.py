@@ -0,0 +1,102 @@
+import random
+import asyncio
+import pytest
+from services.llm import ResponseCache, StreamSanitizer, sanitize_response
+
+def test_concurrent_misses_share_one_computation():
+    cache = ResponseCache(ttl=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(10)))
+        assert results == ["answer"] * 10
+        assert await cache.get_or_compute("k", compute) == "answer"  # now cached
+
+    asyncio.run(run())
+    assert calls == [1]
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 9, 1)
+
+def test_failures_are_shared_but_not_cached():
+    cache = ResponseCache(ttl=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("provider down")
+        return "recovered"
+
+    async def run():
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert await cache.get_or_compute("k", compute) == "recovered"
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+def test_cancelled_caller_does_not_cancel_the_shared_computation():
+    cache = ResponseCache(ttl=60)
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def run():
+        first = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        second = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "answer"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(run())
+    assert cache.get("k") == "answer"
+
+def test_lru_and_ttl_eviction():
+    cache = ResponseCache(ttl=60, max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)  # evicts b, the least recently used
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    cache.put("d", 4, ttl=0)  # not cached
+    assert cache.get("d") is None
+
+SAMPLES = [
+    "Powered by Google Gemini on Groq.",
+    "llama and mixtral beat openai? ask ChatGPT or chatgpt",
+    "GoogleGoogle geminigemini Gro Groq",
+    "no providers here at all",
+]
+
+def stream(chunks):
+    sanitizer = StreamSanitizer()
+    return "".join(sanitizer.feed(c) for c in chunks) + sanitizer.flush()
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_stream_sanitizer_matches_whole_text_for_every_split(text):
+    expected = sanitize_response(text)
+    for i in range(len(text) + 1):
+        for j in range(i, len(text) + 1):
+            assert stream([text[:i], text[i:j], text[j:]]) == expected, (i, j)
+
+def test_stream_sanitizer_random_chunking():
+    rng = random.Random(3)
+    words = ["Google", "gemini", "Groq", "llama", "mixtral", "openai", "ChatGPT", "Go", "Gem", "lla", " ", "x", "\n"]
+    for _ in range(300):
+        text = "".join(rng.choice(words) for _ in range(rng.randint(1, 30)))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(1, 8))))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert stream(chunks) == sanitize_response(text)
+
+def test_stream_sanitizer_holds_back_only_possible_matches():
+    sanitizer = StreamSanitizer()
+    assert sanitizer.feed("Hello Goo") == "Hello "
+    assert sanitizer.feed("gle!") == "Core!"
@@ -0,0 +1,76 @@
+import asyncio
+import random
+import mongomock
+import pytest
+from bson.objectid import ObjectId
+from services.pagination import CountCache, decode_cursor, encode_cursor, page_query
+
+def test_cursor_round_trip_and_sort_check():
+    doc = {"_id": ObjectId(), "imdb": 7.5}
+    cursor = encode_cursor("imdb", -1, doc)
+    assert decode_cursor(cursor, "imdb", -1) == (7.5, doc["_id"])
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "imdb", 1)
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor", "imdb", -1)
+
+@pytest.mark.parametrize("order", [1, -1])
+def test_keyset_pages_cover_sorted_rows_once(order):
+    rng = random.Random(order)
+    collection = mongomock.MongoClient().db.content
+    collection.insert_many([{"imdb": rng.choice([None, 5.0, 6.5, 7.0, 8.2]), "type": rng.choice(["movie", "tv"])}
+                            for _ in range(60)])
+    if order == 1:
+        collection.insert_many([{"type": "movie"} for _ in range(3)])  # missing sort field
+    query = {"type": "movie"}
+    expected = [d["_id"] for d in collection.find(query).sort([("imdb", order), ("_id", order)])]
+
+    served, cursor = [], None
+    while True:
+        docs = list(collection.find(page_query(query, "imdb", order, cursor))
+                    .sort([("imdb", order), ("_id", order)]).limit(7))
+        served += [d["_id"] for d in docs]
+        if len(docs) < 7:
+            break
+        cursor = encode_cursor("imdb", order, docs[-1])
+    assert served == expected
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+
+    async def count_documents(self, query):
+        self.calls += 1
+        return 42
+
+    async def estimated_document_count(self):
+        self.calls += 1
+        return 100
+
+def test_count_cache_reuses_evicts_and_invalidates():
+    cache = CountCache(ttl=60, max_entries=2)
+    content, users = FakeCollection("content"), FakeCollection("users")
+
+    async def run():
+        assert await cache.count(content, {}) == 100
+        assert await cache.count(content, {"type": "movie"}) == 42
+        await cache.count(content, {})  # hit; now the most recently used
+        assert content.calls == 2
+        await cache.count(users, {"plan": "basic"})  # evicts the {"type": "movie"} count
+        assert len(cache) == 2
+        await cache.count(content, {"type": "movie"})
+        assert content.calls == 3
+        cache.invalidate("content")
+        assert len(cache) == 1  # only the users count is left
+        await cache.count(content, {})
+        assert content.calls == 4
+
+    asyncio.run(run())
+
+def test_count_cache_expires():
+    cache = CountCache(ttl=0)
+    content = FakeCollection("content")
+    asyncio.run(cache.count(content, {}))
+    asyncio.run(cache.count(content, {}))
+    assert content.calls == 2
@@ -0,0 +1,18 @@
+import pytest
+from pydantic import ValidationError
+from routes.recommend import BatchRecommendRequest, MAX_LIMIT, MAX_SEEDS
+
+def test_batch_request_accepts_titles_or_history_only():
+    assert BatchRecommendRequest(titles=["Alpha"]).titles == ["Alpha"]
+    assert BatchRecommendRequest(username="sam").titles is None
+
+@pytest.mark.parametrize("fields", [
+    {"titles": []},
+    {"titles": ["t"] * (MAX_SEEDS + 1)},
+    {"titles": ["t"], "limit": MAX_LIMIT + 1},
+    {"titles": ["t"], "limit": 0},
+    {"username": "sam", "history_limit": MAX_SEEDS + 1},
+])
+def test_batch_request_rejects_unbounded_input(fields):
+    with pytest.raises(ValidationError):
+        BatchRecommendRequest(**fields)
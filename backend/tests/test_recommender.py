@@ -0,0 +1,195 @@
+import threading
+from types import SimpleNamespace
+import numpy as np
+import pytest
+import pandas as pd
+import ml.recommender as recommender_module
+from ml import artifacts
+from services.catalog import Catalog, coerce_types
+from ml.recommender import REINDEX_FRACTION, Recommender, RecommenderEngine, top_k_indices, top_k_rows
+
+def catalog():
+    return pd.DataFrame({
+        "Title": ["Alpha", "Beta", "Gamma", "Delta", "Epsilon"],
+        "Year": [1999, 2005, 2010, 2015, 2020],
+        "IMDb": [7.0, 6.5, 8.1, 5.0, 7.7],
+        "Genres": ["Drama", "Comedy,Drama", "Action", "Comedy", "Action,Drama"],
+        "Directors": ["A", "B", "C", "D", "E"],
+        "Type": ["movie"] * 5,
+        "Netflix": [1, 0, 1, 0, 1],
+        "Hulu": [0, 1, 0, 0, 0],
+        "Prime Video": [0, 0, 1, 1, 0],
+        "Disney+": [0, 0, 0, 0, 1],
+    })
+
+def snapshot():
+    state = Recommender()
+    state.build(catalog())
+    return state
+
+DOCS = [
+    {"_id": "a" * 24, "title": "Gamma", "platform": "Hulu", "imdb": 9.9, "year": 2030, "genres": "Sci-Fi,Horror", "type": "movie"},
+    {"_id": "b" * 24, "title": "Zeta", "platform": "Netflix", "imdb": 6.0, "year": 2001, "genres": "Drama", "type": "movie"},
+    {"_id": "c" * 24, "title": "Zeta", "platform": "Hulu", "imdb": 6.2, "year": 2002, "genres": "Comedy", "type": "movie"},
+]
+
+def test_top_k_indices_breaks_ties_by_index():
+    scores = np.array([0.5, 0.9, 0.9, 0.1, 0.9])
+    assert top_k_indices(scores, 2).tolist() == [1, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 2, 4, 0, 3]
+
+def test_top_k_rows_matches_top_k_indices_per_row():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 50, size=(6, 5000)).astype(np.float32) / 50  # many ties
+    scores[1, :4990] = -np.inf                                           # fewer finite than k
+    scores[2, ::3] = -np.inf
+    for k in (1, 10, 25):
+        expected = np.stack([top_k_indices(row, k) for row in scores])
+        np.testing.assert_array_equal(top_k_rows(scores, k), expected)
+    assert top_k_rows(scores[:, :3], 10).shape == (6, 3)
+
+def test_batch_recommendations_match_single_title_calls():
+    state = snapshot()
+    state.replay(DOCS)
+    batch = state.get_batch_recommendations(["Alpha", "Zeta", "nope"], 3, exclude_watched=False)
+    assert batch["not_found"] == ["nope"]
+    for entry in batch["per_seed"]:
+        assert entry["recommendations"] == state.get_recommendations(entry["seed"], 3)
+    best = {}
+    for entry in batch["per_seed"]:
+        for r in entry["recommendations"]:
+            best[r["title"]] = max(best.get(r["title"], 0), r["similarity_score"])
+    assert [r["similarity_score"] for r in batch["merged"]] == sorted(best.values(), reverse=True)[:3]
+
+def test_clone_leaves_published_snapshot_untouched():
+    state = snapshot()
+    before = state.features.copy()
+    fresh = state.clone()
+    fresh.apply_upsert(DOCS[0]["_id"], DOCS[0])
+    fresh.apply_upsert(DOCS[1]["_id"], DOCS[1])
+    assert len(state.df) == 5 and len(state._titles) == 5 and len(state.title_index) == 5
+    np.testing.assert_array_equal(state.features, before)
+    assert state.title_index.exact("Zeta") is None
+    assert fresh.title_index.exact("Zeta") == 5
+    # The document took over the catalog row with its title
+    assert fresh._doc_rows[DOCS[0]["_id"]] == 2 and fresh._imdb[2] == 9.9
+
+def test_replay_matches_live_changes():
+    live = snapshot()
+    for doc in DOCS:
+        live = live.clone()
+        live.apply_upsert(doc["_id"], doc)
+    assert live.clone().apply_delete(DOCS[1]["_id"]) is False  # an admin-added row
+    assert live.clone().apply_delete(DOCS[0]["_id"]) is True   # a catalog row
+
+    replayed = snapshot()
+    replayed.replay(DOCS)
+    assert replayed._doc_rows == live._doc_rows
+    assert list(replayed._titles) == list(live._titles)
+    np.testing.assert_allclose(replayed.features, live.features, atol=1e-6)
+    assert replayed.get_recommendations("Alpha", 3) == live.get_recommendations("Alpha", 3)
+
+def test_replayed_deletion_hides_catalog_row():
+    state = snapshot()
+    state.replay([DOCS[1]], deleted_titles=["Beta", "Zeta"])
+    assert state.title_index.exact("Beta") is None
+    # Deletions only apply to catalog rows; the admin document with that title stays
+    assert state.title_index.exact("Zeta") == 5
+    assert "Beta" not in [r["title"] for r in state.get_recommendations("Alpha", 10)]
+
+def test_titles_without_genres_get_no_genre_column():
+    df = catalog()
+    df.loc[[1, 3], "Genres"] = [None, ""]
+    state = Recommender()
+    state.build(df)
+    assert "" not in state.meta["genres"]
+    assert not state.features[[1, 3]][:, :len(state.meta["genres"])].any()
+
+def test_malformed_documents_are_coerced_or_skipped():
+    docs = [
+        {"_id": "d" * 24, "title": "Eta", "platform": ["Netflix", "Hulu"], "imdb": "abc", "year": float("nan"),
+         "genres": ["Drama", "Comedy"], "type": "movie"},
+        {"_id": "e" * 24, "title": 1984, "platform": "Hulu", "imdb": float("nan"), "year": "2001", "genres": 7},
+        {"title": "No id"},
+    ]
+    state = snapshot()
+    state.replay(docs)
+    assert np.isfinite(state.features).all()
+    eta = state.title_index.exact("Eta")
+    assert eta is not None and state._imdb[eta] == 0 and state.df.loc[eta, "Genres"] == "Drama,Comedy"
+    assert state.title_index.exact("1984") is not None
+    assert state.title_index.exact("No id") is None
+    assert len(state.df) == 7
+
+def test_large_replay_rebuilds_title_index():
+    docs = [{"_id": f"{i:024x}", "title": f"Title {i}", "platform": "Netflix", "imdb": 7.0, "year": 2000,
+             "genres": "Drama", "type": "movie"} for i in range(40)]
+    docs.append({"_id": "f" * 24, "title": "Beta", "platform": "Hulu", "imdb": 5.5, "year": 2005, "genres": "Comedy"})
+    live = snapshot()
+    for doc in docs:
+        live = live.clone()
+        live.apply_upsert(doc["_id"], doc)
+    replayed = snapshot()
+    replayed.replay(docs)
+    assert len(docs) > len(replayed._titles) // REINDEX_FRACTION
+    assert replayed.title_index.exact("Beta") == live.title_index.exact("Beta") == 1
+    assert replayed.title_index.exact("Title 39") == live.title_index.exact("Title 39") == 44
+    assert replayed.title_index.prefix("title 3").tolist() == live.title_index.prefix("title 3").tolist()
+    np.testing.assert_allclose(replayed.features, live.features, atol=1e-6)
+
+def test_new_catalog_version_reloads_in_background(monkeypatch):
+    catalog_ref = SimpleNamespace(version="v1")
+    monkeypatch.setattr(recommender_module, "current_catalog", lambda: catalog_ref)
+    release = threading.Event()
+    engine = RecommenderEngine()
+
+    def build(catalog, previous=None):
+        if catalog.version != "v1":
+            release.wait(5)
+        state = snapshot()
+        state.catalog_version = catalog.version
+        return state
+
+    monkeypatch.setattr(engine, "_build", build)
+    first = engine.current()
+    assert first.catalog_version == "v1"
+
+    catalog_ref = SimpleNamespace(version="v2")
+    assert engine.current() is first  # the old snapshot keeps serving while v2 builds
+    engine.upsert_content(DOCS[1]["_id"], DOCS[1])
+    assert engine.state.title_index.exact("Zeta") == 5
+    release.set()
+    for _ in range(500):
+        if engine.state.catalog_version == "v2":
+            break
+        threading.Event().wait(0.01)
+    assert engine.state.catalog_version == "v2" and not engine._reloading
+    # The change made during the reload was re-applied to the new snapshot
+    assert engine.state.title_index.exact("Zeta") == 5
+
+DELTA = [{"Title": "Theta", "Year": 2024, "IMDb": 9.5, "Genres": "Drama,Western", "Netflix": 1}]
+
+def test_catalog_deltas_extend_loaded_snapshot_without_rebuilding(monkeypatch, tmp_path):
+    base = Catalog.from_frame(coerce_types(catalog()), "v1")
+    extended = base.extended(coerce_types(pd.DataFrame(DELTA)), "v1+1")
+    snapshot().save_artifact(artifacts.artifact_name("v1"), root=str(tmp_path))
+    real_load = artifacts.load
+    monkeypatch.setattr(artifacts, "load", lambda name: real_load(name, root=str(tmp_path)))
+    monkeypatch.setattr(recommender_module, "load_admin_content", lambda: ([DOCS[1]], []))
+    monkeypatch.setattr(Recommender, "load_data", lambda self, catalog=None: pytest.fail("rebuilt in process"))
+    engine = RecommenderEngine()
+
+    # No artifact for v1+1: the base artifact is loaded and the delta row appended to it
+    fresh = engine._build(extended)
+    assert fresh.catalog_version == "v1+1" and fresh.catalog_size == 6
+    assert fresh.title_index.exact("Theta") == 5 and fresh.title_index.exact("Zeta") == 6
+
+    # A loaded v1 snapshot (with an admin row) is cloned and extended instead
+    previous = engine._build(base)
+    incremental = engine._build(extended, previous)
+    assert len(previous.df) == 6
+    assert incremental.title_index.exact("Zeta") == 5 and incremental.title_index.exact("Theta") == 6
+    assert incremental.clone().apply_delete(None, "Theta") is True  # a catalog row, though appended last
+    assert incremental.clone().apply_delete(DOCS[1]["_id"]) is False
+    by_title = lambda recs: {r["title"]: r["similarity_score"] for r in recs}
+    assert by_title(incremental.get_recommendations("Alpha", 10)) == by_title(fresh.get_recommendations("Alpha", 10))
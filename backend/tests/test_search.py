@@ -0,0 +1,117 @@
+import numpy as np
+from ml.title_index import TitleIndex
+from services.search import SearchIndex, SuggestIndex, SUGGEST_LIMIT
+
+def make_rows(titles, imdb=None):
+    imdb = np.asarray(imdb if imdb is not None else [7.0] * len(titles), dtype=np.float64)
+    return {
+        "_id": [None] * len(titles),
+        "title": list(titles),
+        "year": np.full(len(titles), 2000, dtype=np.int64),
+        "imdb": imdb,
+        "platform": ["Netflix"] * len(titles),
+    }, imdb
+
+def brute_force(titles, imdb, prefix, limit=SUGGEST_LIMIT):
+    best = {}
+    for i, t in enumerate(titles):
+        if t is None:
+            continue
+        j = best.get(t.lower())
+        if j is None or imdb[i] > imdb[j]:
+            best[t.lower()] = i
+    keys = sorted(k for k in best if k.startswith(prefix))
+    return [titles[best[k]] for k in sorted(keys, key=lambda k: -imdb[best[k]])[:limit]]
+
+def test_prefixes_after_one_character_title():
+    titles = ["1", "10 Things", "100 Days", "1917", "9", "9-1-1", "99 Homes", "p", "pi", "Psycho"]
+    rows, imdb = make_rows(titles)
+    index = SuggestIndex(rows, imdb)
+    assert [s["title"] for s in index.suggest("10")] == ["10 Things", "100 Days"]
+    assert [s["title"] for s in index.suggest("9-")] == ["9-1-1"]
+    assert [s["title"] for s in index.suggest("ps")] == ["Psycho"]
+    assert [s["title"] for s in index.suggest("1")] == ["1", "10 Things", "100 Days", "1917"]
+
+def test_matches_brute_force_for_every_prefix():
+    rng = np.random.default_rng(3)
+    alphabet = list("ab1 -")
+    titles = ["".join(rng.choice(alphabet, rng.integers(1, 5))) for _ in range(300)] + [None, "A", "AB"]
+    imdb = np.round(rng.uniform(1, 10, len(titles)), 1)
+    rows, imdb = make_rows(titles, imdb)
+    index = SuggestIndex(rows, imdb)
+    prefixes = {t.lower()[:n] for t in titles if t for n in range(1, 4)}
+    for prefix in prefixes:
+        if not prefix.lstrip():
+            continue
+        suggestions = index.suggest(prefix)
+        want = brute_force(titles, imdb, prefix.lstrip())
+        assert sorted(s["title"] for s in suggestions) == sorted(want), prefix
+        ratings = [s["imdb"] for s in suggestions]
+        assert ratings == sorted(ratings, reverse=True)
+
+def test_unknown_prefix_is_empty():
+    rows, imdb = make_rows(["Alien", "Aliens"])
+    index = SuggestIndex(rows, imdb)
+    assert index.suggest("zz") == []
+    assert index.suggest("   ") == []
+
+TITLES = ["The Matrix", "Matrix Reloaded", "the matrix", "Heat", "Heathers", None, "Theater of Blood", "Up"]
+
+def legacy_lookup(titles, query):
+    q = query.lower()
+    exact = [i for i, t in enumerate(titles) if t is not None and t.lower() == q]
+    if exact:
+        return exact[0]
+    return next((i for i, t in enumerate(titles) if t is not None and q in t.lower()), None)
+
+def test_title_index_matches_linear_scan():
+    index = TitleIndex(TITLES)
+    for query in ["the matrix", "MATRIX", "heat", "eat", "ather", "of b", "up", "u", "nothing", "reloaded"]:
+        assert index.lookup(query) == legacy_lookup(TITLES, query), query
+    assert index.prefix("heat").tolist() == [3, 4]
+
+def test_title_index_add_remove_and_copy():
+    index = TitleIndex(TITLES)
+    snapshot = index.copy()
+    index.remove(0)
+    index.add(len(TITLES), "Matrix Revolutions")
+    titles = [None] + TITLES[1:] + ["Matrix Revolutions"]
+    for query in ["the matrix", "matrix rev", "trix", "heat"]:
+        assert index.lookup(query) == legacy_lookup(titles, query), query
+    # The copy still answers from the titles it was taken with
+    assert snapshot.lookup("the matrix") == 0
+    assert snapshot.lookup("matrix rev") is None
+
+def search_rows(n=60):
+    titles = [f"Movie {i}" for i in range(n)] + ["Night Shift", "Night Watch", "Nightcrawler"]
+    size = len(titles)
+    return {
+        "_id": [f"{i:024x}" if i % 2 else None for i in range(size)],
+        "title": titles,
+        "directors": ["Someone"] * size,
+        "genres": ["Drama"] * size,
+        "type": ["movie"] * size,
+        "platform": ["Netflix"] * size,
+        "imdb": np.linspace(5, 9, size),
+        "year": np.full(size, 2000, dtype=np.int64),
+    }
+
+def test_search_results_carry_content_id():
+    rows = search_rows()
+    index = SearchIndex(rows)
+    results, _ = index.search("night", limit=5)
+    assert {r["title"] for r in results} == {"Night Shift", "Night Watch", "Nightcrawler"}
+    for r in results:
+        assert r["_id"] == rows["_id"][rows["title"].index(r["title"])]
+
+def test_search_cursor_pages_cover_every_match_once():
+    index = SearchIndex(search_rows())
+    seen, cursor = [], None
+    while True:
+        page, cursor = index.search("movie", limit=7, cursor=cursor)
+        seen.extend(r["title"] for r in page)
+        if cursor is None:
+            break
+    everything, _ = index.search("movie", limit=100)
+    assert seen == [r["title"] for r in everything]
+    assert len(seen) == len(set(seen)) == 60
@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+import mongomock
+import services.traffic as traffic
+from services.traffic import HistoryRollup, reset_history_minutes
+
+class FakeRollups:
+    def __init__(self, history_bucket=None):
+        self.history_bucket = history_bucket
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(0)
+        return self.history_bucket
+
+def test_ensure_backfilled_runs_backfill_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(traffic, "adb", SimpleNamespace(traffic_rollups=FakeRollups()))
+    monkeypatch.setattr(traffic, "backfill", lambda: calls.append(1) or 0)
+    monkeypatch.setattr(traffic, "_backfilled", False)
+    monkeypatch.setattr(traffic, "_backfill_lock", asyncio.Lock())
+
+    async def requests():
+        await asyncio.gather(*(traffic.ensure_backfilled() for _ in range(5)))
+        await traffic.ensure_backfilled()
+
+    asyncio.run(requests())
+    assert calls == [1]
+
+def test_ensure_backfilled_skips_populated_store(monkeypatch):
+    calls = []
+    monkeypatch.setattr(traffic, "adb", SimpleNamespace(traffic_rollups=FakeRollups({"_id": "month:2024-01:Netflix"})))
+    monkeypatch.setattr(traffic, "backfill", lambda: calls.append(1) or 0)
+    monkeypatch.setattr(traffic, "_backfilled", False)
+    asyncio.run(traffic.ensure_backfilled())
+    assert calls == [] and traffic._backfilled
+
+USERS = [
+    {"user_id": "u1", "history": [
+        {"title": "A", "platform": "Netflix", "date": "2024-01-03", "watched_duration_mins": 45},
+        {"title": "B", "platform": "Amazon Prime", "date": "2024-01-03", "watched_duration_mins": 90},
+        {"title": "C", "platform": "Netflix", "date": "2024-02", "watched_duration_mins": 30},
+    ]},
+    {"user_id": "u2", "history": [
+        {"title": "A", "platform": "Netflix", "date": "2024-01-03", "watched_duration_mins": 15},
+        {"title": "D", "platform": None, "date": "2024-01-09", "watched_duration_mins": 0},
+    ]},
+]
+
+class RollupStore:
+    """Applies the rollup writers' upserts to in-memory documents"""
+
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs}
+
+    def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            doc = self.docs.setdefault(op._filter["_id"], dict(op._filter, **op._doc.get("$setOnInsert", {})))
+            for field, n in op._doc.get("$inc", {}).items():
+                doc[field] = doc.get(field, 0) + n
+
+    def delete_many(self, query):
+        assert query == {"view_minutes": {"$exists": False}}
+        self.docs = {k: doc for k, doc in self.docs.items() if "view_minutes" in doc}
+
+    def update_many(self, query, update):
+        for doc in self.docs.values():
+            doc.update(update["$set"])
+
+def test_history_writers_roll_up_incrementally(monkeypatch):
+    users = mongomock.MongoClient().db.user_analytics_data
+    rollups = RollupStore([{"_id": "month:2023-12:Hulu", "minutes": 99, "view_minutes": 5},
+                           {"_id": "month:2023-11:Hulu", "minutes": 40}])
+    monkeypatch.setattr(traffic, "user_analytics_collection", users)
+    monkeypatch.setattr(traffic, "traffic_rollups_collection", rollups)
+
+    # A bulk load replaces all history: old history minutes go, view minutes stay
+    users.insert_many([dict(u) for u in USERS])
+    rollup = HistoryRollup()
+    for u in USERS:
+        rollup.add(u["history"])
+    reset_history_minutes()
+    assert rollup.flush() == 5
+    traffic.record_history_event({"user_id": "u1"}, {"title": "E", "platform": "Hulu", "date": "2024-02-10",
+                                                     "watched_duration_mins": 20})
+    minutes = {k: doc["minutes"] for k, doc in rollups.docs.items() if doc["minutes"]}
+    assert minutes == {
+        "day:2024-01-03:Netflix": 60, "day:2024-01-03:Prime": 90, "month:2024-01:Netflix": 60,
+        "month:2024-01:Prime": 90, "month:2024-02:Netflix": 30, "day:2024-02-10:Hulu": 20, "month:2024-02:Hulu": 20,
+    }
+    assert rollups.docs["month:2023-12:Hulu"] == {"_id": "month:2023-12:Hulu", "minutes": 0, "view_minutes": 5}
+    assert "month:2023-11:Hulu" not in rollups.docs
+    assert rollups.docs["month:2024-02:Hulu"]["granularity"] == "month"
+    assert users.find_one({"user_id": "u1"})["history"][-1]["title"] == "E"
@@ -0,0 +1,110 @@
+import math
+import random
+import asyncio
+from types import SimpleNamespace
+import pytest
+from bson.objectid import ObjectId
+import services.views as views_module
+from services.views import DecayedTopK, ViewCounter, MIN_SCORE
+
+def exact_scores(events, rate, now):
+    return {k: sum(math.exp(-rate * (now - t)) for t in times) for k, times in events.items()}
+
+@pytest.mark.parametrize("seed", range(5))
+def test_decayed_top_k_matches_exact_decayed_sums(seed):
+    rng = random.Random(seed)
+    # A tiny half-life forces many rebases
+    topk = DecayedTopK(capacity=10, half_life_hours=0.01)
+    now = topk.origin
+    keys = [f"k{i}" for i in range(200)]
+    events = {}
+    for _ in range(5000):
+        now += rng.random() * 2
+        key = rng.choice(keys[:rng.randint(1, 200)])
+        topk.add(key, now=now)
+        events.setdefault(key, []).append(now)
+        if rng.random() < 0.002:
+            topk.remove(key)
+            events.pop(key)
+    exact = exact_scores(events, topk.rate, now)
+    expected = sorted(exact.values(), reverse=True)[:10]
+    got = [score for _, score in topk.top(10, now=now)]
+    assert len(got) == len(expected)
+    for a, b in zip(got, expected):
+        assert a == pytest.approx(b, rel=1e-6) or b < 2 * MIN_SCORE
+
+def test_remove_many_refills_top_set_with_next_best():
+    topk = DecayedTopK(capacity=3, half_life_hours=1)
+    now = topk.origin
+    for key, n in (("a", 5), ("b", 4), ("c", 3), ("d", 2), ("e", 1)):
+        for _ in range(n):
+            topk.add(key, now=now)
+    topk.remove_many(["a", "c", "missing"])
+    assert [key for key, _ in topk.top(3, now=now)] == ["b", "d", "e"]
+    assert "a" not in topk.scores and "c" not in topk.scores
+
+class FakeCollection:
+    """Just enough of an async collection for ViewCounter.flush"""
+
+    def __init__(self, docs=(), fail=None):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.fail = fail
+        self.writes = []
+
+    async def _iter(self, ids):
+        for i in ids:
+            if i in self.docs:
+                yield dict(self.docs[i])
+
+    def find(self, query):
+        return self._iter(query["_id"]["$in"])
+
+    async def bulk_write(self, ops, ordered=True):
+        if self.fail is not None:
+            raise self.fail
+        self.writes.append(ops)
+
+def use_db(monkeypatch, content, rollups=None):
+    monkeypatch.setattr(views_module, "adb", SimpleNamespace(content=content, traffic_rollups=rollups or FakeCollection()))
+
+def test_unknown_ids_are_dropped_without_being_ranked(monkeypatch):
+    known, unknown = ObjectId(), ObjectId()
+    content = FakeCollection([{"_id": known, "title": "Known", "platform": "Netflix"}])
+    use_db(monkeypatch, content)
+    counter = ViewCounter()
+    counter.record(str(known), "Netflix", 30)
+    counter.record(str(unknown), "Hulu", 30)
+    assert len(counter.trending) == 0  # nothing is ranked before its document is found
+    asyncio.run(counter.flush())
+    assert list(counter.trending.scores) == [str(known)]
+    assert [item["title"] for item in counter.top(10)] == ["Known"]
+    assert not counter.pending_views and not counter._unconfirmed
+    (ops,) = content.writes
+    assert [op._filter["_id"] for op in ops] == [known]
+
+def test_view_minutes_go_to_known_chart_series(monkeypatch):
+    known = ObjectId()
+    rollups = FakeCollection()
+    use_db(monkeypatch, FakeCollection([{"_id": known, "title": "Known", "platform": "Some Service"}]), rollups)
+    counter = ViewCounter()
+    counter.record(str(known), None, 30)
+    asyncio.run(counter.flush())
+    (ops,) = rollups.writes
+    assert {op._filter["_id"].split(":")[-1] for op in ops} == {"Other"}
+    assert all(op._doc["$inc"] == {"view_minutes": 30} for op in ops)
+
+@pytest.mark.parametrize("error", [RuntimeError("down"), asyncio.CancelledError()])
+def test_failed_or_cancelled_flush_keeps_counts(monkeypatch, error):
+    doc_id = ObjectId()
+    use_db(monkeypatch, FakeCollection([{"_id": doc_id, "title": "Known", "platform": "Hulu"}], fail=error))
+    counter = ViewCounter()
+    for _ in range(3):
+        counter.record(str(doc_id), "Hulu", 10)
+    if isinstance(error, Exception):
+        asyncio.run(counter.flush())
+    else:
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(counter.flush())
+    assert counter.pending_views == {str(doc_id): 3}
+    assert sum(counter.pending_minutes.values()) == 30
+    assert counter.failed_flushes == 1